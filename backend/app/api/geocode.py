@@ -9,6 +9,8 @@ from typing import Any, Dict, List, Optional
 import httpx
 from fastapi import APIRouter, HTTPException, Query
 
+from ..utils.circuit_breaker import CircuitBreaker
+
 router = APIRouter(tags=["geocode"])
 
 # ===== 設定 =====
@@ -113,39 +115,6 @@ def _format_item(item: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # ===== サーキットブレーカー =====
-class CircuitBreaker:
-    def __init__(self, threshold: int, window_s: float, reset_timeout_s: float) -> None:
-        self.threshold = threshold
-        self.window_s = window_s
-        self.reset_timeout_s = reset_timeout_s
-        self.fail_ts: List[float] = []
-        self.state: str = "closed"  # closed | open | half-open
-        self.open_since: float = 0.0
-
-    def allow(self) -> bool:
-        now = time.time()
-        if self.state == "open":
-            if now - self.open_since >= self.reset_timeout_s:
-                self.state = "half-open"
-                return True
-            return False
-        return True
-
-    def on_success(self) -> None:
-        self.fail_ts.clear()
-        if self.state in {"half-open", "open"}:
-            self.state = "closed"
-
-    def on_failure(self) -> None:
-        now = time.time()
-        # 窓外の失敗を掃除
-        self.fail_ts = [t for t in self.fail_ts if now - t <= self.window_s]
-        self.fail_ts.append(now)
-        if len(self.fail_ts) >= self.threshold:
-            self.state = "open"
-            self.open_since = now
-
-
 _cb_nominatim = CircuitBreaker(CB_OPEN_THRESHOLD, CB_OPEN_WINDOW_S, CB_RESET_TIMEOUT_S)
 
 
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Sequence, Tuple
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # 相対 import（pytest / uvicorn 両対応）
+from ..ml.registry import BACKEND_PERSISTENCE, ModelEntry, get_registry
+from ..services.feature_builder import D0Features
+from ..services.history import AssembledHistory, get_history_assembler
 from ..services.open_meteo import OpenMeteoClient as _OpenMeteoClient
 from ..utils import datetime_utils as dtmod
+from ..utils.json_utils import FastJSONResponse
 
 # tests で monkeypatch しやすいように束ねる
 OpenMeteoClient = _OpenMeteoClient
@@ -17,7 +24,7 @@ router = APIRouter()
 
 
 # =========================
-# /predict（既存踏襲）
+# /predict（レジストリのモデルで推論）
 # =========================
 class PredictRequest(BaseModel):
     lat: float
@@ -25,22 +32,92 @@ class PredictRequest(BaseModel):
     tz: str = "Asia/Tokyo"
 
 
-def _predict_impl(lat: float, lon: float, tz: str) -> Dict[str, Any]:
+# /predict/batch の 1 リクエストあたり上限地点数
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "500"))
+# 地点ごとの Open-Meteo 取得の並列度
+PREDICT_BATCH_FETCH_WORKERS = int(os.getenv("PREDICT_BATCH_FETCH_WORKERS", "8"))
+
+
+class PredictBatchRequest(BaseModel):
+    items: List[PredictRequest] = Field(..., min_length=1, max_length=PREDICT_BATCH_MAX)
+
+
+def _persistence_payload(d0: D0Features) -> Dict[str, Any]:
+    # persistence: 翌日 = 当日
+    return {
+        "max": d0.d0_max,
+        "min": d0.d0_min,
+        "precip_prob": None,
+        "precip": d0.d0_prec,
+        "mean": d0.d0_mean,
+    }
+
+
+def _d1_payload(y: np.ndarray) -> Dict[str, Any]:
+    # 予測列順は学習時のターゲット順（d1_mean, d1_min, d1_max, d1_prec）
+    return {
+        "max": float(y[2]),
+        "min": float(y[1]),
+        "precip_prob": None,
+        "precip": max(0.0, float(y[3])),
+        "mean": float(y[0]),
+    }
+
+
+def _resolve_model() -> Tuple[str, ModelEntry | None]:
+    """(要求 backend, 使うモデル)。モデルが無ければ None（persistence で返す）"""
+    backend = os.getenv("MODEL_BACKEND", BACKEND_PERSISTENCE)
+    return backend, get_registry().resolve(backend)
+
+
+def _fetch_d0(
+    lat: float, lon: float, tz: str, entry: ModelEntry | None = None
+) -> Tuple[date, date, AssembledHistory]:
+    """D0 と、モデルが要る日数ぶんの履歴（特徴量化済み）を組み立てる。同じ日の同じ地点はメモ参照"""
     d0_date, d1_date = dtmod.local_today_and_tomorrow(tz)
-    backend = os.getenv("MODEL_BACKEND", "persistence")
+    pipeline = entry.model.pipeline if entry is not None else None
+    hist = get_history_assembler().assemble(lat, lon, tz, d0_date, OpenMeteoClient(), pipeline)
+    return d0_date, d1_date, hist
+
 
-    d1_payload = {"max": 27.0, "min": 21.0, "precip_prob": 0.4, "precip": 2.1}
-    d0_payload = {"max": 28.0, "min": 22.0, "precip_prob": 0.3, "precip": 1.2}
-    d1_mean = float((d1_payload["max"] + d1_payload["min"]) / 2.0)
+def _predict_rows(
+    rows: Sequence[Tuple[int, AssembledHistory]],
+    backend: str,
+    entry: ModelEntry | None,
+) -> Tuple[str, str | None, Dict[int, Dict[str, Any]]]:
+    """地点ごとの入力をまとめて 1 回の predict で D1 へ変換する
+
+    Returns: (実際に使った backend, model_version, loc_id -> d1 payload)
+    """
+    if entry is None:
+        # persistence（もしくはモデル未ロード時のフォールバック）
+        return BACKEND_PERSISTENCE, None, {i: _persistence_payload(h.d0) for i, h in rows}
 
+    # 履歴つき特徴量（メモ化済み）を縦に積んで predict だけ。
+    # pipeline を持たない旧形式は warmup で弾かれるのでレジストリには載らない
+    X = np.vstack([h.features for _, h in rows])
+    d0 = [[h.d0.d0_mean, h.d0.d0_min, h.d0.d0_max, h.d0.d0_prec] for _, h in rows]
+    y = entry.model.predict_features(X, d0)
+    return backend, entry.version, {i: _d1_payload(y[k]) for k, (i, _) in enumerate(rows)}
+
+
+def _predict_body(
+    backend: str,
+    model_version: str | None,
+    d0_date: date,
+    d1_date: date,
+    d0: D0Features,
+    d1_payload: Dict[str, Any],
+) -> Dict[str, Any]:
     return {
         "backend": backend,
+        "model_version": model_version,
         "date_d0": d0_date.isoformat(),
         "date_d1": d1_date.isoformat(),
-        "d0": d0_payload,
+        "d0": _persistence_payload(d0),
         "d1": d1_payload,
         "prediction": {
-            "d1_mean": d1_mean,
+            "d1_mean": d1_payload["mean"],
             "d1_min": d1_payload["min"],
             "d1_max": d1_payload["max"],
             "d1_prec": d1_payload["precip"],
@@ -50,18 +127,89 @@ def _predict_impl(lat: float, lon: float, tz: str) -> Dict[str, Any]:
     }
 
 
-@router.post("/predict")
-def predict_post(req: PredictRequest):
-    return _predict_impl(req.lat, req.lon, req.tz)
+def _predict_impl(lat: float, lon: float, tz: str) -> Dict[str, Any]:
+    backend, entry = _resolve_model()
+    try:
+        d0_date, d1_date, hist = _fetch_d0(lat, lon, tz, entry)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"upstream error: {e!s}")
+
+    backend, model_version, d1 = _predict_rows([(0, hist)], backend, entry)
+    return _predict_body(backend, model_version, d0_date, d1_date, hist.d0, d1[0])
+
+
+def _predict_batch_impl(items: Sequence[PredictRequest]) -> Dict[str, Any]:
+    """地点ごとに D0 を取得し、成功分だけまとめて 1 回で推論。失敗は行単位で返す"""
+    backend, entry = _resolve_model()
+    fetched: Dict[int, Tuple[date, date, AssembledHistory]] = {}
+    errors: Dict[int, str] = {}
 
+    def _one(i: int, it: PredictRequest) -> None:
+        try:
+            if not (-90.0 <= it.lat <= 90.0 and -180.0 <= it.lon <= 180.0):
+                raise ValueError("lat/lon out of range")
+            fetched[i] = _fetch_d0(it.lat, it.lon, it.tz, entry)
+        except Exception as e:  # noqa: BLE001
+            errors[i] = f"upstream error: {e!s}"
 
-@router.get("/predict")
+    workers = max(1, min(PREDICT_BATCH_FETCH_WORKERS, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda a: _one(*a), enumerate(items)))
+
+    rows = [(i, hist) for i, (_, _, hist) in sorted(fetched.items())]
+    model_version: str | None = None
+    d1: Dict[int, Dict[str, Any]] = {}
+    if rows:
+        try:
+            backend, model_version, d1 = _predict_rows(rows, backend, entry)
+        except Exception as e:  # noqa: BLE001
+            # 推論自体の失敗は全行に反映（部分結果は返せない）
+            for i, _ in rows:
+                errors[i] = f"prediction error: {e!s}"
+
+    results: List[Dict[str, Any]] = []
+    for i, it in enumerate(items):
+        head = {"index": i, "lat": it.lat, "lon": it.lon, "tz": it.tz}
+        if i in errors:
+            results.append({**head, "ok": False, "error": errors[i]})
+            continue
+        d0_date, d1_date, hist = fetched[i]
+        body = _predict_body(backend, model_version, d0_date, d1_date, hist.d0, d1[i])
+        results.append({**head, "ok": True, **body})
+
+    return {
+        "backend": backend,
+        "model_version": model_version,
+        "count": len(items),
+        "succeeded": len(items) - len(errors),
+        "failed": len(errors),
+        "results": results,
+    }
+
+
+@router.post("/predict", response_class=FastJSONResponse)
+def predict_post(req: PredictRequest) -> FastJSONResponse:
+    return FastJSONResponse(_predict_impl(req.lat, req.lon, req.tz))
+
+
+@router.get("/predict", response_class=FastJSONResponse)
 def predict_get(
     lat: float = Query(...),
     lon: float = Query(...),
     tz: str = Query("Asia/Tokyo"),
-):
-    return _predict_impl(lat, lon, tz)
+) -> FastJSONResponse:
+    return FastJSONResponse(_predict_impl(lat, lon, tz))
+
+
+@router.post("/predict/batch", response_class=FastJSONResponse)
+def predict_batch(req: PredictBatchRequest) -> FastJSONResponse:
+    """
+    複数地点の翌日予測をまとめて返す。
+    - 地点ごとの履歴取得と特徴量化は並列（HistoryAssembler が地点ごとに transform してメモ化）、
+      推論は特徴量行を縦に積んだ行列に対する 1 回の predict_features
+    - 取得/検証に失敗した地点は ok=false + error で個別に返し、バッチ全体は 200
+    """
+    return FastJSONResponse(_predict_batch_impl(req.items))
 
 
 # =========================
@@ -96,23 +244,76 @@ def _format_open_meteo_daily(
     return out
 
 
-@router.get("/forecast", tags=["forecast"])
+@router.get("/forecast", tags=["forecast"], response_class=FastJSONResponse)
 async def forecast_get(
     lat: float = Query(..., ge=-90.0, le=90.0, description="緯度"),
     lon: float = Query(..., ge=-180.0, le=180.0, description="経度"),
     tz: str = Query("Asia/Tokyo", description="IANA timezone 例: Asia/Tokyo"),
     days: int = Query(14, ge=1, le=92, description="過去参照日数（Open-Meteo上限92）"),
     include_raw: bool = Query(False, description="trueで生JSON(raw)も含める"),
-) -> Dict[str, Any]:
+) -> FastJSONResponse:
     """
     直近 days 日の Open-Meteo 日次サマリーを返す。
     - デフォはコンパクト（raw無し）
     - 欠損/nullは必ず空配列にフォールバックし、timezone は tz を保証
+    - X-Cache-Freshness: fresh / revalidating / stale（stale-while-revalidate 有効時）
     """
     client = OpenMeteoClient(timeout=10.0)
     try:
-        raw = await client.fetch_recent_daily(lat=lat, lon=lon, tz=tz, days=days)
+        raw, freshness = await client.fetch_recent_daily_with_freshness(
+            lat=lat, lon=lon, tz=tz, days=days
+        )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"upstream error: {e!s}")
 
-    return _format_open_meteo_daily(raw, tz=tz, days=days, include_raw=include_raw)
+    # raw を含む大きな応答でも jsonable_encoder を通さず直接エンコードする
+    return FastJSONResponse(
+        _format_open_meteo_daily(raw, tz=tz, days=days, include_raw=include_raw),
+        headers={"X-Cache-Freshness": freshness},
+    )
+
+
+# /forecast/batch の 1 リクエストあたり上限地点数
+# （上流へは複数座標リクエストでまとめて問い合わせる）
+FORECAST_BATCH_MAX = int(os.getenv("FORECAST_BATCH_MAX", "200"))
+
+
+class ForecastPoint(BaseModel):
+    lat: float = Field(..., ge=-90.0, le=90.0)
+    lon: float = Field(..., ge=-180.0, le=180.0)
+
+
+class ForecastBatchRequest(BaseModel):
+    items: List[ForecastPoint] = Field(..., min_length=1, max_length=FORECAST_BATCH_MAX)
+    tz: str = "Asia/Tokyo"
+    days: int = Field(14, ge=1, le=92)
+    include_raw: bool = False
+
+
+@router.post("/forecast/batch", tags=["forecast"], response_class=FastJSONResponse)
+async def forecast_batch(req: ForecastBatchRequest) -> FastJSONResponse:
+    """
+    複数地点の /forecast。未キャッシュの地点は Open-Meteo の複数座標リクエストでまとめて取得する。
+    地点ごとの失敗は results[i].ok=false で返し、全体は 200。
+    """
+    client = OpenMeteoClient(timeout=10.0)
+    raws = await client.fetch_recent_daily_many(
+        [(it.lat, it.lon) for it in req.items], tz=req.tz, days=req.days
+    )
+    results: List[Dict[str, Any]] = []
+    for i, (it, raw) in enumerate(zip(req.items, raws, strict=True)):
+        head = {"index": i, "lat": it.lat, "lon": it.lon}
+        if isinstance(raw, Exception):
+            results.append({**head, "ok": False, "error": f"upstream error: {raw!s}"})
+            continue
+        body = _format_open_meteo_daily(raw, tz=req.tz, days=req.days, include_raw=req.include_raw)
+        results.append({**head, "ok": True, **body})
+    failed = sum(1 for r in results if not r["ok"])
+    return FastJSONResponse(
+        {
+            "count": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
+    )
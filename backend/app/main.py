@@ -5,13 +5,20 @@ import os
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 
 from .api.geocode import router as geocode_router  # /geocode/search, /geocode/reverse
 from .api.routes import router as api_router  # /predict, /forecast
 from .middleware_observability import ObservabilityMiddleware, metrics_dump, wrap_requests
 from .middleware_rate_limit import RateLimitMiddleware  # ← 追加
+from .ml.registry import (
+    BACKEND_PERSISTENCE,
+    get_registry,
+    start_model_watcher,
+    stop_model_watcher,
+)
+from .services.open_meteo import aclose_clients
+from .utils.json_utils import FastJSONResponse
 
 app = FastAPI(title="WeatherForecastApp API")
 
@@ -48,9 +55,35 @@ def health_api() -> dict:
     return {"status": "ok"}
 
 
-@app.get("/api/metrics-lite")
-def metrics_lite() -> JSONResponse:
-    return JSONResponse(metrics_dump())
+@app.get("/api/metrics-lite", response_class=FastJSONResponse)
+def metrics_lite() -> FastJSONResponse:
+    return FastJSONResponse(metrics_dump())
+
+
+@app.get("/api/model", response_class=FastJSONResponse)
+def model_info() -> FastJSONResponse:
+    """アクティブなモデル成果物（metadata.git_sha / created_at 等）"""
+    backend = os.getenv("MODEL_BACKEND", BACKEND_PERSISTENCE)
+    return FastJSONResponse(get_registry().describe(backend))
+
+
+# ----- 起動時にモデルをロード（joblib.load + ウォームアップ推論をリクエスト経路から外す） -----
+@app.on_event("startup")
+async def _preload_models_on_startup() -> None:
+    get_registry().preload()
+    # 以降は新しい成果物をバックグラウンドで検知して差し替える（再起動不要）
+    start_model_watcher()
+
+
+@app.on_event("shutdown")
+async def _stop_model_watcher_on_shutdown() -> None:
+    await stop_model_watcher()
+
+
+# ----- 終了時に Open-Meteo のコネクションプールを閉じる -----
+@app.on_event("shutdown")
+async def _close_http_clients_on_shutdown() -> None:
+    await aclose_clients()
 
 
 # ----- 起動時にルート一覧を出力（デバッグ用） -----
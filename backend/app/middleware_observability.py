@@ -4,9 +4,11 @@ from __future__ import annotations
 from .observability import (
     METRICS,
     ObservabilityMiddleware,
+    counter_inc,
     get_ext_calls,
     metrics_dump,
     new_request_context,
+    register_stats,
     wrap_requests,
 )
 
@@ -15,6 +17,8 @@ __all__ = [
     "wrap_requests",
     "metrics_dump",
     "METRICS",
+    "counter_inc",
     "get_ext_calls",
     "new_request_context",
+    "register_stats",
 ]
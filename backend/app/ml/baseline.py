@@ -1,11 +1,61 @@
 from __future__ import annotations
 
-from typing import Any
+from pathlib import Path
+from typing import Any, Dict, Iterator, Sequence
 
 import joblib
 import numpy as np
 import pandas as pd
 
+from ..utils.atomic_file import atomic_path
+
+# 木のノード配列をまとめて置く side-car（{stem}_gbdt.joblib -> {stem}_gbdt.nodes.npy）
+NODES_SUFFIX = ".nodes.npy"
+
+
+def nodes_path_for(artifact_path: Path | str) -> Path:
+    return Path(artifact_path).with_suffix(NODES_SUFFIX)
+
+
+def _tree_predictors(model: Any) -> Iterator[Any]:
+    """MultiOutputRegressor(HistGradientBoostingRegressor) 等に含まれる TreePredictor を順に返す"""
+    for est in getattr(model, "estimators_", None) or [model]:
+        for per_iter in getattr(est, "_predictors", None) or []:
+            yield from per_iter
+
+
+def dump_artifact(artifact: Dict[str, Any], path: Path | str) -> Path:
+    """成果物 dict を mmap しやすい形で保存する
+
+    joblib の mmap_mode は配列 1 つごとに mmap（と fd）を 1 つ作るので、数百〜数千本の木を
+    そのまま mmap すると fd を使い切る。木のノード配列は 1 本の side-car .npy に連結して置き、
+    joblib 本体には空の配列とオフセットだけを残す。非圧縮（compress=0）で保存する。
+    どちらも一時ファイル → os.replace で書く（同名の成果物を mmap 中の worker を壊さない）。
+    """
+    p = Path(path)
+    preds = list(_tree_predictors(artifact.get("model")))
+    if not preds:
+        with atomic_path(p) as tmp:
+            joblib.dump(artifact, tmp.as_posix(), compress=0)
+        return p
+
+    originals = [tp.nodes for tp in preds]
+    bounds = np.cumsum([0] + [len(n) for n in originals])
+    # side-car を先に差し替え、本体（offsets を持つ）を最後に
+    with atomic_path(nodes_path_for(p)) as tmp:
+        np.save(tmp, np.concatenate(originals), allow_pickle=False)
+    try:
+        for tp, nodes in zip(preds, originals, strict=True):
+            tp.nodes = nodes[:0]
+        layout = {"tree_nodes": nodes_path_for(p).name, "offsets": bounds.tolist()}
+        with atomic_path(p) as tmp:
+            joblib.dump({**artifact, "layout": layout}, tmp.as_posix(), compress=0)
+    finally:
+        # 呼び出し側のモデルはそのまま使い続けられるように戻す
+        for tp, nodes in zip(preds, originals, strict=True):
+            tp.nodes = nodes
+    return p
+
 
 class SimpleRegModel:
     """回帰モデルのラッパ
@@ -18,10 +68,36 @@ class SimpleRegModel:
         self.model = model
 
     @classmethod
-    def load(cls, path: str) -> "SimpleRegModel":
-        return cls(model=joblib.load(path))
+    def load(cls, path: str, mmap_mode: str | None = None) -> "SimpleRegModel":
+        """mmap_mode="r" なら数値配列を mmap で読み、同じ成果物を読む worker 間でページを共有する
+
+        dump_artifact 形式（side-car あり）は木のノードだけを side-car 1 本の mmap から参照する。
+        それ以外は joblib.load(mmap_mode=...) に任せる。
+        """
+        sidecar = nodes_path_for(path)
+        if not sidecar.is_file():
+            return cls(model=joblib.load(path, mmap_mode=mmap_mode))
+
+        obj = joblib.load(path)
+        layout = obj.get("layout", {}) if isinstance(obj, dict) else {}
+        offsets = layout.get("offsets")
+        if offsets is not None:
+            nodes = np.load(sidecar, mmap_mode=mmap_mode, allow_pickle=False)
+            preds = list(_tree_predictors(obj.get("model")))
+            # 書き出し途中（side-car だけ新しい）に読んだ場合もここで弾く
+            if len(preds) != len(offsets) - 1 or len(nodes) != offsets[-1]:
+                raise ValueError(f"tree node layout mismatch: {path}")
+            for tp, a, b in zip(preds, offsets[:-1], offsets[1:], strict=True):
+                tp.nodes = nodes[a:b]
+        return cls(model=obj)
 
-    def predict(self, df: pd.DataFrame) -> np.ndarray:
+    def predict(self, df: pd.DataFrame, group_cols: Sequence[str] = ()) -> np.ndarray:
+        """group_cols を与えると複数地点を縦積みした df を 1 回の transform/predict で処理する。
+        出力行は FeaturePipeline の並び（date, *group_cols）順。呼び出し側で整列済みにしておく。
+
+        group_cols はライブラリ用途（多地点データのオフライン一括推論・学習結果の検証）向け。
+        API は HistoryAssembler で地点ごとに特徴量化し、predict_features を直接呼ぶ。
+        """
         # 新形式（辞書）
         if isinstance(self.model, dict) and "model" in self.model:
             pipe = self.model.get("pipeline")
@@ -30,19 +106,41 @@ class SimpleRegModel:
             residual = bool(meta.get("residual", False))
 
             if pipe is not None:
-                X = pipe.transform(df)
-            else:
-                X = df[["d0_mean", "d0_min", "d0_max", "d0_prec"]]
-
-            y_hat = reg.predict(X)
+                if group_cols:
+                    pipe = pipe.with_group_cols(group_cols)
+                X = pipe.transform(df, as_array=True)
+                return self.predict_features(X, df[["d_mean", "d_min", "d_max", "d_prec"]])
 
+            y_hat = reg.predict(df[["d0_mean", "d0_min", "d0_max", "d0_prec"]])
             if residual:
                 # df は D0 の日次。d0 を加算して元スケールへ戻す
-                d0 = df[["d_mean", "d_min", "d_max", "d_prec"]].to_numpy()
-                y_hat = y_hat + d0
-
+                y_hat = y_hat + df[["d_mean", "d_min", "d_max", "d_prec"]].to_numpy()
             return np.asarray(y_hat)
 
         # 旧形式
         X = df[["d0_mean", "d0_min", "d0_max", "d0_prec"]]
         return np.asarray(self.model.predict(X))
+
+    @property
+    def pipeline(self) -> Any:
+        """新形式の FeaturePipeline（無ければ None）"""
+        if isinstance(self.model, dict):
+            return self.model.get("pipeline")
+        return None
+
+    def predict_features(self, X: np.ndarray, d0: Any) -> np.ndarray:
+        """pipeline.transform 済みの特徴量行列 (n, p) と D0 の d_*（n, 4）から予測する
+
+        履歴の組み立て/特徴量化をメモ化した呼び出し側（services.history）はこちらを直接使う。
+        """
+        reg = self.model["model"]
+        meta = self.model.get("metadata", {}) or {}
+        # 特徴量名なしで学習したモデル（現行 train.py）には行列をそのまま渡す。
+        # DataFrame で学習した旧成果物は列名検証があるので DataFrame にする
+        if hasattr(reg, "feature_names_in_"):
+            X = pd.DataFrame(X, columns=list(self.pipeline.feature_cols_), copy=False)
+        y_hat = reg.predict(X)
+        if bool(meta.get("residual", False)):
+            # d0 を加算して元スケールへ戻す
+            y_hat = y_hat + np.asarray(d0, dtype=float)
+        return np.asarray(y_hat)
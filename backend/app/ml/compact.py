@@ -0,0 +1,282 @@
+"""学習済み FeaturePipeline + GBDT を NumPy 配列だけの推論バンドルへ書き出す／読み込む
+
+joblib 成果物（pandas・FeaturePipeline・MultiOutputRegressor(HistGradientBoostingRegressor)）を
+ロードせずに推論するための軽量形式。ディレクトリ 1 つに次を置く:
+
+- spec.json: 特徴量設定・列順・residual・木の本数・世代 ID と各配列の形などのメタ情報
+- {name}.{generation}.npy: 中央値/クリップ境界ベクトルと、全ターゲットの木を連結したノード配列
+
+同じディレクトリへの再書き出しは新しい世代のファイルを並べ、spec.json の差し替えで切り替える。
+読み込み側は spec.json が指す世代のファイルだけを開くので、旧世代と新世代の配列が混ざらない。
+
+.npy は np.load(mmap_mode="r") でそのまま mmap できるので、複数ワーカーで同じページを共有する。
+読み込み側（CompactPredictor）は NumPy と app.ml.kernels だけに依存する。
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.atomic_file import atomic_path
+from .kernels import impute_clip, season_terms, series_features
+
+FORMAT_VERSION = 1
+SPEC_FILE = "spec.json"
+COMPACT_SUFFIX = ".compact"
+
+# ノード配列（全ターゲット・全イテレーションの木を連結。left/right は連結後の通し番号）
+_NODE_ARRAYS = ("feature", "threshold", "missing_left", "left", "right", "value")
+_ARRAYS = ("median", "clip_low", "clip_high", "roots", "root_offsets", "baseline") + _NODE_ARRAYS
+
+
+def compact_path_for(artifact_path: Path | str) -> Path:
+    """{stem}_gbdt.joblib -> {stem}_gbdt.compact（同じディレクトリ）"""
+    return Path(artifact_path).with_suffix(COMPACT_SUFFIX)
+
+
+def _array_file(name: str, generation: str | None) -> str:
+    # generation の無い spec は世代導入前のバンドル（{name}.npy）
+    return f"{name}.{generation}.npy" if generation else f"{name}.npy"
+
+
+# --------------------------- 書き出し ------------------------------------------
+
+
+def _flatten_estimators(estimators: Sequence[Any]) -> Tuple[Dict[str, np.ndarray], int]:
+    """HistGradientBoostingRegressor 群の木を連結ノード配列へ（葉は自己ループにする）"""
+    feature: List[np.ndarray] = []
+    threshold: List[np.ndarray] = []
+    missing_left: List[np.ndarray] = []
+    left: List[np.ndarray] = []
+    right: List[np.ndarray] = []
+    value: List[np.ndarray] = []
+    roots: List[int] = []
+    root_offsets = [0]
+    baseline: List[float] = []
+    max_depth = 0
+    offset = 0
+
+    for est in estimators:
+        if getattr(est, "loss", None) != "squared_error":
+            raise ValueError(f"unsupported loss for compact export: {est.loss!r}")
+        if getattr(est, "is_categorical_", None) is not None and np.any(est.is_categorical_):
+            raise ValueError("categorical features are not supported by compact export")
+        baseline.append(float(np.ravel(est._baseline_prediction)[0]))
+        for per_iter in est._predictors:
+            nodes = per_iter[0].nodes
+            n = len(nodes)
+            leaf = nodes["is_leaf"].astype(bool)
+            own = np.arange(offset, offset + n, dtype=np.int32)
+            feature.append(np.where(leaf, 0, nodes["feature_idx"]).astype(np.int32))
+            threshold.append(nodes["num_threshold"].astype(np.float64))
+            missing_left.append(nodes["missing_go_to_left"].astype(bool))
+            # 葉は自分自身を指す -> 深さ分だけ一律に辿っても葉に留まる
+            for dst, key in ((left, "left"), (right, "right")):
+                child = nodes[key].astype(np.int64) + offset
+                dst.append(np.where(leaf, own, child).astype(np.int32))
+            value.append(np.where(leaf, nodes["value"], 0.0).astype(np.float64))
+            roots.append(offset)
+            max_depth = max(max_depth, int(nodes["depth"].max()))
+            offset += n
+        root_offsets.append(len(roots))
+
+    arrays = {
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "missing_left": np.concatenate(missing_left),
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "value": np.concatenate(value),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "root_offsets": np.asarray(root_offsets, dtype=np.int64),
+        "baseline": np.asarray(baseline, dtype=np.float64),
+    }
+    return arrays, max_depth
+
+
+def export_compact(artifact: Dict[str, Any], out_dir: Path | str) -> Path:
+    """train.py の成果物 dict（pipeline/model/metadata）を compact 形式で out_dir に書き出す"""
+    pipe = artifact["pipeline"]
+    model = artifact["model"]
+    meta = artifact.get("metadata", {}) or {}
+    if not pipe.is_fit_:
+        raise ValueError("pipeline is not fit")
+    estimators = getattr(model, "estimators_", None)
+    if estimators is None:
+        raise ValueError(f"unsupported model for compact export: {type(model).__name__}")
+
+    arrays, max_depth = _flatten_estimators(estimators)
+    med, lo, hi = pipe._stat_vectors()
+    arrays.update(median=med, clip_low=lo, clip_high=hi)
+
+    cfg = pipe.config
+    spec = {
+        "format_version": FORMAT_VERSION,
+        "base_cols": list(cfg.base_cols),
+        "date_col": cfg.date_col,
+        "group_cols": list(cfg.group_cols),
+        "ma_windows": list(cfg.ma_windows),
+        "seasonal": bool(cfg.seasonal),
+        "min_periods_ratio": float(cfg.min_periods_ratio),
+        "feature_cols": list(pipe.feature_cols_),
+        "n_targets": len(estimators),
+        "max_depth": max_depth,
+        "residual": bool(meta.get("residual", artifact.get("residual", False))),
+        "metadata": {k: meta[k] for k in ("created_at", "git_sha", "seed") if k in meta},
+        "generation": uuid.uuid4().hex[:12],
+        "shapes": {name: list(np.shape(arrays[name])) for name in _ARRAYS},
+    }
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    # 配列は新しい世代名で書き、最後に spec.json を差し替えて切り替える
+    keep = {SPEC_FILE}
+    for name in _ARRAYS:
+        fname = _array_file(name, spec["generation"])
+        keep.add(fname)
+        with atomic_path(out / fname) as tmp:
+            np.save(tmp, np.ascontiguousarray(arrays[name]), allow_pickle=False)
+    with atomic_path(out / SPEC_FILE) as tmp:
+        tmp.write_text(json.dumps(spec, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 旧世代を掃除（mmap 中の CompactPredictor は unlink 後も旧 inode を読み続ける）
+    for old in out.glob("*.npy"):
+        if old.name not in keep:
+            old.unlink(missing_ok=True)
+    return out
+
+
+# --------------------------- 推論 ----------------------------------------------
+
+
+def _day_of_year(dates: np.ndarray) -> np.ndarray:
+    days = dates.astype("datetime64[D]")
+    return (days - days.astype("datetime64[Y]")).astype(np.int64) + 1
+
+
+def _group_codes(groups: np.ndarray) -> np.ndarray:
+    """グループキー (n,) / (n, g) -> 整数コード。コードの大小はキーの辞書順と一致する"""
+    if groups.ndim == 1:
+        return np.unique(groups, return_inverse=True)[1].ravel()
+    per_col = np.column_stack([np.unique(col, return_inverse=True)[1] for col in groups.T])
+    return np.unique(per_col, axis=0, return_inverse=True)[1].ravel()
+
+
+def _check_shapes(spec: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+    """spec.json に記録した形と実際の配列が食い違えば ValueError（別世代の配列の混入）"""
+    shapes = spec.get("shapes")
+    if shapes is None:
+        return
+    for name, arr in arrays.items():
+        if list(arr.shape) != shapes.get(name):
+            raise ValueError(
+                f"compact bundle is inconsistent: {name} has shape {list(arr.shape)}, "
+                f"spec {spec.get('generation')!r} expects {shapes.get(name)}"
+            )
+
+
+class CompactPredictor:
+    """compact バンドルの純 NumPy 推論器（SimpleRegModel.predict と同じ出力）"""
+
+    def __init__(self, spec: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+        if spec.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported compact format: {spec.get('format_version')!r}")
+        self.spec = spec
+        self.base_cols: Tuple[str, ...] = tuple(spec["base_cols"])
+        self.windows: Tuple[int, ...] = tuple(spec["ma_windows"])
+        self.feature_cols: List[str] = list(spec["feature_cols"])
+        self.residual = bool(spec["residual"])
+        self.max_depth = int(spec["max_depth"])
+        self._a = arrays
+
+    @classmethod
+    def load(cls, path: Path | str, mmap: bool = True) -> "CompactPredictor":
+        """spec.json が指す世代の配列を開く（書き出しと競合したら spec を読み直して再試行）"""
+        p = Path(path)
+        mode = "r" if mmap else None
+        for attempt in range(2):
+            spec = json.loads((p / SPEC_FILE).read_text(encoding="utf-8"))
+            gen = spec.get("generation")
+            try:
+                arrays = {
+                    name: np.load(p / _array_file(name, gen), mmap_mode=mode) for name in _ARRAYS
+                }
+            except FileNotFoundError:
+                # 読んだ spec の世代が開く前に掃除された（直後に新しい spec がある）
+                if attempt == 0:
+                    continue
+                raise
+            _check_shapes(spec, arrays)
+            return cls(spec, arrays)
+        raise AssertionError("unreachable")
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self._a.values()))
+
+    # ---- 特徴量 ---------------------------------------------------------------
+    def features(
+        self, dates: np.ndarray, values: np.ndarray, groups: np.ndarray | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(並べ替え添字, 特徴量行列) を返す。行は FeaturePipeline と同じ (date, group) 順"""
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        x = np.asarray(values, dtype=float).reshape(len(dates), len(self.base_cols))
+        codes = None
+        if groups is not None:
+            codes = _group_codes(np.asarray(groups))
+            order = np.lexsort((codes, dates))
+            codes = codes[order]
+        else:
+            order = np.argsort(dates, kind="stable")
+        dates, x = dates[order], x[order]
+
+        cols = series_features(
+            x, codes, self.base_cols, self.windows, float(self.spec["min_periods_ratio"])
+        )
+        if self.spec["seasonal"]:
+            cols["season_sin"], cols["season_cos"] = season_terms(_day_of_year(dates))
+        X = np.empty((len(x), len(self.feature_cols)))
+        for i, c in enumerate(self.feature_cols):
+            X[:, i] = cols.get(c, np.nan)
+        impute_clip(X, self._a["median"], self._a["clip_low"], self._a["clip_high"])
+        return order, X
+
+    # ---- 木 -------------------------------------------------------------------
+    def raw_predict(self, X: np.ndarray) -> np.ndarray:
+        """特徴量行列 (n, p) -> (n, n_targets)。全行 × 全木を深さ分だけ一斉に辿る"""
+        a = self._a
+        rows = np.arange(len(X))[:, None]
+        idx = np.broadcast_to(a["roots"], (len(X), len(a["roots"])))
+        for _ in range(self.max_depth):
+            xv = X[rows, a["feature"][idx]]
+            go_left = np.where(np.isnan(xv), a["missing_left"][idx], xv <= a["threshold"][idx])
+            idx = np.where(go_left, a["left"][idx], a["right"][idx])
+        leaf = a["value"][idx]
+        starts = np.asarray(a["root_offsets"][:-1])
+        return np.add.reduceat(leaf, starts, axis=1) + a["baseline"]
+
+    def predict(
+        self, dates: np.ndarray, values: np.ndarray, groups: np.ndarray | None = None
+    ) -> np.ndarray:
+        """D0 の日付・base 値（base_cols 順）から翌日予測 (n, n_targets) を返す
+
+        出力行は (date, group) 順。residual モデルは d0 を加算して元スケールへ戻す。
+        """
+        order, X = self.features(dates, values, groups)
+        y = self.raw_predict(X)
+        if self.residual:
+            y = y + np.asarray(values, dtype=float).reshape(len(order), -1)[order]
+        return y
+
+    def predict_frame(self, df: Any, group_cols: Sequence[str] = ()) -> np.ndarray:
+        """SimpleRegModel.predict と同じ入力（D0 の DataFrame）を受ける薄いラッパ"""
+        dates = df[self.spec["date_col"]].to_numpy(dtype="datetime64[ns]")
+        values = df[list(self.base_cols)].to_numpy(dtype=float)
+        groups = None
+        if group_cols:
+            groups = np.column_stack([df[c].to_numpy() for c in group_cols])
+        return self.predict(dates, values, groups)
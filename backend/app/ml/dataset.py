@@ -0,0 +1,277 @@
+"""複数地点（lat/lon）の日次データセットを、地点単位のチャンクで読み書きする
+
+学習データは「地点 × 日」の縦持ち（lat, lon, date, d_mean, d_min, d_max, d_prec）。
+数千セル × 数年分を一度に DataFrame へ載せずに済むよう、ファイルをバッチ単位で読み、
+地点が途中で切れないようにまとめ直したチャンク（地点の完全な系列の集まり）を順に返す。
+ファイル内では地点ごとに行が連続している必要がある（write_dataset はそのように書く）。
+
+Parquet / Arrow(Feather) は pyarrow（pip install '.[parquet]'）があれば使う。無ければ CSV のみ。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# pyarrow は任意依存。無ければ CSV にフォールバック
+try:
+    import pyarrow as pa  # type: ignore[import-not-found]
+    import pyarrow.parquet as pq  # type: ignore[import-not-found]
+
+    _ARROW_AVAILABLE = True
+except Exception:  # ModuleNotFoundError など
+    pa = None  # type: ignore[assignment]
+    pq = None  # type: ignore[assignment]
+    _ARROW_AVAILABLE = False
+
+LOCATION_COLS: Tuple[str, ...] = ("lat", "lon")
+BASE_COLS: Tuple[str, ...] = ("d_mean", "d_min", "d_max", "d_prec")
+
+_SUFFIXES = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".csv": "csv"}
+
+
+def default_format() -> str:
+    return "parquet" if _ARROW_AVAILABLE else "csv"
+
+
+# --------------------------- 合成データ ----------------------------------------
+
+
+def make_synthetic_locations(
+    seed: int = 42, n_locations: int = 100, n_days: int = 365 * 2, start: str = "2024-01-01"
+) -> pd.DataFrame:
+    """地点ごとに気候（平均気温・季節振幅・南北半球の位相）が違う合成日次データ
+
+    行は (lat, lon, date) 順。make_synthetic_daily の多地点版で、オフラインのベンチ用。
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.round(rng.uniform(-60.0, 70.0, n_locations), 2)
+    lon = np.round(rng.uniform(-180.0, 180.0, n_locations), 2)
+    t = np.arange(n_days)
+
+    # (地点, 日) の行列で作って最後に縦持ちへ
+    mean_temp = 28.0 - 0.35 * np.abs(lat)
+    amplitude = 2.0 + 0.2 * np.abs(lat)
+    phase = np.where(lat >= 0, 0.0, np.pi)
+    season = np.sin(2 * np.pi * t[None, :] / 365.25 - np.pi / 2 + phase[:, None])
+    shape = (n_locations, n_days)
+    d_mean = mean_temp[:, None] + amplitude[:, None] * season + rng.normal(0, 2, size=shape)
+    d_min = d_mean - rng.uniform(1, 5, size=shape)
+    d_max = d_mean + rng.uniform(1, 5, size=shape)
+    wet = rng.uniform(0.2, 0.6, n_locations)[:, None]
+    d_prec = rng.gamma(shape=1.2, scale=1.0, size=shape) * (rng.random(shape) < wet)
+
+    df = pd.DataFrame(
+        {
+            "lat": np.repeat(lat, n_days),
+            "lon": np.repeat(lon, n_days),
+            "date": np.tile(pd.date_range(start, periods=n_days, freq="D").to_numpy(), n_locations),
+            "d_mean": d_mean.ravel(),
+            "d_min": d_min.ravel(),
+            "d_max": d_max.ravel(),
+            "d_prec": d_prec.ravel(),
+        }
+    )
+    return df.sort_values([*LOCATION_COLS, "date"], kind="mergesort").reset_index(drop=True)
+
+
+# --------------------------- 書き出し ------------------------------------------
+
+
+def write_dataset(
+    df: pd.DataFrame,
+    out_dir: Path | str,
+    locations_per_file: int = 256,
+    fmt: str | None = None,
+    location_cols: Sequence[str] = LOCATION_COLS,
+) -> List[Path]:
+    """地点単位で分割したファイル群（part-00000.parquet ...）として書き出す
+
+    各ファイル内は (location, date) 順なので、iter_location_chunks でそのまま流し読みできる。
+    """
+    fmt = fmt or default_format()
+    if fmt in ("parquet", "arrow") and not _ARROW_AVAILABLE:
+        raise RuntimeError(f"{fmt} output requires pyarrow (pip install '.[parquet]')")
+    if fmt not in ("parquet", "arrow", "csv"):
+        raise ValueError(f"unknown dataset format: {fmt!r}")
+    keys = [*location_cols, "date"]
+    df = df.sort_values(keys, kind="mergesort")
+    codes = df.groupby(list(location_cols), sort=False).ngroup().to_numpy()
+    bounds = np.flatnonzero(np.diff(codes // max(1, locations_per_file))) + 1
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    suffix = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}[fmt]
+    paths = []
+    for i, part in enumerate(np.split(np.arange(len(df)), bounds)):
+        p = out / f"part-{i:05d}{suffix}"
+        chunk = df.iloc[part]
+        if fmt == "parquet":
+            pq.write_table(pa.Table.from_pandas(chunk, preserve_index=False), p)
+        elif fmt == "arrow":
+            chunk.reset_index(drop=True).to_feather(p)
+        else:
+            chunk.to_csv(p, index=False, date_format="%Y-%m-%d")
+        paths.append(p)
+    return paths
+
+
+# --------------------------- 読み込み ------------------------------------------
+
+
+def dataset_files(source: Path | str) -> List[Path]:
+    """ディレクトリなら対応拡張子のファイルを名前順に（サブディレクトリも含む）"""
+    p = Path(source)
+    if p.is_file():
+        return [p]
+    files = sorted(f for f in p.rglob("*") if f.is_file() and f.suffix in _SUFFIXES)
+    if not files:
+        raise FileNotFoundError(f"no dataset files (*.parquet, *.arrow, *.csv) under {p}")
+    return files
+
+
+def _read_batches(path: Path, columns: List[str], batch_rows: int) -> Iterator[pd.DataFrame]:
+    fmt = _SUFFIXES.get(path.suffix)
+    if fmt in ("parquet", "arrow") and not _ARROW_AVAILABLE:
+        raise RuntimeError(f"reading {path.name} requires pyarrow (pip install '.[parquet]')")
+    if fmt == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == "arrow":
+        with pa.memory_map(str(path)) as src:
+            reader = pa.ipc.open_file(src)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(columns).to_pandas()
+    elif fmt == "csv":
+        yield from pd.read_csv(path, usecols=columns, parse_dates=["date"], chunksize=batch_rows)
+    else:
+        raise ValueError(f"unsupported dataset file: {path}")
+
+
+def _location_runs(
+    df: pd.DataFrame, location_cols: Sequence[str]
+) -> Tuple[List[tuple], np.ndarray]:
+    """連続する地点ごとの (キー, 開始行) 。df は地点ごとに行が連続している前提"""
+    loc = df[list(location_cols)].to_numpy()
+    change = np.ones(len(df), dtype=bool)
+    change[1:] = (loc[1:] != loc[:-1]).any(axis=1)
+    starts = np.flatnonzero(change)
+    keys = [tuple(row) for row in loc[starts].tolist()]
+    return keys, starts
+
+
+def iter_location_chunks(
+    source: Path | str | Iterable[Path | str],
+    chunk_rows: int = 1_000_000,
+    batch_rows: int = 65_536,
+    location_cols: Sequence[str] = LOCATION_COLS,
+    base_cols: Sequence[str] = BASE_COLS,
+) -> Iterator[pd.DataFrame]:
+    """データセットを地点の完全な系列単位でまとめたチャンク（約 chunk_rows 行）で返す
+
+    バッチ末尾の地点は次のバッチへ続くかもしれないので持ち越す。同じ地点が離れた位置
+    （別ファイル・同ファイルの離れた行）に再登場したら ValueError（系列が分断されるため）。
+    """
+    if isinstance(source, (str, Path)):
+        files = dataset_files(source)
+    else:
+        files = [Path(f) for f in source]
+    columns = [*location_cols, "date", *base_cols]
+    seen: set = set()
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+
+    def _complete(part: pd.DataFrame, keys: List[tuple]) -> None:
+        nonlocal pending_rows
+        dup = seen.intersection(keys) or {k for k in keys if keys.count(k) > 1}
+        if dup:
+            raise ValueError(
+                f"rows for location {min(dup)} are not contiguous; "
+                f"sort the dataset by {list(location_cols)}"
+            )
+        seen.update(keys)
+        pending.append(part)
+        pending_rows += len(part)
+
+    for path in files:
+        carry: pd.DataFrame | None = None
+        for batch in _read_batches(path, columns, batch_rows):
+            if carry is not None:
+                batch = pd.concat([carry, batch], ignore_index=True)
+            keys, starts = _location_runs(batch, location_cols)
+            if not keys:
+                continue
+            # 最後の地点は次のバッチに続くかもしれない
+            cut = int(starts[-1])
+            carry = batch.iloc[cut:]
+            if cut > 0:
+                _complete(batch.iloc[:cut], keys[:-1])
+            if pending_rows >= chunk_rows:
+                yield _finish(pending)
+                pending, pending_rows = [], 0
+        # ファイル末尾 = 地点の終わり（地点はファイルをまたがない）
+        if carry is not None and len(carry):
+            _complete(carry, _location_runs(carry, location_cols)[0])
+        if pending_rows >= chunk_rows:
+            yield _finish(pending)
+            pending, pending_rows = [], 0
+    if pending:
+        yield _finish(pending)
+
+
+def _finish(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    df = pd.concat(parts, ignore_index=True)
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def next_day_targets(
+    df: pd.DataFrame,
+    location_cols: Sequence[str] = LOCATION_COLS,
+    base_cols: Sequence[str] = BASE_COLS,
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """(date, location) 順に並べた df と、各行の翌日値 (n, len(base_cols))
+
+    翌日の行が無い（系列末尾・欠測日）行の目的変数は NaN。
+    """
+    df = df.sort_values(["date", *location_cols], kind="mergesort").reset_index(drop=True)
+    g = df.groupby(list(location_cols), sort=False)
+    nxt = g[list(base_cols)].shift(-1).to_numpy()
+    gap = g["date"].shift(-1) - df["date"]
+    nxt[(gap != pd.Timedelta(days=1)).to_numpy()] = np.nan
+    return df, nxt
+
+
+# --------------------------- CLI ---------------------------------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic multi-location daily dataset")
+    parser.add_argument("out_dir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-locations", type=int, default=1000)
+    parser.add_argument("--n-days", type=int, default=365 * 2)
+    parser.add_argument("--locations-per-file", type=int, default=256)
+    parser.add_argument("--format", choices=["parquet", "arrow", "csv"], default=None)
+    args = parser.parse_args()
+
+    df = make_synthetic_locations(args.seed, args.n_locations, args.n_days)
+    paths = write_dataset(df, args.out_dir, args.locations_per_file, args.format)
+    info: Dict[str, object] = {
+        "out_dir": Path(args.out_dir).as_posix(),
+        "files": len(paths),
+        "rows": len(df),
+        "locations": args.n_locations,
+        "format": args.format or default_format(),
+    }
+    print(json.dumps(info, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""学習用の生特徴量行列（FeaturePipeline.raw_matrix）のキャッシュ
+
+CV の各 fold・ハイパラ探索の各候補・全期間 refit は、同じ系列から同じ lag/MA を作り直していた。
+特徴量は因果的なので全期間で 1 回作れば足りる。入力データと特徴量設定の内容ハッシュをキーに、
+プロセス内（メモリ）とディスク（.npz）の 2 段でキャッシュし、同じデータでの再学習では
+特徴量生成そのものを省く。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..utils.atomic_file import atomic_path
+from .features import FeaturePipeline, FeaturePipelineConfig
+
+# 特徴量の計算方法を変えたら上げる（古いディスクキャッシュを無効化）
+FEATURE_CACHE_VERSION = 1
+
+# プロセス内メモの上限件数（行列ごと抱えるので小さく。超えたら古いものから捨てる）
+FEATURE_MEMO_MAX_ENTRIES = int(os.getenv("FEATURE_MEMO_MAX_ENTRIES", "4"))
+
+RawFeatures = Tuple[np.ndarray, List[str]]
+
+_memo: "OrderedDict[str, RawFeatures]" = OrderedDict()
+
+
+def content_key(df: pd.DataFrame, config: FeaturePipelineConfig) -> str:
+    """入力列（date, group_cols, base_cols）の中身と特徴量設定から決まるキー"""
+    cols = [config.date_col, *config.group_cols, *config.base_cols]
+    h = hashlib.sha256()
+    h.update(json.dumps([FEATURE_CACHE_VERSION, asdict(config)], default=list).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    return h.hexdigest()[:32]
+
+
+def _load(path: Path) -> RawFeatures | None:
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return np.array(z["X"]), [str(c) for c in z["columns"]]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save(path: Path, raw: RawFeatures) -> None:
+    # 書きかけを読まれないように一時ファイル → os.replace
+    with atomic_path(path) as tmp:
+        np.savez(tmp, X=raw[0], columns=np.array(raw[1]))
+
+
+def raw_features(
+    df: pd.DataFrame,
+    config: FeaturePipelineConfig | None = None,
+    cache_dir: Path | str | None = None,
+) -> RawFeatures:
+    """df 全体の生特徴量行列と列名（メモリ → ディスク → 計算 の順に探す）"""
+    config = config or FeaturePipelineConfig()
+    key = content_key(df, config)
+    hit = _memo.get(key)
+    if hit is not None:
+        _memo.move_to_end(key)
+        return hit
+
+    path = Path(cache_dir) / f"features_{key}.npz" if cache_dir is not None else None
+    raw = _load(path) if path is not None and path.is_file() else None
+    if raw is None:
+        raw = FeaturePipeline(config).raw_matrix(df)
+        if path is not None:
+            _save(path, raw)
+    # fold/候補間で共有するので読み取り専用にしておく
+    raw[0].setflags(write=False)
+    _memo[key] = raw
+    while len(_memo) > max(1, FEATURE_MEMO_MAX_ENTRIES):
+        _memo.popitem(last=False)
+    return raw
+
+
+def clear_memo() -> None:
+    _memo.clear()
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Hashable, List, Mapping, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 from pandas.api.types import is_datetime64_any_dtype
 
+from .kernels import impute_clip, season_terms, series_features
+
 
 @dataclass
 class FeaturePipelineConfig:
@@ -33,63 +35,76 @@ class FeaturePipeline:
 
     # ---- public API ---------------------------------------------------------
     def fit(self, df: pd.DataFrame) -> "FeaturePipeline":
+        return self.fit_matrix(*self.raw_matrix(df))
+
+    def raw_matrix(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+        """欠損埋め/クリップ前の特徴量行列 (n, p) と列名（行は (date, group_cols) 順）
+
+        lag/MA は過去側しか見ない（因果的）ので、先頭 k 行の部分行列は df の先頭 k 行だけから
+        作った行列と一致する。CV では全期間で 1 回作り、fold ごとに fit_matrix し直せばよい。
+        """
         df = self._validate_and_copy(df)
-        feat = self._add_features(df)
-        # 学習データの統計量を記録（欠損/外れ値対策）
-        self.medians_ = {
-            c: float(
-                np.nanmedian(
-                    # ExtensionArray を避け、必ず float ndarray に統一
-                    pd.to_numeric(feat[c], errors="coerce").to_numpy(dtype=float, copy=False)
-                )
-            )
-            for c in feat.columns
-            if c not in self._id_cols
-        }
+        arrays = self._feature_arrays(df)
+        cols = list(arrays)
+        X = np.empty((len(df), len(cols)))
+        for i, c in enumerate(cols):
+            X[:, i] = arrays[c]
+        return X, cols
+
+    def fit_matrix(self, X: np.ndarray, columns: Sequence[str]) -> "FeaturePipeline":
+        """raw_matrix の出力から学習時統計量（欠損/外れ値対策）を記録する"""
+        X = np.asarray(X, dtype=float)
         loq, hiq = self.config.clip_quantiles
+        med = np.nanmedian(X, axis=0)
+        lo = np.nanquantile(X, loq, axis=0)
+        hi = np.nanquantile(X, hiq, axis=0)
+        self.medians_ = {c: float(m) for c, m in zip(columns, med, strict=True)}
         self.clip_bounds_ = {
-            c: (
-                float(np.nanquantile(feat[c].values, loq)),
-                float(np.nanquantile(feat[c].values, hiq)),
-            )
-            for c in feat.columns
-            if c not in self._id_cols
+            c: (float(a), float(b)) for c, a, b in zip(columns, lo, hi, strict=True)
         }
         # 学習時に使用する最終列集合（ID列を除く）
-        self.feature_cols_ = [c for c in feat.columns if c not in self._id_cols]
+        self.feature_cols_ = list(columns)
         self.is_fit_ = True
         return self
 
-    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+    def transform_matrix(self, X: np.ndarray) -> np.ndarray:
+        """raw_matrix の出力（列は feature_cols_ 順）に欠損埋め→クリップを掛けた新しい行列"""
         if not self.is_fit_:
             raise RuntimeError("FeaturePipeline is not fit yet. Call fit() first.")
-        df = self._validate_and_copy(df)
-        feat = self._add_features(df)
+        return impute_clip(np.array(X, dtype=float, order="C"), *self._stat_vectors())
 
-        # 1) 欠損埋め（学習時中央値）
-        for c, m in self.medians_.items():
-            if c in feat.columns:
-                feat[c] = feat[c].fillna(m)
+    def transform(self, df: pd.DataFrame, as_array: bool = False) -> pd.DataFrame | np.ndarray:
+        """学習時と同じ列順の特徴量を返す。as_array=True なら (n, 特徴量数) の float64 行列"""
+        if not self.is_fit_:
+            raise RuntimeError("FeaturePipeline is not fit yet. Call fit() first.")
+        df = self._validate_and_copy(df)
+        X = self._feature_matrix(df)
 
-        # 2) 外れ値クリップ（学習時分位）
-        for c, (lo, hi) in self.clip_bounds_.items():
-            if c in feat.columns:
-                feat[c] = feat[c].clip(lower=lo, upper=hi)
+        # 欠損埋め（学習時中央値）→ 外れ値クリップ（学習時分位）を行列上でまとめて 1 回
+        impute_clip(X, *self._stat_vectors())
 
-        # 学習時と同じ列順へ（不足列は作成、余剰列は削除）
-        for c in self.feature_cols_:
-            if c not in feat.columns:
-                # あり得ないが堅牢性確保：欠損列は中央値で追加
-                feat[c] = self.medians_.get(c, 0.0)
-        feat = feat[self.feature_cols_].copy()
+        if as_array:
+            return X
+        return pd.DataFrame(X, columns=list(self.feature_cols_), copy=False)
 
-        # 数値化の最終チェック
-        for c in feat.columns:
-            feat[c] = pd.to_numeric(feat[c], errors="coerce").fillna(self.medians_.get(c, 0.0))
+    def with_group_cols(self, group_cols: Sequence[str]) -> "FeaturePipeline":
+        """学習済み統計量を共有したまま group_cols だけ差し替えたパイプラインを返す
+        （単系列で学習したモデルに複数地点を縦積みして一括推論する用途）"""
+        return replace(self, config=replace(self.config, group_cols=tuple(group_cols)))
 
-        return feat
+    def incremental(self) -> "IncrementalFeatureTransformer":
+        """1 日ずつ追記しながら特徴量行を得るストリーミング変換器を返す"""
+        return IncrementalFeatureTransformer(self)
 
     # ---- helpers ------------------------------------------------------------
+    def _stat_vectors(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """feature_cols_ 順の (中央値, 下限, 上限) ベクトル。未定義の境界は ±inf"""
+        cols = self.feature_cols_
+        med = np.array([self.medians_.get(c, 0.0) for c in cols], dtype=float)
+        lo = np.array([self.clip_bounds_.get(c, (np.nan, np.nan))[0] for c in cols], dtype=float)
+        hi = np.array([self.clip_bounds_.get(c, (np.nan, np.nan))[1] for c in cols], dtype=float)
+        return med, np.where(np.isnan(lo), -np.inf, lo), np.where(np.isnan(hi), np.inf, hi)
+
     @property
     def _id_cols(self) -> Tuple[str, ...]:
         return (self.config.date_col,) + self.config.group_cols
@@ -99,14 +114,15 @@ class FeaturePipeline:
         return (max(self.config.ma_windows) if self.config.ma_windows else 0) + 1
 
     def _validate_and_copy(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+        # 入力は書き換えない（日付変換は assign、並べ替えは sort_values が新しい df を返す）
         miss = [c for c in (self._id_cols + self.config.base_cols) if c not in df.columns]
         if miss:
             raise ValueError(f"missing columns: {miss}")
         # 型・並び
         # pandas の dtype 判定APIは ExtensionDtype も安全に扱える
         if not is_datetime64_any_dtype(df[self.config.date_col]):
-            df[self.config.date_col] = pd.to_datetime(df[self.config.date_col], errors="coerce")
+            date_col = self.config.date_col
+            df = df.assign(**{date_col: pd.to_datetime(df[date_col], errors="coerce")})
         if df[self.config.date_col].isna().any():
             raise ValueError("date column contains NaT after parsing")
         # 並び順（リーク防止のため古い→新しい）
@@ -114,39 +130,134 @@ class FeaturePipeline:
         df = df.sort_values(sort_keys, kind="mergesort").reset_index(drop=True)
         return df
 
-    def _add_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _group_codes(self, df: pd.DataFrame) -> np.ndarray | None:
+        gcols = list(self.config.group_cols)
+        if not gcols:
+            return None
+        return df.groupby(gcols, sort=False, dropna=False).ngroup().to_numpy()
+
+    def _feature_arrays(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """特徴量名 -> 1 次元配列（ID 列を除く、列順は学習時の feature_cols_ と同じ）"""
         cfg = self.config
+        # 全 base 列を 1 枚の (n, k) 行列にし、lag/diff/MA を全地点まとめて一括計算
+        x = df[list(cfg.base_cols)].to_numpy(dtype=float)
+        cols = series_features(
+            x, self._group_codes(df), cfg.base_cols, cfg.ma_windows, cfg.min_periods_ratio
+        )
+        # 季節性（年サイクル）
+        if cfg.seasonal:
+            doy = df[cfg.date_col].dt.dayofyear.to_numpy(dtype=float)
+            cols["season_sin"], cols["season_cos"] = season_terms(doy)
+        return cols
+
+    def _feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """feature_cols_ 順の C 連続 float64 行列（学習時に無い列は NaN → 後段で中央値）"""
+        arrays = self._feature_arrays(df)
+        X = np.empty((len(df), len(self.feature_cols_)))
+        for i, c in enumerate(self.feature_cols_):
+            X[:, i] = arrays.get(c, np.nan)
+        return X
+
+
+class IncrementalFeatureTransformer:
+    """学習済み FeaturePipeline のストリーミング版（推論時の 1 日追記用）
+
+    グループ（地点）ごとに直近 required_history_days() 日ぶんの base 値をリングバッファで保持し、
+    新しい 1 日を追記するたびに その日の特徴量行を O(max(ma_windows)) で返す。
+    出力はバッチ transform() の該当行と一致する（MA の丸め誤差の範囲）。
+    日付はグループ内で単調増加で追記すること（transform と同じく「前の行」= 前日とみなす）。
+    """
+
+    def __init__(self, pipeline: FeaturePipeline) -> None:
+        if not pipeline.is_fit_:
+            raise RuntimeError("FeaturePipeline is not fit yet. Call fit() first.")
+        cfg = pipeline.config
+        self.pipeline = pipeline
+        self.capacity = pipeline.required_history_days()
+        self._n_base = len(cfg.base_cols)
+        self._windows = [
+            (w, max(1, int(np.ceil(w * cfg.min_periods_ratio)))) for w in cfg.ma_windows
+        ]
+        # group -> [値のリングバッファ (capacity, n_base), 次の書き込み位置, 件数, 最終日付]
+        self._buffers: Dict[Hashable, List[Any]] = {}
+        self._med, self._lo, self._hi = pipeline._stat_vectors()
+        # 特徴量列名 -> feature_cols_ 上の位置
+        self._pos = {c: i for i, c in enumerate(pipeline.feature_cols_)}
+
+    def reset(self, group: Hashable | None = None) -> None:
+        if group is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(group, None)
+
+    def history(self, group: Hashable = ()) -> np.ndarray:
+        """保持中の base 値（古い → 新しい）。shape=(件数, len(base_cols))"""
+        buf = self._buffers.get(group)
+        if buf is None:
+            return np.empty((0, self._n_base))
+        ring, head, count, _ = buf
+        idx = (head - count + np.arange(count)) % self.capacity
+        return ring[idx]
+
+    def update(
+        self, day: Any, values: Mapping[str, float] | Sequence[float], group: Hashable = ()
+    ) -> np.ndarray:
+        """group に day の base 値を追記し、その日の特徴量行（feature_cols_ 順）を返す"""
+        cfg = self.pipeline.config
+        ts = pd.Timestamp(day)
+        if isinstance(values, Mapping):
+            x = np.array([values[c] for c in cfg.base_cols], dtype=float)
+        else:
+            x = np.asarray(values, dtype=float).reshape(self._n_base)
+
+        buf = self._buffers.get(group)
+        if buf is None:
+            buf = [np.full((self.capacity, self._n_base), np.nan), 0, 0, None]
+            self._buffers[group] = buf
+        ring, head, count, last = buf
+        if last is not None and ts <= last:
+            raise ValueError(f"dates must be strictly increasing per group: {ts} <= {last}")
+
+        prev = self.history(group)  # 追記前の履歴（古い → 新しい）
+        row = self._row(ts, x, prev)
+
+        ring[head] = x
+        buf[1] = (head + 1) % self.capacity
+        buf[2] = min(count + 1, self.capacity)
+        buf[3] = ts
+        return row
+
+    def update_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """df（date, group_cols, base_cols）を並び順どおりに追記し、transform と同じ形で返す"""
+        cfg = self.pipeline.config
+        df = self.pipeline._validate_and_copy(df)
         gcols = list(cfg.group_cols)
-        out = df[[cfg.date_col, *gcols, *cfg.base_cols]].copy()
-
-        # lag1, diff1, moving average（shift(1)で当日リーク防止）
-        for col in cfg.base_cols:
-            # groupby対応（位置単位で系列特徴を作る）
-            if gcols:
-                lag1 = out.groupby(gcols, group_keys=False)[col].shift(1)
-                out[f"{col}_lag1"] = lag1
-                out[f"{col}_diff1"] = out[col] - lag1
-                for w in cfg.ma_windows:
-                    mp = max(1, int(np.ceil(w * cfg.min_periods_ratio)))
-                    out[f"{col}_ma{w}"] = (
-                        out.groupby(gcols, group_keys=False)[col]
-                        .shift(1)
-                        .rolling(window=w, min_periods=mp)
-                        .mean()
-                    )
-            else:
-                lag1 = out[col].shift(1)
-                out[f"{col}_lag1"] = lag1
-                out[f"{col}_diff1"] = out[col] - lag1
-                for w in cfg.ma_windows:
-                    mp = max(1, int(np.ceil(w * cfg.min_periods_ratio)))
-                    out[f"{col}_ma{w}"] = out[col].shift(1).rolling(window=w, min_periods=mp).mean()
+        keys = list(df[gcols].itertuples(index=False, name=None)) if gcols else [()] * len(df)
+        vals = df[list(cfg.base_cols)].to_numpy(dtype=float)
+        dates = df[cfg.date_col].to_numpy()
+        rows = [self.update(dates[i], vals[i], keys[i]) for i in range(len(df))]
+        out = np.vstack(rows) if rows else np.empty((0, len(self.pipeline.feature_cols_)))
+        return pd.DataFrame(out, columns=self.pipeline.feature_cols_)
 
-        # 季節性（年サイクル）
+    def _row(self, ts: pd.Timestamp, x: np.ndarray, prev: np.ndarray) -> np.ndarray:
+        cfg = self.pipeline.config
+        raw: Dict[str, float] = {}
+        lag = prev[-1] if len(prev) else np.full(self._n_base, np.nan)
+        for j, col in enumerate(cfg.base_cols):
+            raw[col] = x[j]
+            raw[f"{col}_lag1"] = lag[j]
+            raw[f"{col}_diff1"] = x[j] - lag[j]
+            for w, mp in self._windows:
+                win = prev[-w:, j]
+                ok = win[~np.isnan(win)]
+                raw[f"{col}_ma{w}"] = float(ok.mean()) if ok.size >= mp else np.nan
         if cfg.seasonal:
-            doy = out[cfg.date_col].dt.dayofyear.astype(float)
-            two_pi = 2.0 * np.pi
-            out["season_sin"] = np.sin(two_pi * doy / 365.25)
-            out["season_cos"] = np.cos(two_pi * doy / 365.25)
+            raw["season_sin"], raw["season_cos"] = season_terms(float(ts.dayofyear))
 
-        return out
+        out = self._med.copy()  # 学習時に無い列は中央値
+        for name, v in raw.items():
+            i = self._pos.get(name)
+            if i is not None:
+                out[i] = v
+        # transform と同じ順: 欠損埋め → クリップ
+        return impute_clip(out, self._med, self._lo, self._hi)
@@ -0,0 +1,100 @@
+"""特徴量計算の NumPy カーネル（pandas/sklearn に依存しない）
+
+FeaturePipeline（学習・推論）と compact 推論バンドル（app.ml.compact）の両方がここを使うので、
+両者の特徴量は同じ計算で作られる。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+
+def group_positions(codes: np.ndarray | None, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(グループ連続順への並べ替え添字, グループ内の通し番号) を返す
+
+    行は (date, group) 順に並んでいる前提。安定ソートでグループをまとめるので、
+    グループ内は日付順のまま。codes=None は全行で 1 グループ。
+    """
+    if codes is None:
+        idx = np.arange(n)
+        return idx, idx
+    order = np.argsort(codes, kind="stable")
+    sc = codes[order]
+    starts = np.flatnonzero(np.r_[True, sc[1:] != sc[:-1]]) if n else np.empty(0, int)
+    pos = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    return order, pos
+
+
+def lag_features(
+    x: np.ndarray,
+    order: np.ndarray,
+    pos: np.ndarray,
+    windows: Sequence[int],
+    min_periods_ratio: float,
+) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
+    """(n, k) 行列から lag1 と「前 w 日」の移動平均を全列・全グループまとめて計算
+
+    order/pos は group_positions の戻り値。各グループの前に max(w) 行の欠損を挟んだ配列へ
+    詰め直すので、lag L は単なるスライスになり、グループ境界をまたいだ参照は起きない。
+    MA は lag 1..max(w) を順に足し込むだけ（累積和の差分を使わないので誤差が溜まらない）。
+    戻り値は x と同じ行順。
+    """
+    n, k = x.shape
+    max_w = max(windows) if windows else 1
+    # 元の行 -> 詰め直し後の行
+    slot = np.empty(n, dtype=np.intp)
+    slot[order] = np.arange(n) + max_w * np.cumsum(pos == 0)
+    m = int(slot.max()) + 1 if n else 0
+    padded = np.full((m, k), np.nan)
+    padded[slot] = x
+
+    valid = ~np.isnan(padded)
+    values = np.where(valid, padded, 0.0)
+    ok = valid.astype(float)
+    total = np.zeros((m, k))
+    count = np.zeros((m, k))
+    mas: Dict[int, np.ndarray] = {}
+    for lag in range(1, max_w + 1):
+        total[lag:] += values[:-lag]
+        count[lag:] += ok[:-lag]
+        if lag in windows:
+            mp = max(1, int(np.ceil(lag * min_periods_ratio)))
+            ma = np.divide(total, count, out=np.full((m, k), np.nan), where=count >= mp)
+            mas[lag] = np.take(ma, slot, axis=0)
+    return np.take(padded, slot - 1, axis=0), mas
+
+
+def series_features(
+    x: np.ndarray,
+    codes: np.ndarray | None,
+    base_cols: Sequence[str],
+    windows: Sequence[int],
+    min_periods_ratio: float,
+) -> Dict[str, np.ndarray]:
+    """base 値 (n, k) -> {列名: 1 次元配列}（base, lag1, diff1, ma{w} の順）"""
+    order, pos = group_positions(codes, len(x))
+    lag1, mas = lag_features(x, order, pos, windows, min_periods_ratio)
+    cols: Dict[str, np.ndarray] = {}
+    for j, col in enumerate(base_cols):
+        cols[col] = x[:, j]
+        cols[f"{col}_lag1"] = lag1[:, j]
+        cols[f"{col}_diff1"] = x[:, j] - lag1[:, j]
+        for w in windows:
+            cols[f"{col}_ma{w}"] = mas[w][:, j]
+    return cols
+
+
+def season_terms(day_of_year: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """年サイクルの (sin, cos)"""
+    doy = np.asarray(day_of_year, dtype=float)
+    two_pi = 2.0 * np.pi
+    return np.sin(two_pi * doy / 365.25), np.cos(two_pi * doy / 365.25)
+
+
+def impute_clip(X: np.ndarray, med: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """欠損埋め（中央値）→ 外れ値クリップを X 上でまとめて 1 回（in-place）"""
+    np.copyto(X, med, where=np.isnan(X))
+    np.clip(X, lo, hi, out=X)
+    return X
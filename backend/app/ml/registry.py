@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .baseline import SimpleRegModel
+
+logger = logging.getLogger(__name__)
+
+# 学習済み成果物の置き場（train.py の --models-dir 既定と同じ backend/models）
+DEFAULT_MODELS_DIR = Path(__file__).resolve().parents[2] / "models"
+ARTIFACT_GLOB = "*_gbdt.joblib"
+
+# 成果物の数値配列を mmap で読む（"r"）。同じ成果物を読む uvicorn worker 間でページを共有する。
+# 空文字 / "none" で通常ロード
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r").strip().lower()
+if MODEL_MMAP_MODE in ("", "none", "off"):
+    MODEL_MMAP_MODE = None
+
+# 新しい成果物を監視する間隔[s]（0 で無効）
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "30"))
+
+# MODEL_BACKEND の取り得る値
+BACKEND_PERSISTENCE = "persistence"
+BACKEND_REGRESSION = "regression"
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    """レジストリに載る 1 モデル（ロード済み・ウォームアップ済み）"""
+
+    backend: str
+    version: str
+    path: str
+    model: SimpleRegModel
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # ロード時点のファイル更新時刻と inode（同名の差し替えを検知する）。
+    # 成果物は一時ファイル → os.replace で書く（dump_artifact）ので、差し替え後も旧 inode を
+    # mmap している旧版はそのまま使える。同じ inode への上書き（cp 等）は旧版を壊す
+    mtime_ns: int = 0
+    inode: int = 0
+    loaded_at: float = field(default_factory=time.time)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "version": self.version,
+            "path": self.path,
+            "git_sha": self.metadata.get("git_sha"),
+            "created_at": self.metadata.get("created_at"),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def _artifact_version(path: Path) -> str:
+    # {YYYYMMDD}_{gitSHA}_gbdt.joblib -> "{YYYYMMDD}_{gitSHA}_gbdt"
+    return path.stem
+
+
+def find_latest_artifact(models_dir: Path | str = DEFAULT_MODELS_DIR) -> Path | None:
+    """models_dir 内で最新の GBDT 成果物（ファイル名の日付プレフィクス順）を返す"""
+    d = Path(models_dir)
+    if not d.is_dir():
+        return None
+    candidates = sorted(d.glob(ARTIFACT_GLOB), key=lambda p: p.name)
+    return candidates[-1] if candidates else None
+
+
+def resolve_artifact_path() -> Path | None:
+    """MODEL_PATH（明示指定）→ MODELS_DIR の最新成果物 の順に解決"""
+    explicit = os.getenv("MODEL_PATH")
+    if explicit and Path(explicit).is_file():
+        return Path(explicit)
+    return find_latest_artifact(os.getenv("MODELS_DIR", DEFAULT_MODELS_DIR.as_posix()))
+
+
+def _warmup_frame() -> pd.DataFrame:
+    """ウォームアップ用の 1 行 D0 入力（値はもっともらしい定数で十分）"""
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime([date.today()]),
+            "d_mean": [15.0],
+            "d_min": [10.0],
+            "d_max": [20.0],
+            "d_prec": [0.0],
+        }
+    )
+
+
+def warmup(model: SimpleRegModel) -> np.ndarray:
+    """ウォームアップ兼スモーク推論
+
+    sklearn/pandas の遅延初期化を起動時に済ませ（初回リクエストのレイテンシ対策）、
+    出力が (1, 4)（mean, min, max, prec）の有限値でなければ ValueError。
+    """
+    y = np.asarray(model.predict(_warmup_frame()), dtype=float)
+    if y.ndim != 2 or y.shape[0] != 1 or y.shape[1] < 4 or not np.isfinite(y).all():
+        raise ValueError(f"smoke prediction failed: shape={y.shape}")
+    return y
+
+
+class ModelRegistry:
+    """プロセス全体で共有するモデルレジストリ
+
+    - キーは (MODEL_BACKEND, version)
+    - backend ごとに「アクティブ版」を 1 つ持ち、推論はそれを参照する
+    - ロードは起動時（preload）に行い、リクエスト経路では joblib.load しない
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str], ModelEntry] = {}
+        self._active: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._preloaded = False
+        # ホットリロード（ModelWatcher から呼ばれる）
+        self._reload_lock = threading.Lock()
+        self._failed: Set[Tuple[str, int]] = set()
+        self.reloads = 0
+        self.reload_failures = 0
+
+    # ---- 登録/参照 -----------------------------------------------------------
+    def register(self, entry: ModelEntry, *, activate: bool = True) -> None:
+        with self._lock:
+            self._entries[(entry.backend, entry.version)] = entry
+            if activate:
+                self._active[entry.backend] = entry.version
+
+    def get(self, backend: str, version: str | None = None) -> ModelEntry | None:
+        """version 省略時はアクティブ版を返す（未登録なら None）"""
+        v = version if version is not None else self._active.get(backend)
+        if v is None:
+            return None
+        return self._entries.get((backend, v))
+
+    def versions(self, backend: str) -> List[str]:
+        return sorted(v for (b, v) in self._entries if b == backend)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._active.clear()
+            self._preloaded = False
+            self._failed.clear()
+            self.reloads = 0
+            self.reload_failures = 0
+
+    # ---- ロード ---------------------------------------------------------------
+    def load_artifact(
+        self, path: Path | str, *, backend: str = BACKEND_REGRESSION, activate: bool = True
+    ) -> ModelEntry:
+        """成果物をロード → ウォームアップ推論 → 登録（失敗時は例外を送出し、登録しない）"""
+        p = Path(path)
+        st = p.stat()
+        model = SimpleRegModel.load(p.as_posix(), mmap_mode=MODEL_MMAP_MODE)
+        warmup(model)
+        meta: Dict[str, Any] = {}
+        if isinstance(model.model, dict):
+            meta = dict(model.model.get("metadata") or {})
+        entry = ModelEntry(
+            backend=backend,
+            version=_artifact_version(p),
+            path=p.as_posix(),
+            model=model,
+            metadata=meta,
+            mtime_ns=st.st_mtime_ns,
+            inode=st.st_ino,
+        )
+        self.register(entry, activate=activate)
+        return entry
+
+    def preload(self) -> ModelEntry | None:
+        """起動時に 1 度だけ最新成果物をロードする（2 回目以降は no-op）
+
+        ロードに失敗してもプロセスは落とさず、推論は persistence にフォールバックする。
+        """
+        with self._lock:
+            if self._preloaded:
+                return self.get(BACKEND_REGRESSION)
+            self._preloaded = True
+
+        path = resolve_artifact_path()
+        if path is None:
+            logger.warning("model registry: no artifact found; using persistence")
+            return None
+        try:
+            return self.load_artifact(path, backend=BACKEND_REGRESSION)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("model registry: failed to load %s (%s)", path, e)
+            # 同じファイルを ModelWatcher が再試行しないように覚えておく
+            self._remember_failure(path)
+            return None
+
+    def resolve(self, backend: str) -> ModelEntry | None:
+        """MODEL_BACKEND に対応するアクティブモデル（persistence / 未ロードなら None）"""
+        if backend == BACKEND_PERSISTENCE:
+            return None
+        if not self._preloaded:
+            # startup フックを通らない実行形態（TestClient 直呼び等）の保険
+            self.preload()
+        return self.get(backend)
+
+    def reload_if_changed(self, backend: str = BACKEND_REGRESSION) -> ModelEntry | None:
+        """最新の成果物がアクティブ版と違えばロード・検証してから差し替える
+
+        ロード/スモーク推論はこの呼び出しスレッドで行い、成功したときだけアクティブ参照を
+        1 回の代入で切り替える。処理中のリクエストは取得済みの旧 ModelEntry を使い切る。
+        失敗した (path, mtime) は覚えておき、ファイルが更新されるまで再試行しない。
+        戻り値は新しくアクティブになった版（変化なし/失敗なら None）。
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return None  # 別スレッドでリロード中
+        try:
+            path = resolve_artifact_path()
+            if path is None:
+                return None
+            try:
+                key = (path.as_posix(), path.stat().st_mtime_ns)
+            except OSError:
+                return None
+            current = self.get(backend)
+            if current is not None and (current.path, current.mtime_ns) == key:
+                return None
+            if key in self._failed:
+                return None
+            try:
+                entry = self.load_artifact(path, backend=backend)
+            except Exception as e:  # noqa: BLE001
+                self._remember_failure(path)
+                self.reload_failures += 1
+                logger.warning("model registry: reload of %s failed (%s); keeping current", path, e)
+                return None
+            self.reloads += 1
+            # 直前の版はロールバック用に残し、それより古い版は手放す
+            keep = {entry.version}
+            if current is not None:
+                keep |= self._keep_previous(current, entry)
+            with self._lock:
+                for k in [k for k in self._entries if k[0] == backend and k[1] not in keep]:
+                    del self._entries[k]
+            logger.info("model registry: activated %s", entry.version)
+            return entry
+        finally:
+            self._reload_lock.release()
+
+    def _keep_previous(self, current: ModelEntry, entry: ModelEntry) -> Set[str]:
+        """ロールバック用に残す直前版の version（残せなければ空）"""
+        if current.version != entry.version:
+            return {current.version}
+        # 同名の差し替え: 新版が同じキーに登録されたので、旧版は mtime 付きの別キーで残す
+        if current.inode == entry.inode and MODEL_MMAP_MODE is not None:
+            # 同じ inode への上書きで、mmap 中の旧版の配列は書き換わっている
+            logger.warning(
+                "model registry: %s was overwritten in place while mmapped; "
+                "dropping the previous version (write artifacts via os.replace)",
+                entry.path,
+            )
+            return set()
+        previous = replace(current, version=f"{current.version}@{current.mtime_ns}")
+        self.register(previous, activate=False)
+        return {previous.version}
+
+    def _remember_failure(self, path: Path) -> None:
+        try:
+            self._failed.add((path.as_posix(), path.stat().st_mtime_ns))
+        except OSError:
+            pass
+
+    def describe(self, backend: str) -> Dict[str, Any]:
+        """/api/model 用: 設定中の backend と、アクティブな成果物の情報"""
+        entry = self.get(BACKEND_REGRESSION)
+        return {
+            "backend": backend,
+            "artifact": entry.describe() if entry is not None else None,
+            "versions": self.versions(BACKEND_REGRESSION),
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+        }
+
+
+class ModelWatcher:
+    """MODELS_DIR を定期的に見て、新しい成果物をバックグラウンドで読み込むタスク
+
+    ロード（joblib.load + スモーク推論）は asyncio.to_thread で実行し、イベントループを塞がない。
+    """
+
+    def __init__(
+        self,
+        registry: "ModelRegistry",
+        interval_seconds: float = MODEL_WATCH_INTERVAL,
+        backend: str = BACKEND_REGRESSION,
+    ) -> None:
+        self.registry = registry
+        self.interval = interval_seconds
+        self.backend = backend
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.interval <= 0 or self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.registry.reload_if_changed, self.backend)
+            except Exception:
+                logger.exception("model watcher: unexpected error")
+
+
+_registry = ModelRegistry()
+_watcher: ModelWatcher | None = None
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+
+def start_model_watcher() -> ModelWatcher:
+    """アプリ起動時に呼ぶ（MODEL_WATCH_INTERVAL<=0 なら何もしない）"""
+    global _watcher
+    if _watcher is None:
+        _watcher = ModelWatcher(_registry)
+    _watcher.start()
+    return _watcher
+
+
+async def stop_model_watcher() -> None:
+    if _watcher is not None:
+        await _watcher.stop()
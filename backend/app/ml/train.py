@@ -1,22 +1,29 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
 import math
+import os
 import subprocess
-from dataclasses import asdict, dataclass
+import time
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
-import joblib
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, root_mean_squared_error
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.multioutput import MultiOutputRegressor
 
+from .baseline import dump_artifact
+from .compact import compact_path_for, export_compact
+from .dataset import LOCATION_COLS, iter_location_chunks, next_day_targets
+from .feature_cache import RawFeatures, raw_features
 from .features import FeaturePipeline, FeaturePipelineConfig
 
 # --------------------------- データ生成（暫定: 合成） ---------------------------
@@ -86,18 +93,128 @@ def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray, target_names: List[s
 # --------------------------- 学習ロジック --------------------------------------
 
 
-def _make_model(seed: int) -> MultiOutputRegressor:
-    # 少し強め＆汎化寄りの初期値（過学習しにくく、残差を拾いやすい）
+# 少し強め＆汎化寄りの初期値（過学習しにくく、残差を拾いやすい）
+DEFAULT_GBDT_PARAMS: Dict[str, Any] = {
+    "learning_rate": 0.08,
+    "max_iter": 800,
+    "max_depth": 3,
+    "min_samples_leaf": 20,
+    "l2_regularization": 0.1,
+}
+# 探索モードの既定空間（GBDT のハイパラ + FeaturePipelineConfig.ma_windows）
+DEFAULT_SEARCH_SPACE: Dict[str, List[Any]] = {
+    "learning_rate": [0.03, 0.08, 0.15],
+    "max_iter": [200, 800],
+    "max_depth": [3, 5],
+    "ma_windows": [[3, 7], [3, 7, 14]],
+}
+# 探索空間のうち FeaturePipelineConfig 側に渡すキー
+_FEATURE_SEARCH_KEYS = ("ma_windows",)
+
+
+def _make_model(
+    seed: int, n_jobs: int = 1, params: Dict[str, Any] | None = None
+) -> MultiOutputRegressor:
     base = HistGradientBoostingRegressor(
-        learning_rate=0.08,
-        max_iter=800,
-        max_depth=3,
-        min_samples_leaf=20,
-        l2_regularization=0.1,
+        **{**DEFAULT_GBDT_PARAMS, **(params or {})},
         early_stopping=True,
         random_state=seed,
     )
-    return MultiOutputRegressor(base)
+    # ターゲット（4 本）ごとの fit を並列化。各 estimator は同じ random_state の clone なので
+    # 並列度によらず結果は同一
+    return MultiOutputRegressor(base, n_jobs=n_jobs if n_jobs > 1 else None)
+
+
+def _split_jobs(n_jobs: int, n_folds: int) -> Tuple[int, int]:
+    """--n-jobs を (fold の並列数, fold 内でターゲットを並列に fit する数) に配分"""
+    total = (os.cpu_count() or 1) if n_jobs < 0 else max(1, n_jobs)
+    fold_jobs = max(1, min(total, n_folds))
+    return fold_jobs, max(1, total // fold_jobs)
+
+
+def _rows_aligned(df: pd.DataFrame, config: FeaturePipelineConfig) -> bool:
+    """df の行順が raw_matrix の行順（date, group_cols の安定ソート）と一致するか"""
+    keys = [config.date_col, *config.group_cols]
+    if not config.group_cols:
+        return bool(df[config.date_col].is_monotonic_increasing)
+    order = df[keys].reset_index(drop=True).sort_values(keys, kind="mergesort").index
+    return bool(order.equals(pd.RangeIndex(len(df))))
+
+
+def _cv_raw_features(
+    df: pd.DataFrame, config: FeaturePipelineConfig, cache_dir: Path | str | None
+) -> RawFeatures | None:
+    # 行順が揃っていない入力は fold ごとに作る従来経路へ
+    return raw_features(df, config, cache_dir) if _rows_aligned(df, config) else None
+
+
+def _fit_fold(
+    fold: int,
+    tr_idx: np.ndarray,
+    va_idx: np.ndarray,
+    df: pd.DataFrame | None,
+    y_all: np.ndarray,
+    d0_all: np.ndarray,
+    target_names: List[str],
+    seed: int,
+    residual: bool,
+    n_jobs: int = 1,
+    params: Dict[str, Any] | None = None,
+    feature_config: FeaturePipelineConfig | None = None,
+    raw: RawFeatures | None = None,
+) -> Dict[str, Any]:
+    """1 fold ぶんの fit/評価（プロセスプールからも呼べるようにトップレベル関数）
+
+    raw（全期間の生特徴量行列）があれば lag/MA は作り直さず、fold の学習行で
+    中央値/クリップ境界だけを fit し直す。検証行の lag/MA は直前の学習期間の値を使う
+    （推論時と同じく履歴がある状態で評価する）。
+    """
+    t0 = time.perf_counter()
+    y_tr, y_va = y_all[tr_idx], y_all[va_idx]
+    d0_tr, d0_va = d0_all[tr_idx], d0_all[va_idx]
+
+    # pipeline（列名は pipe.feature_cols_ が持つので、モデルには float64 行列を渡す）
+    pipe = FeaturePipeline(feature_config or FeaturePipelineConfig())
+    if raw is not None:
+        X_raw, cols = raw
+        X_tr = pipe.fit_matrix(X_raw[tr_idx], cols).transform_matrix(X_raw[tr_idx])
+        X_va = pipe.transform_matrix(X_raw[va_idx])
+    else:
+        df_tr, df_va = df.iloc[tr_idx], df.iloc[va_idx]
+        X_tr = pipe.fit(df_tr).transform(df_tr, as_array=True)
+        X_va = pipe.transform(df_va, as_array=True)
+
+    # 目的変数（残差 or 直接）
+    y_tr_fit = (y_tr - d0_tr) if residual else y_tr
+
+    model = _make_model(seed, n_jobs=n_jobs, params=params)
+    model.fit(X_tr, y_tr_fit)
+
+    # 予測（残差なら戻す）
+    y_hat = model.predict(X_va)
+    if residual:
+        y_hat = y_hat + d0_va
+
+    metrics = compute_metrics(y_va, y_hat, target_names)
+
+    # Baseline（persistence）
+    baseline_metrics = compute_metrics(y_va, d0_va, target_names)
+
+    report = {
+        "fold": fold,
+        "n_train": int(len(tr_idx)),
+        "n_valid": int(len(va_idx)),
+        "model_metrics": metrics.to_dict(),
+        "baseline_metrics": baseline_metrics.to_dict(),
+        "seconds": time.perf_counter() - t0,
+    }
+    return {
+        "report": report,
+        "pipeline": pipe,
+        "model": model,
+        "score": metrics.rmse_macro,
+        "baseline": baseline_metrics.rmse_macro,
+    }
 
 
 def time_series_cv_train(
@@ -106,64 +223,406 @@ def time_series_cv_train(
     seed: int,
     n_splits: int,
     residual: bool,
+    n_jobs: int = 1,
+    params: Dict[str, Any] | None = None,
+    feature_config: FeaturePipelineConfig | None = None,
+    prune_ratio: float | None = None,
+    prune_after: int = 2,
+    feature_cache_dir: Path | str | None = None,
+    raw: RawFeatures | None = None,
 ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
     TimeSeriesSplit で CV。train で fit、valid で評価。
     residual=True の場合は（y - d0）を学習し、予測時に d0 を加算。
+    n_jobs>1 なら fold をプロセス並列、余った並列度で fold 内のターゲットも並列に fit する
+    （乱数は seed 固定なので、結果は n_jobs=1 と一致する）。各 fold の所要秒数を report に残す。
+    prune_ratio を与えると fold を逐次に回し、prune_after 番目以降の fold で RMSE が
+    同じ fold の persistence の prune_ratio 倍を超えた時点で打ち切る（report["pruned"]=True）。
+    先頭 fold は学習期間が短く（季節が一巡しない）どの設定でも悪くなりがちなので既定では見ない。
+    生特徴量は全期間で 1 回だけ作る（raw を渡すか、feature_cache のキャッシュを使う）。
     """
-    target_names = list(y.columns)
+    t0 = time.perf_counter()
     tscv = TimeSeriesSplit(n_splits=n_splits)
-    fold_reports: List[Dict[str, Any]] = []
+    splits = list(enumerate(tscv.split(df), start=1))
 
+    d0_all = df[["d_mean", "d_min", "d_max", "d_prec"]].to_numpy()
+    if raw is None:
+        raw = _cv_raw_features(df, feature_config or FeaturePipelineConfig(), feature_cache_dir)
+    return _run_cv(
+        splits,
+        df,
+        y.to_numpy(),
+        d0_all,
+        list(y.columns),
+        seed,
+        residual,
+        n_jobs,
+        params,
+        feature_config,
+        prune_ratio,
+        prune_after,
+        raw,
+        t0,
+    )
+
+
+def _run_cv(
+    splits: List[Tuple[int, Tuple[np.ndarray, np.ndarray]]],
+    df: pd.DataFrame | None,
+    y_all: np.ndarray,
+    d0_all: np.ndarray,
+    target_names: List[str],
+    seed: int,
+    residual: bool,
+    n_jobs: int,
+    params: Dict[str, Any] | None,
+    feature_config: FeaturePipelineConfig | None,
+    prune_ratio: float | None,
+    prune_after: int,
+    raw: RawFeatures | None,
+    t0: float,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """fold 分割済みの CV 本体（単系列/多地点で共通）。df=None なら raw が必須"""
+    fold_jobs, target_jobs = _split_jobs(n_jobs, len(splits))
+    if prune_ratio is not None:
+        # 打ち切り判定は前の fold の結果が要るので fold は逐次
+        fold_jobs, target_jobs = 1, _split_jobs(n_jobs, 1)[1]
+    tasks = (
+        delayed(_fit_fold)(
+            fold,
+            tr_idx,
+            va_idx,
+            df,
+            y_all,
+            d0_all,
+            target_names,
+            seed,
+            residual,
+            target_jobs,
+            params,
+            feature_config,
+            raw,
+        )
+        for fold, (tr_idx, va_idx) in splits
+    )
+    pruned = False
+    if fold_jobs > 1:
+        results = Parallel(n_jobs=fold_jobs)(tasks)
+    else:
+        results = []
+        for fn, args, kwargs in tasks:
+            results.append(fn(*args, **kwargs))
+            last = results[-1]
+            if (
+                prune_ratio is not None
+                and prune_after <= len(results) < len(splits)
+                and last["score"] > prune_ratio * last["baseline"]
+            ):
+                pruned = True
+                break
+
+    # fold 順に評価（並列でも逐次と同じ fold が選ばれる）
     best_bundle: Dict[str, Any] | None = None
     best_score = math.inf
+    for res in results:
+        if res["score"] < best_score:
+            best_score = res["score"]
+            best_bundle = {"pipeline": res["pipeline"], "model": res["model"], "residual": residual}
 
-    d0_all = df[["d_mean", "d_min", "d_max", "d_prec"]].to_numpy()
-    y_all = y.to_numpy()
-
-    for fold, (tr_idx, va_idx) in enumerate(tscv.split(df), start=1):
-        df_tr, df_va = df.iloc[tr_idx].copy(), df.iloc[va_idx].copy()
-        y_tr, y_va = y_all[tr_idx], y_all[va_idx]
-        d0_tr, d0_va = d0_all[tr_idx], d0_all[va_idx]
-
-        # pipeline
-        pipe = FeaturePipeline(FeaturePipelineConfig())
-        X_tr = pipe.fit(df_tr).transform(df_tr)
-        X_va = pipe.transform(df_va)
-
-        # 目的変数（残差 or 直接）
-        y_tr_fit = (y_tr - d0_tr) if residual else y_tr
-
-        model = _make_model(seed)
-        model.fit(X_tr, y_tr_fit)
-
-        # 予測（残差なら戻す）
-        y_hat = model.predict(X_va)
-        if residual:
-            y_hat = y_hat + d0_va
-
-        metrics = compute_metrics(y_va, y_hat, target_names)
-
-        # Baseline（persistence）
-        baseline_metrics = compute_metrics(y_va, d0_va, target_names)
-
-        fold_reports.append(
-            {
-                "fold": fold,
-                "n_train": int(len(tr_idx)),
-                "n_valid": int(len(va_idx)),
-                "model_metrics": metrics.to_dict(),
-                "baseline_metrics": baseline_metrics.to_dict(),
-            }
+    assert best_bundle is not None
+    cv_report = {
+        "folds": [res["report"] for res in results],
+        "n_jobs": n_jobs,
+        "seconds": time.perf_counter() - t0,
+        "rmse_macro": float(np.mean([r["score"] for r in results])),
+        "rmse_macro_baseline": float(np.mean([r["baseline"] for r in results])),
+    }
+    if prune_ratio is not None:
+        cv_report["pruned"] = pruned
+    return best_bundle, cv_report
+
+
+# --------------------------- ハイパラ探索 --------------------------------------
+
+
+def _split_candidate(
+    candidate: Dict[str, Any],
+) -> Tuple[Dict[str, Any], FeaturePipelineConfig]:
+    """探索候補 -> (GBDT のハイパラ, FeaturePipelineConfig)"""
+    unknown = set(candidate) - set(DEFAULT_GBDT_PARAMS) - set(_FEATURE_SEARCH_KEYS)
+    if unknown:
+        raise ValueError(f"unknown search keys: {sorted(unknown)}")
+    params = {k: v for k, v in candidate.items() if k in DEFAULT_GBDT_PARAMS}
+    feat = {k: tuple(v) for k, v in candidate.items() if k in _FEATURE_SEARCH_KEYS}
+    return params, replace(FeaturePipelineConfig(), **feat)
+
+
+def search_candidates(
+    space: Dict[str, List[Any]], mode: str = "grid", n_trials: int = 10, seed: int = 42
+) -> List[Dict[str, Any]]:
+    """探索候補を列挙（grid: 全組合せ / random: 全組合せから重複なしに n_trials 個）"""
+    keys = sorted(space)
+    grid = [
+        dict(zip(keys, values, strict=True))
+        for values in itertools.product(*(space[k] for k in keys))
+    ]
+    if mode == "grid":
+        return grid
+    if mode != "random":
+        raise ValueError(f"unknown search mode: {mode!r}")
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(grid), size=min(n_trials, len(grid)), replace=False)
+    return [grid[i] for i in sorted(idx)]
+
+
+def _evaluate_candidate(
+    candidate: Dict[str, Any],
+    df: pd.DataFrame,
+    y: pd.DataFrame,
+    seed: int,
+    n_splits: int,
+    residual: bool,
+    prune_ratio: float,
+    prune_after: int,
+    raw: RawFeatures | None = None,
+) -> Dict[str, Any]:
+    params, feature_config = _split_candidate(candidate)
+    bundle, report = time_series_cv_train(
+        df,
+        y,
+        seed=seed,
+        n_splits=n_splits,
+        residual=residual,
+        params=params,
+        feature_config=feature_config,
+        prune_ratio=prune_ratio,
+        prune_after=prune_after,
+        raw=raw,
+    )
+    return {"candidate": candidate, "bundle": bundle, "cv_report": report}
+
+
+def search_hyperparams(
+    df: pd.DataFrame,
+    y: pd.DataFrame,
+    seed: int,
+    n_splits: int,
+    residual: bool,
+    candidates: List[Dict[str, Any]],
+    n_jobs: int = 1,
+    prune_ratio: float = 1.0,
+    prune_after: int = 2,
+    feature_cache_dir: Path | str | None = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """候補ごとに CV（time_series_cv_train）を回し、平均 RMSE 最小の候補を選ぶ
+
+    候補はプロセス並列（fold は候補内で逐次）。序盤の fold（prune_after 番目以降）で
+    persistence の prune_ratio 倍より悪い候補は残りの fold を回さずに打ち切る。
+    生特徴量は特徴量設定（ma_windows 等）ごとに親プロセスで 1 回だけ作り、候補間で共有する。
+    戻り値: (最良候補, その CV の bundle, その cv_report, 探索レポート)
+    """
+    if not candidates:
+        raise ValueError("no search candidates")
+    t0 = time.perf_counter()
+    raws: Dict[str, RawFeatures | None] = {}
+    for c in candidates:
+        cfg = _split_candidate(c)[1]
+        if repr(cfg) not in raws:
+            raws[repr(cfg)] = _cv_raw_features(df, cfg, feature_cache_dir)
+    tasks = (
+        delayed(_evaluate_candidate)(
+            c,
+            df,
+            y,
+            seed,
+            n_splits,
+            residual,
+            prune_ratio,
+            prune_after,
+            raws[repr(_split_candidate(c)[1])],
         )
+        for c in candidates
+    )
+    jobs = _split_jobs(n_jobs, len(candidates))[0]
+    if jobs > 1:
+        results = Parallel(n_jobs=jobs)(tasks)
+    else:
+        results = [fn(*args, **kwargs) for fn, args, kwargs in tasks]
 
-        if metrics.rmse_macro < best_score:
-            best_score = metrics.rmse_macro
-            best_bundle = {"pipeline": pipe, "model": model, "residual": residual}
+    trials = [
+        {
+            "candidate": r["candidate"],
+            "rmse_macro": r["cv_report"]["rmse_macro"],
+            "rmse_macro_baseline": r["cv_report"]["rmse_macro_baseline"],
+            "folds_run": len(r["cv_report"]["folds"]),
+            "pruned": r["cv_report"]["pruned"],
+            "seconds": r["cv_report"]["seconds"],
+        }
+        for r in results
+    ]
+    finished = [r for r in results if not r["cv_report"]["pruned"]]
+    if not finished:
+        raise SystemExit("search failed: every candidate was pruned (worse than persistence)")
+    best = min(finished, key=lambda r: r["cv_report"]["rmse_macro"])
+    search_report = {
+        "n_candidates": len(candidates),
+        "n_pruned": len(results) - len(finished),
+        "prune_ratio": prune_ratio,
+        "prune_after": prune_after,
+        "best_config": best["candidate"],
+        "trials": trials,
+        "seconds": time.perf_counter() - t0,
+    }
+    return best["candidate"], best["bundle"], best["cv_report"], search_report
 
-    assert best_bundle is not None
-    cv_report = {"folds": fold_reports}
-    return best_bundle, cv_report
+
+# --------------------------- 多地点（列指向データセット） -------------------------
+
+
+def load_location_matrix(
+    source: Path | str,
+    feature_config: FeaturePipelineConfig | None = None,
+    chunk_rows: int = 1_000_000,
+    location_cols: Tuple[str, ...] = LOCATION_COLS,
+) -> Dict[str, Any]:
+    """多地点データセットを地点チャンク単位で流し読みし、学習に要る行列だけを残す
+
+    生の DataFrame はチャンクごとに捨て、生特徴量行列・目的変数（翌日値）・d0・日付だけを
+    連結する。lag/MA は group_cols=location_cols で地点ごとに作る。翌日値の無い行
+    （系列末尾・欠測日）は落とす。生特徴量行列は float32 で持つ（HistGradientBoosting は
+    どうせビン化するので精度は効かない）。
+
+    限界: HistGradientBoosting は学習時に X 全体を要するので、全行ぶんの行列（既定 22 列で
+    1 行 88 B）と y/d0/dates（1 行 72 B）は常駐する。7 列の生フレームより大きく、省けるのは
+    生フレームと float64 の特徴量行列を同時に持つ分だけ。実測（2,000 地点 × 730 日、
+    scripts/bench_train_locations）で import 後からのピーク RSS 増分は 一括読み +468 MB、
+    本関数 +304 MB。
+    """
+    cfg = replace(feature_config or FeaturePipelineConfig(), group_cols=tuple(location_cols))
+    pipe = FeaturePipeline(cfg)
+    parts: Dict[str, List[np.ndarray]] = {"X": [], "y": [], "d0": [], "dates": []}
+    cols: List[str] = []
+    n_locations = n_read = 0
+    for chunk in iter_location_chunks(
+        source, chunk_rows, location_cols=location_cols, base_cols=cfg.base_cols
+    ):
+        n_read += len(chunk)
+        n_locations += chunk.groupby(list(location_cols)).ngroups
+        # どちらも (date, location) の安定ソート順 -> 行が揃う
+        chunk, y_next = next_day_targets(chunk, location_cols, cfg.base_cols)
+        X, cols = pipe.raw_matrix(chunk)
+        keep = ~np.isnan(y_next).any(axis=1)
+        parts["X"].append(X[keep].astype(np.float32))
+        parts["y"].append(y_next[keep])
+        parts["d0"].append(chunk[list(cfg.base_cols)].to_numpy(dtype=float)[keep])
+        parts["dates"].append(chunk[cfg.date_col].to_numpy(dtype="datetime64[D]")[keep])
+    if not cols:
+        raise ValueError(f"empty dataset: {source}")
+    out = {k: np.concatenate(v) for k, v in parts.items()}
+    return {
+        "raw": (out.pop("X"), cols),
+        **out,
+        "target_names": ["d1_" + c.removeprefix("d_") for c in cfg.base_cols],
+        "n_locations": n_locations,
+        "n_rows_read": n_read,
+    }
+
+
+def _date_splits(
+    dates: np.ndarray, n_splits: int
+) -> List[Tuple[int, Tuple[np.ndarray, np.ndarray]]]:
+    """日付で TimeSeriesSplit（同じ日の全地点は同じ側に入る）"""
+    days = np.unique(dates)
+    splits = []
+    for fold, (_, va) in enumerate(TimeSeriesSplit(n_splits=n_splits).split(days), start=1):
+        lo, hi = days[va[0]], days[va[-1]]
+        tr_idx = np.flatnonzero(dates < lo)
+        va_idx = np.flatnonzero((dates >= lo) & (dates <= hi))
+        splits.append((fold, (tr_idx, va_idx)))
+    return splits
+
+
+def location_cv_train(
+    data: Dict[str, Any],
+    seed: int,
+    n_splits: int,
+    residual: bool,
+    n_jobs: int = 1,
+    params: Dict[str, Any] | None = None,
+    feature_config: FeaturePipelineConfig | None = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """load_location_matrix の結果で日付方向の CV（fold の中身は time_series_cv_train と同じ）
+
+    保存するパイプラインは group_cols なし
+    （推論側が SimpleRegModel.predict(group_cols=...) で与える）。
+    """
+    t0 = time.perf_counter()
+    cfg = replace(feature_config or FeaturePipelineConfig(), group_cols=())
+    bundle, cv_report = _run_cv(
+        _date_splits(data["dates"], n_splits),
+        None,
+        data["y"],
+        data["d0"],
+        data["target_names"],
+        seed,
+        residual,
+        n_jobs,
+        params,
+        cfg,
+        None,
+        0,
+        data["raw"],
+        t0,
+    )
+    cv_report["n_locations"] = data["n_locations"]
+    return bundle, cv_report
+
+
+def train_locations(
+    source: Path | str,
+    out_dir: Path,
+    seed: int,
+    n_splits: int,
+    residual: bool,
+    require_improve_ratio: float,
+    n_jobs: int = 1,
+    params: Dict[str, Any] | None = None,
+    feature_config: FeaturePipelineConfig | None = None,
+    chunk_rows: int = 1_000_000,
+    export_compact_bundle: bool = True,
+) -> Tuple[Path, Dict[str, Any]]:
+    """多地点データセット（Parquet/Arrow/CSV）から 1 つのモデルを学習して保存する"""
+    t0 = time.perf_counter()
+    data = load_location_matrix(source, feature_config, chunk_rows)
+    load_seconds = time.perf_counter() - t0
+    bundle, cv_report = location_cv_train(
+        data, seed, n_splits, residual, n_jobs, params, feature_config
+    )
+    dataset_info = {
+        "source": Path(source).as_posix(),
+        "group_cols": list(LOCATION_COLS),
+        "n_locations": data["n_locations"],
+        "n_rows_read": data["n_rows_read"],
+        "n_rows_train": len(data["y"]),
+        "raw_matrix_mb": round(data["raw"][0].nbytes / 2**20, 1),
+        "load_seconds": load_seconds,
+    }
+    path = _refit_matrix_and_save(
+        data["raw"],
+        data["y"],
+        data["d0"],
+        bundle,
+        cv_report,
+        out_dir,
+        seed,
+        require_improve_ratio,
+        export_compact_bundle=export_compact_bundle,
+        n_jobs=n_jobs,
+        params=params,
+        feature_config=replace(feature_config or FeaturePipelineConfig(), group_cols=()),
+        extra_metadata={"dataset": dataset_info},
+    )
+    return path, dataset_info
 
 
 def refit_full_and_save(
@@ -174,17 +633,63 @@ def refit_full_and_save(
     out_dir: Path,
     seed: int,
     require_improve_ratio: float,
+    export_compact_bundle: bool = True,
+    n_jobs: int = 1,
+    params: Dict[str, Any] | None = None,
+    feature_config: FeaturePipelineConfig | None = None,
+    search_report: Dict[str, Any] | None = None,
+    feature_cache_dir: Path | str | None = None,
 ) -> Path:
-    """全データで再学習 → /models に保存（{YYYYMMDD}_{gitSHA}_gbdt.joblib）"""
-    residual = bool(bundle.get("residual", False))
-    pipeline = FeaturePipeline(FeaturePipelineConfig())
-    X_all = pipeline.fit(df).transform(df)
+    """全データで再学習 → /models に保存（{YYYYMMDD}_{gitSHA}_gbdt.joblib）
 
-    d0_all = df[["d_mean", "d_min", "d_max", "d_prec"]].to_numpy()
-    y_all = y.to_numpy()
+    export_compact_bundle=True なら同名の .compact ディレクトリ（純 NumPy 推論バンドル）も書き出す。
+    """
+    feature_config = feature_config or FeaturePipelineConfig()
+    # CV と同じ生特徴量（キャッシュ済みなら作り直さない）
+    raw = _cv_raw_features(df, feature_config, feature_cache_dir)
+    if raw is None:
+        raw = FeaturePipeline(feature_config).raw_matrix(df)
+    return _refit_matrix_and_save(
+        raw,
+        y.to_numpy(),
+        df[["d_mean", "d_min", "d_max", "d_prec"]].to_numpy(),
+        bundle,
+        cv_report,
+        out_dir,
+        seed,
+        require_improve_ratio,
+        export_compact_bundle=export_compact_bundle,
+        n_jobs=n_jobs,
+        params=params,
+        feature_config=feature_config,
+        search_report=search_report,
+    )
+
+
+def _refit_matrix_and_save(
+    raw: RawFeatures,
+    y_all: np.ndarray,
+    d0_all: np.ndarray,
+    bundle: Dict[str, Any],
+    cv_report: Dict[str, Any],
+    out_dir: Path,
+    seed: int,
+    require_improve_ratio: float,
+    export_compact_bundle: bool = True,
+    n_jobs: int = 1,
+    params: Dict[str, Any] | None = None,
+    feature_config: FeaturePipelineConfig | None = None,
+    search_report: Dict[str, Any] | None = None,
+    extra_metadata: Dict[str, Any] | None = None,
+) -> Path:
+    """生特徴量行列から全データ再学習 → 保存（refit_full_and_save / 多地点学習で共通）"""
+    residual = bool(bundle.get("residual", False))
+    feature_config = feature_config or FeaturePipelineConfig()
+    pipeline = FeaturePipeline(feature_config)
+    X_all = pipeline.fit_matrix(*raw).transform_matrix(raw[0])
     y_all_fit = (y_all - d0_all) if residual else y_all
 
-    model = _make_model(seed)
+    model = _make_model(seed, n_jobs=_split_jobs(n_jobs, 1)[1], params=params)
     model.fit(X_all, y_all_fit)
 
     # CV集計 & baseline
@@ -224,12 +729,22 @@ def refit_full_and_save(
             "cv": cv_report,
             "rmse_macro": rmse_macro,
             "rmse_macro_baseline": rmse_macro_baseline,
-            "feature_config": asdict(FeaturePipelineConfig()),
+            "feature_config": asdict(feature_config),
+            "gbdt_params": {**DEFAULT_GBDT_PARAMS, **(params or {})},
             "seed": seed,
             "residual": residual,
         },
     }
-    joblib.dump(artifact, save_path.as_posix())
+    if extra_metadata:
+        artifact["metadata"].update(extra_metadata)
+    if search_report is not None:
+        # 探索モード: 採用した設定と全候補の結果（打ち切り含む）を残す
+        artifact["metadata"]["best_config"] = search_report["best_config"]
+        artifact["metadata"]["search"] = search_report
+    # 木のノードは side-car .npy（mmap 共有用）に分けて保存
+    dump_artifact(artifact, save_path)
+    if export_compact_bundle:
+        export_compact(artifact, compact_path_for(save_path))
     return save_path
 
 
@@ -244,12 +759,99 @@ def main() -> None:
     parser.add_argument("--models-dir", type=str, default="models")
     parser.add_argument("--require-improve", type=float, default=0.99)
     parser.add_argument("--residual", action="store_true", help="learn residual (y - persistence)")
+    parser.add_argument(
+        "--n-jobs", type=int, default=1, help="parallel workers for CV folds/targets (-1: all CPUs)"
+    )
+    parser.add_argument(
+        "--no-compact", action="store_true", help="skip exporting the compact inference bundle"
+    )
+    parser.add_argument(
+        "--search", choices=["grid", "random"], help="hyperparameter search mode (default: off)"
+    )
+    parser.add_argument(
+        "--search-space",
+        type=str,
+        default=None,
+        help="JSON (inline or file path) mapping param -> list of values",
+    )
+    parser.add_argument("--n-trials", type=int, default=10, help="candidates for --search random")
+    parser.add_argument(
+        "--prune-ratio",
+        type=float,
+        default=1.0,
+        help="prune candidates whose fold RMSE exceeds that fold's persistence x ratio",
+    )
+    parser.add_argument(
+        "--feature-cache-dir",
+        type=str,
+        default=os.getenv("FEATURE_CACHE_DIR"),
+        help="on-disk cache of raw feature matrices keyed by data/config hash",
+    )
+    parser.add_argument(
+        "--prune-after", type=int, default=2, help="first fold checked for pruning (1-based)"
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default=None,
+        help="multi-location dataset (dir/file of Parquet, Arrow or CSV with lat/lon columns)",
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=1_000_000, help="rows per location chunk for --dataset"
+    )
     args = parser.parse_args()
 
+    if args.dataset:
+        if args.search:
+            parser.error("--search is not supported with --dataset")
+        out_path, dataset_info = train_locations(
+            args.dataset,
+            Path(args.models_dir),
+            seed=args.seed,
+            n_splits=args.splits,
+            residual=args.residual,
+            require_improve_ratio=args.require_improve,
+            n_jobs=args.n_jobs,
+            chunk_rows=args.chunk_rows,
+            export_compact_bundle=not args.no_compact,
+        )
+        print(json.dumps({"saved_to": out_path.as_posix(), **dataset_info}, ensure_ascii=False))
+        return
+
     df, y = make_synthetic_daily(seed=args.seed, n_days=args.n_days)
-    best_bundle, cv_report = time_series_cv_train(
-        df, y, seed=args.seed, n_splits=args.splits, residual=args.residual
-    )
+    params: Dict[str, Any] | None = None
+    feature_config: FeaturePipelineConfig | None = None
+    search_report: Dict[str, Any] | None = None
+    if args.search:
+        space = DEFAULT_SEARCH_SPACE
+        if args.search_space:
+            src = Path(args.search_space)
+            raw = src.read_text(encoding="utf-8") if src.is_file() else args.search_space
+            space = json.loads(raw)
+        candidates = search_candidates(space, args.search, args.n_trials, args.seed)
+        best, best_bundle, cv_report, search_report = search_hyperparams(
+            df,
+            y,
+            seed=args.seed,
+            n_splits=args.splits,
+            residual=args.residual,
+            candidates=candidates,
+            n_jobs=args.n_jobs,
+            prune_ratio=args.prune_ratio,
+            prune_after=args.prune_after,
+            feature_cache_dir=args.feature_cache_dir,
+        )
+        params, feature_config = _split_candidate(best)
+    else:
+        best_bundle, cv_report = time_series_cv_train(
+            df,
+            y,
+            seed=args.seed,
+            n_splits=args.splits,
+            residual=args.residual,
+            n_jobs=args.n_jobs,
+            feature_cache_dir=args.feature_cache_dir,
+        )
     out_path = refit_full_and_save(
         df=df,
         y=y,
@@ -258,8 +860,19 @@ def main() -> None:
         out_dir=Path(args.models_dir),
         seed=args.seed,
         require_improve_ratio=args.require_improve,
+        export_compact_bundle=not args.no_compact,
+        n_jobs=args.n_jobs,
+        params=params,
+        feature_config=feature_config,
+        search_report=search_report,
+        feature_cache_dir=args.feature_cache_dir,
     )
-    print(json.dumps({"saved_to": out_path.as_posix()}, ensure_ascii=False))
+    out: Dict[str, Any] = {"saved_to": out_path.as_posix()}
+    if search_report is not None:
+        out["best_config"] = search_report["best_config"]
+    if not args.no_compact:
+        out["compact_to"] = compact_path_for(out_path).as_posix()
+    print(json.dumps(out, ensure_ascii=False))
 
 
 if __name__ == "__main__":
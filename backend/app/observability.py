@@ -8,7 +8,7 @@ import uuid
 from collections import defaultdict, deque
 from contextvars import ContextVar, Token
 from statistics import median
-from typing import Any, Deque, Dict, List, Optional, Tuple, TypedDict
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, TypedDict
 
 # --- requests を「オプション依存」にする ---
 try:
@@ -34,6 +34,7 @@ class ExtCall(TypedDict, total=False):
     ok: Optional[bool]
     duration_ms: Optional[int]
     error: Optional[str]
+    queue_wait_ms: Optional[int]
 
 
 # =========
@@ -91,10 +92,71 @@ _METRICS: Dict[str, _PathMetrics] = defaultdict(_PathMetrics)
 METRICS = _METRICS
 
 
+# 名前付きカウンタ（外部API呼び出しの coalesce 数など、パス単位でない指標）
+_COUNTERS: Dict[str, int] = defaultdict(int)
+
+
+# 名前付きの統計スナップショット提供元（キャッシュのヒット率など。dump 時に評価）
+_STATS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
 def metrics_update(path: str, latency_ms: int, ok: bool) -> None:
     _METRICS[path].record(latency_ms, ok)
 
 
+def counter_inc(name: str, n: int = 1) -> None:
+    _COUNTERS[name] += n
+
+
+def register_stats(name: str, fn: Callable[[], Dict[str, Any]]) -> None:
+    _STATS[name] = fn
+
+
+# 外部 API（httpx 経由など requests 以外）の呼び出し: URL ごとの所要時間と、送信前の待ち時間
+_EXT_METRICS: Dict[str, _PathMetrics] = defaultdict(_PathMetrics)
+_EXT_QUEUE_WAIT: Dict[str, _PathMetrics] = defaultdict(_PathMetrics)
+
+
+def record_ext_api_call(
+    url: str,
+    status: int,
+    duration_ms: float,
+    queue_wait_ms: float = 0.0,
+    method: str = "GET",
+) -> None:
+    """外部呼び出し 1 試行を記録（現在のリクエストの ext_api_calls と URL 別メトリクス）
+
+    queue_wait_ms は同時実行数の上限などで送信前に待たされた時間（duration_ms には含めない）。
+    """
+    ok = 200 <= int(status) < 400
+    _EXT_METRICS[url].record(int(duration_ms), ok)
+    _EXT_QUEUE_WAIT[url].record(int(queue_wait_ms), True)
+    rec: ExtCall = {
+        "method": method,
+        "url": url,
+        "status": int(status),
+        "ok": ok,
+        "duration_ms": int(duration_ms),
+        "error": None,
+        "queue_wait_ms": int(queue_wait_ms),
+    }
+    try:
+        new = list(ext_api_calls_ctx.get())  # copy-on-write
+        new.append(rec)
+        ext_api_calls_ctx.set(new)
+    except LookupError:
+        pass
+
+
+def _ext_snapshot(url: str) -> Dict[str, Any]:
+    wait = _EXT_QUEUE_WAIT[url].snapshot()
+    return {
+        **_EXT_METRICS[url].snapshot(),
+        "queue_wait_p50_ms": wait["p50_ms"],
+        "queue_wait_p95_ms": wait["p95_ms"],
+    }
+
+
 def metrics_dump() -> Dict[str, Any]:
     overall = _PathMetrics()
     for pm in _METRICS.values():
@@ -107,6 +169,9 @@ def metrics_dump() -> Dict[str, Any]:
     return {
         "overall": overall.snapshot(),
         "by_path": by_path,
+        "counters": dict(_COUNTERS),
+        "stats": {name: fn() for name, fn in _STATS.items()},
+        "ext_api": {url: _ext_snapshot(url) for url in list(_EXT_METRICS)},
         "instrumentation": {"requests": _REQUESTS_AVAILABLE},
     }
 
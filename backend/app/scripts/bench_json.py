@@ -0,0 +1,97 @@
+"""Open-Meteo 応答サイズ別の JSON decode/encode ベンチマーク（標準 json vs orjson）
+
+使い方: python -m app.scripts.bench_json [--repeat 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from ..utils import json_utils
+
+DAYS = (14, 30, 92)
+
+
+def make_hourly_payload(days: int, seed: int = 0) -> Dict[str, Any]:
+    """past_days=days 相当の hourly 応答（Open-Meteo 形式・合成値）"""
+    rng = np.random.default_rng(seed)
+    n = days * 24
+    start = datetime(2025, 1, 1)
+    times = [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(n)]
+    return {
+        "latitude": 35.7,
+        "longitude": 139.7,
+        "generationtime_ms": 0.5,
+        "utc_offset_seconds": 32400,
+        "timezone": "Asia/Tokyo",
+        "hourly_units": {"time": "iso8601", "temperature_2m": "°C", "precipitation": "mm"},
+        "hourly": {
+            "time": times,
+            "temperature_2m": np.round(rng.normal(15, 5, n), 1).tolist(),
+            "precipitation": np.round(rng.gamma(1.0, 0.5, n), 1).tolist(),
+        },
+    }
+
+
+def make_daily_payload(days: int, seed: int = 0) -> Dict[str, Any]:
+    """/forecast（daily, past_days=days）相当の応答"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1)
+    return {
+        "latitude": 35.7,
+        "longitude": 139.7,
+        "timezone": "Asia/Tokyo",
+        "daily": {
+            "time": [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)],
+            "temperature_2m_max": np.round(rng.normal(20, 5, days), 1).tolist(),
+            "temperature_2m_min": np.round(rng.normal(10, 5, days), 1).tolist(),
+            "precipitation_sum": np.round(rng.gamma(1.0, 2.0, days), 1).tolist(),
+        },
+    }
+
+
+def _best_us(fn: Callable[[], Any], repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1e6
+
+
+def _bench(payload: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    raw = json.dumps(payload).encode("utf-8")
+    row: Dict[str, Any] = {
+        "bytes": len(raw),
+        "stdlib_decode_us": _best_us(lambda: json.loads(raw), repeat),
+        "stdlib_encode_us": _best_us(lambda: json.dumps(payload).encode("utf-8"), repeat),
+    }
+    if json_utils.backend_name() == "orjson":
+        row["fast_decode_us"] = _best_us(lambda: json_utils.loads(raw), repeat)
+        row["fast_encode_us"] = _best_us(lambda: json_utils.dumps(payload), repeat)
+        row["decode_speedup"] = row["stdlib_decode_us"] / max(row["fast_decode_us"], 1e-9)
+        row["encode_speedup"] = row["stdlib_encode_us"] / max(row["fast_encode_us"], 1e-9)
+    return row
+
+
+def run(repeat: int = 50) -> List[Dict[str, Any]]:
+    results = []
+    for days in DAYS:
+        results.append(
+            {"kind": "hourly", "days": days, **_bench(make_hourly_payload(days), repeat)}
+        )
+        results.append({"kind": "daily", "days": days, **_bench(make_daily_payload(days), repeat)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON backends on Open-Meteo payloads")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    out = {"backend": json_utils.backend_name(), "results": run(repeat=args.repeat)}
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
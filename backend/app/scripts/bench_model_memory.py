@@ -0,0 +1,89 @@
+"""worker ごとのメモリ（RSS / PSS / USS）を、成果物の読み方別に計測する
+
+N 個のプロセス（uvicorn workers 相当、spawn）が同じ成果物を同時に読み込み、
+全員がロード済みの時点で /proc/self/smaps_rollup を読む。PSS は共有ページを
+共有プロセス数で割った値なので、mmap による共有の効果は PSS/USS に表れる。
+
+使い方: python -m app.scripts.bench_model_memory PATH/TO/xxx_gbdt.joblib [--workers 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+from typing import Any, Dict, List
+
+MODES = ("joblib", "joblib-mmap", "compact-mmap")
+
+
+def _smaps_rollup() -> Dict[str, int]:
+    """/proc/self/smaps_rollup の Rss/Pss/Private_* [kB]（Linux 以外は空）"""
+    out: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    out[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        pass
+    return out
+
+
+def _worker(path: str, mode: str, barrier: Any, queue: Any) -> None:
+    before = _smaps_rollup()
+    if mode == "compact-mmap":
+        from ..ml.compact import CompactPredictor, compact_path_for
+
+        CompactPredictor.load(compact_path_for(path), mmap=True)
+    else:
+        from ..ml.baseline import SimpleRegModel
+        from ..ml.registry import warmup
+
+        model = SimpleRegModel.load(path, mmap_mode="r" if mode == "joblib-mmap" else None)
+        warmup(model)
+    # 全 worker がロードし終えてから計測（共有の効果を PSS に反映させる）
+    barrier.wait()
+    after = _smaps_rollup()
+    queue.put(
+        {
+            "rss_mb": after.get("Rss", 0) / 1024,
+            "pss_mb": after.get("Pss", 0) / 1024,
+            "uss_mb": (after.get("Private_Clean", 0) + after.get("Private_Dirty", 0)) / 1024,
+            "load_rss_delta_mb": (after.get("Rss", 0) - before.get("Rss", 0)) / 1024,
+        }
+    )
+    barrier.wait()
+
+
+def run(path: str, workers: int, modes: List[str]) -> List[Dict[str, Any]]:
+    ctx = mp.get_context("spawn")
+    results = []
+    for mode in modes:
+        barrier = ctx.Barrier(workers)
+        queue = ctx.Queue()
+        procs = [
+            ctx.Process(target=_worker, args=(path, mode, barrier, queue)) for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        rows = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        mean = {k: round(sum(r[k] for r in rows) / len(rows), 1) for k in rows[0]}
+        results.append({"mode": mode, "workers": workers, **mean})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of model loading")
+    parser.add_argument("path", help="*_gbdt.joblib（dump_artifact 形式なら side-car も使う）")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=list(MODES))
+    args = parser.parse_args()
+    print(json.dumps({"results": run(args.path, args.workers, args.modes)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
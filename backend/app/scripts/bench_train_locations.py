@@ -0,0 +1,90 @@
+"""多地点データセットの読み込みのピーク RSS を、読み方別に計測する
+
+- frame: 全チャンクを 1 つの DataFrame に連結してから raw_matrix（チャンク化前の読み方）
+- chunked: load_location_matrix（地点チャンクごとに特徴量化し、float32 行列だけ残す）
+
+それぞれ spawn した別プロセスで読み、ru_maxrss（プロセスのピーク RSS）を比べる。
+HistGradientBoosting は学習時に X 全体を要するので、chunked でも行列自体は全行ぶん常駐する。
+
+使い方: python -m app.scripts.bench_train_locations [--locations 2000] [--days 730]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+MODES = ("frame", "chunked")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は kB、macOS は byte
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _worker(source: str, mode: str, chunk_rows: int, queue: Any) -> None:
+    import pandas as pd
+
+    from ..ml.dataset import LOCATION_COLS, iter_location_chunks
+    from ..ml.features import FeaturePipeline, FeaturePipelineConfig
+    from ..ml.train import load_location_matrix
+
+    base = _peak_rss_mb()
+    if mode == "frame":
+        df = pd.concat(iter_location_chunks(source, chunk_rows), ignore_index=True)
+        pipe = FeaturePipeline(FeaturePipelineConfig(group_cols=tuple(LOCATION_COLS)))
+        X, _ = pipe.raw_matrix(df)
+        rows, matrix = len(X), X
+    else:
+        data = load_location_matrix(source, chunk_rows=chunk_rows)
+        matrix = data["raw"][0]
+        rows = len(matrix)
+    queue.put(
+        {
+            "mode": mode,
+            "rows": rows,
+            "matrix_mb": round(matrix.nbytes / 2**20, 1),
+            "import_rss_mb": round(base, 1),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        }
+    )
+
+
+def run(locations: int, days: int, chunk_rows: int, modes: List[str]) -> List[Dict[str, Any]]:
+    from ..ml.dataset import make_synthetic_locations, write_dataset
+
+    ctx = mp.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = make_synthetic_locations(seed=0, n_locations=locations, n_days=days)
+        write_dataset(frame, Path(tmp), fmt="csv")
+        del frame
+        for mode in modes:
+            queue = ctx.Queue()
+            p = ctx.Process(target=_worker, args=(tmp, mode, chunk_rows, queue))
+            p.start()
+            results.append(queue.get())
+            p.join()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure peak RSS of multi-location loading")
+    parser.add_argument("--locations", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=list(MODES))
+    args = parser.parse_args()
+    out = run(args.locations, args.days, args.chunk_rows, args.modes)
+    print(json.dumps({"results": out}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+# 値 <-> bytes の変換（呼び出し側が型に応じて用意する）
+Encoder = Callable[[Any], bytes]
+Decoder = Callable[[bytes], Any]
+
+
+class SQLiteCache:
+    """同一ホストの複数プロセス（uvicorn workers / 再起動後）で共有するディスクキャッシュ
+
+    - 1 テーブル = 1 名前空間。行は (key, created_at, value)
+    - 有効期限は読み出し側が created_at と max_age から判定し、期限切れは削除
+    - WAL + busy_timeout で複数プロセスからの同時読み書きに耐える
+    - 接続はスレッドごと（sqlite3 の接続はスレッド間で共有しない）
+    """
+
+    # set がこの回数に達するたびに期限切れ行をまとめて掃除する
+    PURGE_EVERY = 256
+
+    def __init__(
+        self,
+        path: str,
+        table: str,
+        *,
+        max_age_seconds: float,
+        encode: Encoder,
+        decode: Decoder,
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.max_age = max_age_seconds
+        self._encode = encode
+        self._decode = decode
+        self._busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, created_at REAL NOT NULL, value BLOB NOT NULL)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_created_at ON {self.table}(created_at)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self._busy_timeout_ms / 1000.0, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self._busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Tuple[float, Any] | None:
+        """(created_at, value) を返す。期限切れ/破損/DB エラーは None（best-effort）"""
+        try:
+            row = (
+                self._conn()
+                .execute(f"SELECT created_at, value FROM {self.table} WHERE key = ?", (key,))
+                .fetchone()
+            )
+            if row is None:
+                self.misses += 1
+                return None
+            created_at, blob = float(row[0]), row[1]
+            if time.time() - created_at > self.max_age:
+                self._conn().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            value = self._decode(blob)
+        except Exception:  # noqa: BLE001
+            self.errors += 1
+            return None
+        self.hits += 1
+        return created_at, value
+
+    def set(self, key: str, value: Any, created_at: float | None = None) -> None:
+        ts = time.time() if created_at is None else created_at
+        try:
+            blob = self._encode(value)
+            self._conn().execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, created_at, value) VALUES (?, ?, ?)",
+                (key, ts, sqlite3.Binary(blob)),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self.purge()
+        except Exception:  # noqa: BLE001
+            self.errors += 1
+
+    def purge(self) -> int:
+        """期限切れ行を削除し、削除件数を返す"""
+        cur = self._conn().execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.max_age,)
+        )
+        return int(cur.rowcount or 0)
+
+    def clear(self) -> None:
+        self._conn().execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        row = self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return int(row[0]) if row else 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "table": self.table,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "errors": self.errors,
+        }
@@ -31,6 +31,7 @@ def build_d0_features_from_series(
     temp_series: Sequence[float], precip_series: Sequence[float]
 ) -> D0Features:
     """時間解像度の配列から D0 特徴量を構築する（平均/最小/最大/降水合計）"""
+    # float64 の ndarray（ForecastColumns のビュー）ならコピーされない
     t = np.asarray(temp_series, dtype=float)
     p = np.asarray(precip_series, dtype=float)
     if t.size == 0:
@@ -54,7 +55,15 @@ def build_d0_features_via_client(
     クライアントは `fetch_hourly` or `get_hourly` を持つ想定（なければ ValueError）。
     """
     start, end = _as_aware_dt(target_date, tz=tz)
+    hourly = _fetch_hourly(client, lat, lon, start, end, tz)
+    temps: Sequence[float] = hourly["temperature_2m"]
+    precs: Sequence[float] = hourly.get("precipitation", hourly.get("precipitation_sum", []))
+    return build_d0_features_from_series(temps, precs)
+
 
+def _fetch_hourly(
+    client: Any, lat: float, lon: float, start: datetime, end: datetime, tz: str
+) -> Mapping[str, Any]:
     kwargs = dict(
         lat=lat,
         lon=lon,
@@ -71,8 +80,81 @@ def build_d0_features_via_client(
     else:
         raise ValueError("OpenMeteo client must expose fetch_hourly or get_hourly")
 
-    # 期待形: {"hourly": {"temperature_2m": [...], "precipitation": [...]} }
-    hourly: Mapping[str, Any] = data["hourly"]
-    temps: Sequence[float] = hourly["temperature_2m"]
-    precs: Sequence[float] = hourly.get("precipitation", hourly.get("precipitation_sum", []))
-    return build_d0_features_from_series(temps, precs)
+    # 期待形: {"hourly": {"time": [...], "temperature_2m": [...], "precipitation": [...]} }
+    return data["hourly"]
+
+
+# ---- 複数日まとめて（学習/推論用の履歴） ----------------------------------------
+
+D0_FRAME_COLS = ("date", "d_mean", "d_min", "d_max", "d_prec", "n_hours")
+
+
+def build_d0_frame_from_series(
+    times: Sequence[Any], temp_series: Sequence[float], precip_series: Sequence[float]
+) -> pd.DataFrame:
+    """複数日ぶんの hourly 配列を現地日付ごとの D0（平均/最小/最大/降水合計）へ一括集約する
+
+    times は現地の壁時計時刻（Open-Meteo に timezone を渡した応答の hourly.time）。
+    日の切れ目は times の日付が変わる位置で取るので、夏時間の切替日（23/25 時間）も
+    そのまま 1 日として扱う。1 日ぶんの集計は build_d0_features_from_series と同じ
+    （NaN を除いて集計、全時刻 NaN の日は気温が NaN・降水は 0）。
+    返り値は FeaturePipeline にそのまま渡せる列（date, d_mean, d_min, d_max, d_prec）+ n_hours。
+    """
+    days = np.asarray(times, dtype="datetime64[m]").astype("datetime64[D]")
+    t = np.asarray(temp_series, dtype=float)
+    p = np.asarray(precip_series, dtype=float)
+    n = min(len(days), len(t))
+    if n == 0:
+        raise ValueError("temperature series is empty")
+    days, t = days[:n], t[:n]
+    if np.any(days[1:] < days[:-1]):
+        raise ValueError("hourly times must be sorted")
+    # 降水が無い/短い時刻は 0 扱い（nansum と同じ）
+    p = np.concatenate([p[:n], np.zeros(max(0, n - len(p)))])
+
+    # 各日の先頭位置 -> reduceat で日ごとの集計を 1 パスで
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    valid = ~np.isnan(t)
+    cnt = np.add.reduceat(valid.astype(np.int64), starts)
+    total = np.add.reduceat(np.where(valid, t, 0.0), starts)
+    lo = np.minimum.reduceat(np.where(valid, t, np.inf), starts)
+    hi = np.maximum.reduceat(np.where(valid, t, -np.inf), starts)
+    empty = cnt == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(empty, np.nan, total / cnt)
+    lo[empty] = np.nan
+    hi[empty] = np.nan
+    prec = np.add.reduceat(np.where(np.isnan(p), 0.0, p), starts)
+
+    return pd.DataFrame(
+        {
+            "date": days[starts].astype("datetime64[ns]"),
+            "d_mean": mean,
+            "d_min": lo,
+            "d_max": hi,
+            "d_prec": prec,
+            "n_hours": np.diff(np.r_[starts, n]),
+        }
+    )
+
+
+def build_d0_frame_via_client(
+    lat: float,
+    lon: float,
+    start_date: date,
+    end_date: date,
+    client: Any,
+    tz: str = "Asia/Tokyo",
+) -> pd.DataFrame:
+    """start_date〜end_date（両端含む・現地日付）の hourly を 1 回の取得で受け取り、
+    日次 D0 の表を返す"""
+    if end_date < start_date:
+        raise ValueError("end_date must be on or after start_date")
+    start = _as_aware_dt(start_date, tz=tz)[0]
+    end = _as_aware_dt(end_date, tz=tz)[1]
+    hourly = _fetch_hourly(client, lat, lon, start, end, tz)
+    precs = hourly.get("precipitation", hourly.get("precipitation_sum", []))
+    df = build_d0_frame_from_series(hourly["time"], hourly["temperature_2m"], precs)
+    # 上流が範囲外の時刻を含めて返しても対象期間だけに絞る
+    lo, hi = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    return df[(df["date"] >= lo) & (df["date"] <= hi)].reset_index(drop=True)
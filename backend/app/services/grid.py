@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass
+from typing import Tuple
+
+# 格子スナップの方式
+GRID_OFF = "off"
+GRID_DEGREE = "degree"
+GRID_GEOHASH = "geohash"
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+@dataclass(frozen=True)
+class GridSpec:
+    """座標 → 代表セルへの写像の設定
+
+    Open-Meteo のモデル格子は km オーダーなので、数十 m 違いのクリックは同じセルに寄せて
+    キャッシュ/上流リクエストを共有する。
+    """
+
+    mode: str = GRID_DEGREE
+    degree: float = 0.1  # mode=degree のセル幅[deg]
+    geohash_precision: int = 5  # mode=geohash の桁数（5 ≒ 4.9km x 4.9km）
+
+    @classmethod
+    def from_env(cls) -> "GridSpec":
+        return cls(
+            mode=os.getenv("OPEN_METEO_GRID_MODE", GRID_DEGREE).strip().lower(),
+            degree=float(os.getenv("OPEN_METEO_GRID_DEG", "0.1")),
+            geohash_precision=int(os.getenv("OPEN_METEO_GEOHASH_PRECISION", "5")),
+        )
+
+
+def _normalize(lat: float, lon: float) -> Tuple[float, float]:
+    lat = max(-90.0, min(90.0, float(lat)))
+    lon = ((float(lon) + 180.0) % 360.0) - 180.0
+    return lat, lon
+
+
+def _snap_degree(lat: float, lon: float, step: float) -> Tuple[float, float]:
+    # セル中心ではなく格子点（step の整数倍）へ丸める。表記ゆれ防止に桁を固定
+    digits = max(0, -int(math.floor(math.log10(step)))) + 2
+    return (
+        round(round(lat / step) * step, digits),
+        round(round(lon / step) * step, digits),
+    )
+
+
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    lat_rng = [-90.0, 90.0]
+    lon_rng = [-180.0, 180.0]
+    out = []
+    bit, ch, even = 0, 0, True
+    while len(out) < precision:
+        rng, val = (lon_rng, lon) if even else (lat_rng, lat)
+        mid = (rng[0] + rng[1]) / 2.0
+        if val >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            out.append(_GEOHASH_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(out)
+
+
+def geohash_center(gh: str) -> Tuple[float, float]:
+    lat_rng = [-90.0, 90.0]
+    lon_rng = [-180.0, 180.0]
+    even = True
+    for c in gh:
+        idx = _GEOHASH_BASE32.index(c)
+        for shift in range(4, -1, -1):
+            rng = lon_rng if even else lat_rng
+            mid = (rng[0] + rng[1]) / 2.0
+            if (idx >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (
+        round((lat_rng[0] + lat_rng[1]) / 2.0, 6),
+        round((lon_rng[0] + lon_rng[1]) / 2.0, 6),
+    )
+
+
+def snap(lat: float, lon: float, spec: GridSpec | None = None) -> Tuple[float, float]:
+    """座標を代表セルの座標へ写す（mode=off なら正規化のみ）"""
+    spec = spec or GRID
+    lat, lon = _normalize(lat, lon)
+    if spec.mode == GRID_DEGREE and spec.degree > 0:
+        return _snap_degree(lat, lon, spec.degree)
+    if spec.mode == GRID_GEOHASH and spec.geohash_precision > 0:
+        return geohash_center(geohash_encode(lat, lon, spec.geohash_precision))
+    return lat, lon
+
+
+def cell_key(lat: float, lon: float, spec: GridSpec | None = None) -> str:
+    """キャッシュキー用のセル識別子"""
+    spec = spec or GRID
+    if spec.mode == GRID_GEOHASH and spec.geohash_precision > 0:
+        return f"gh:{geohash_encode(*_normalize(lat, lon), spec.geohash_precision)}"
+    s_lat, s_lon = snap(lat, lon, spec)
+    return f"{s_lat:.4f}:{s_lon:.4f}"
+
+
+GRID = GridSpec.from_env()
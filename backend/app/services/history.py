@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .feature_builder import (
+    D0Features,
+    build_d0_features_via_client,
+    build_d0_frame_via_client,
+)
+from .grid import cell_key
+from .open_meteo import HOURLY_CACHE_TTL, _LRUCache
+
+# 地点セルごとの日次集計（過去日は確定値として保持）
+HISTORY_CACHE_MAX_CELLS = int(os.getenv("HISTORY_CACHE_MAX_CELLS", "4096"))
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", str(7 * 24 * 3600)))
+# (セル, D0) ごとの組み立て結果。キーに D0 を含むので日付が変われば自然に作り直す。
+# D0 の値は当日中も動くので、TTL は hourly キャッシュの TTL を超えない（超える指定は切り詰める）
+HISTORY_MEMO_MAX_ENTRIES = int(os.getenv("HISTORY_MEMO_MAX_ENTRIES", "4096"))
+HISTORY_MEMO_TTL = min(int(os.getenv("HISTORY_MEMO_TTL", str(HOURLY_CACHE_TTL))), HOURLY_CACHE_TTL)
+
+_BASE_COLS = ("d_mean", "d_min", "d_max", "d_prec")
+_NAN_ROW = (np.nan, np.nan, np.nan, np.nan)
+
+DailyRows = Dict[date, Tuple[float, float, float, float]]
+
+
+@dataclass(frozen=True)
+class AssembledHistory:
+    """推論 1 地点ぶんの入力
+
+    - frame: date + d_*（古い→新しい、最終行が D0）。上流に無かった日は NaN 行
+    - features: pipeline.transform 済みの D0 行 (1, 特徴量数)。pipeline 未指定なら None
+    """
+
+    cell: str
+    d0_date: date
+    d0: D0Features
+    frame: pd.DataFrame
+    features: np.ndarray | None = None
+    pipeline: Any = None
+
+
+class HistoryAssembler:
+    """(lat, lon, tz, D0) -> モデル入力（履歴つき特徴量）を組み立てる
+
+    - 必要な履歴は pipeline.required_history_days()（max(ma_windows)+1 日、D0 を含む）
+    - セルごとの日次集計を保持し、足りない過去日と D0 だけを 1 回の hourly 取得で補う
+    - 結果は (セル, tz, D0, pipeline) でメモ化。同じ地点は hourly キャッシュの TTL 内なら
+      メモ参照だけ
+    """
+
+    def __init__(
+        self,
+        max_cells: int = HISTORY_CACHE_MAX_CELLS,
+        daily_ttl: int = HISTORY_CACHE_TTL,
+        memo_entries: int = HISTORY_MEMO_MAX_ENTRIES,
+        memo_ttl: int = HISTORY_MEMO_TTL,
+    ) -> None:
+        self._daily = _LRUCache(ttl_seconds=daily_ttl, max_entries=max_cells)
+        self._memo = _LRUCache(
+            ttl_seconds=min(memo_ttl, HOURLY_CACHE_TTL), max_entries=memo_entries
+        )
+        self.fetches = 0
+
+    def assemble(
+        self,
+        lat: float,
+        lon: float,
+        tz: str,
+        d0_date: date,
+        client: Any,
+        pipeline: Any = None,
+    ) -> AssembledHistory:
+        cell = cell_key(lat, lon)
+        key = f"{cell}:{tz}:{d0_date.isoformat()}:{id(pipeline)}"
+        hit = self._memo.get(key)
+        # id は再利用されうるので同一オブジェクトかも確かめる
+        if hit is not None and hit.pipeline is pipeline:
+            return hit
+
+        days = pipeline.required_history_days() if pipeline is not None else 1
+        frame, d0 = self._daily_frame(cell, lat, lon, tz, d0_date, days, client)
+        features = None
+        if pipeline is not None:
+            pipe = pipeline.with_group_cols(()) if pipeline.config.group_cols else pipeline
+            features = pipe.transform(frame, as_array=True)[-1:]
+        out = AssembledHistory(cell, d0_date, d0, frame, features, pipeline)
+        self._memo.set(key, out)
+        return out
+
+    def clear(self) -> None:
+        self._daily.clear()
+        self._memo.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"daily": self._daily.stats(), "memo": self._memo.stats(), "fetches": self.fetches}
+
+    # ---- internal -----------------------------------------------------------
+    def _daily_frame(
+        self,
+        cell: str,
+        lat: float,
+        lon: float,
+        tz: str,
+        d0_date: date,
+        days: int,
+        client: Any,
+    ) -> Tuple[pd.DataFrame, D0Features]:
+        dates = [d0_date - timedelta(days=k) for k in range(max(1, days) - 1, -1, -1)]
+        store_key = f"{cell}:{tz}"
+        rows: DailyRows = dict(self._daily.get(store_key) or {})
+        missing = [d for d in dates[:-1] if d not in rows]
+
+        # 足りない過去日〜D0 を 1 回で取得（D0 は当日中も値が動くので毎回取り直す）
+        fetched = build_d0_frame_via_client(
+            lat, lon, missing[0] if missing else d0_date, d0_date, client, tz=tz
+        )
+        self.fetches += 1
+        got = {
+            ts.date(): tuple(float(v) for v in vals)
+            for ts, *vals in fetched[["date", *_BASE_COLS]].itertuples(index=False)
+        }
+        for d in missing:
+            # 上流に無かった日も NaN で埋めて覚える（毎回取り直さない）
+            rows[d] = got.get(d, _NAN_ROW)
+        if missing:
+            # 書き込みは差し替え（読み手が持つ dict は変更しない）
+            self._daily.set(store_key, rows)
+
+        if d0_date in got:
+            d0 = D0Features(*got[d0_date])
+        else:
+            # 範囲指定に従わない上流（当日ぶんだけ返す等）は従来どおり D0 単独で取得
+            d0 = build_d0_features_via_client(lat, lon, d0_date, client, tz=tz)
+            self.fetches += 1
+
+        values = [rows.get(d, _NAN_ROW) for d in dates[:-1]]
+        values.append((d0.d0_mean, d0.d0_min, d0.d0_max, d0.d0_prec))
+        frame = pd.DataFrame(values, columns=list(_BASE_COLS))
+        frame.insert(0, "date", pd.to_datetime(dates))
+        return frame, d0
+
+
+_assembler: HistoryAssembler | None = None
+
+
+def get_history_assembler() -> HistoryAssembler:
+    global _assembler
+    if _assembler is None:
+        _assembler = HistoryAssembler()
+    return _assembler
@@ -3,12 +3,42 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import random
+import sys
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
-from datetime import date, datetime
-from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple, Union
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from zoneinfo import ZoneInfo
 
 import httpx
+import numpy as np
+import pandas as pd
+
+from ..utils import datetime_utils as dtmod, json_utils
+from ..utils.circuit_breaker import CircuitBreaker
+from .disk_cache import SQLiteCache
+from .grid import cell_key, snap
 
 # --- 追加：QueryParam互換の型エイリアス ---
 QPAtom = Union[str, int, float, bool, None]
@@ -20,7 +50,20 @@ try:
     from app.observability import record_ext_api_call  # type: ignore
 except Exception:  # pragma: no cover
 
-    def record_ext_api_call(url: str, status: int, duration_ms: float) -> None:  # type: ignore
+    def record_ext_api_call(  # type: ignore
+        url: str, status: int, duration_ms: float, queue_wait_ms: float = 0.0
+    ) -> None:
+        return
+
+
+try:
+    from app.observability import counter_inc, register_stats  # type: ignore
+except Exception:  # pragma: no cover
+
+    def counter_inc(name: str, n: int = 1) -> None:  # type: ignore
+        return
+
+    def register_stats(name: str, fn: Callable[[], Dict[str, Any]]) -> None:  # type: ignore
         return
 
 
@@ -35,48 +78,747 @@ ParamSeq = Sequence[ParamAtom]
 ParamValue = Union[ParamAtom, ParamSeq]
 
 
-# ---- 簡易メモリキャッシュ（TTL秒） ----
-class _TTLCache:
-    def __init__(self, ttl_seconds: int = 300) -> None:
+# ---- メモリキャッシュ（TTL + LRU、件数/バイト数上限つき） ----
+def _approx_size(value: Any, _depth: int = 0) -> int:
+    """JSON 由来の値（dict/list/str/数値）のおおよそのメモリ量 [bytes]"""
+    if _depth > 16:
+        return 0
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            _approx_size(k, _depth + 1) + _approx_size(v, _depth + 1) for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        size += sum(_approx_size(v, _depth + 1) for v in value)
+    elif isinstance(value, (np.ndarray, ForecastColumns, ForecastWindow)):
+        size += int(value.nbytes)
+    elif hasattr(value, "__dataclass_fields__"):
+        size += sum(_approx_size(getattr(value, f), _depth + 1) for f in value.__dataclass_fields__)
+    return size
+
+
+class _LRUCache:
+    """TTL つき LRU キャッシュ（スレッドセーフ）
+
+    - max_entries / max_bytes を超えたら最も古く使われたものから O(1) で追い出す
+    - TTL は全件共通なので「書き込み順 = 期限切れ順」。get/set のたびに先頭から
+      期限切れを掃除するため、読まれないキーも溜まり続けない
+    - grace_seconds > 0 なら TTL 切れ後もその間は保持し、peek() で stale として参照できる
+      （stale-while-revalidate 用。get() は常に fresh のみ返す）
+    - 統計: hits / misses / evictions / expirations / entries / bytes
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        grace_seconds: float = 0.0,
+    ) -> None:
         self.ttl = ttl_seconds
-        self._store: Dict[str, Tuple[float, Any]] = {}
+        self.grace = max(0.0, grace_seconds)
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._lock = threading.Lock()
+        # key -> (ts, size, value)。並び = LRU 順（末尾が最新）
+        self._store: OrderedDict[str, Tuple[float, int, Any]] = OrderedDict()
+        # key -> ts。並び = 書き込み順（先頭から期限切れ）
+        self._written: OrderedDict[str, float] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
 
     def get(self, key: str) -> Any | None:
-        now = time.time()
-        hit = self._store.get(key)
-        if not hit:
+        with self._lock:
+            now = time.time()
+            self._sweep(now)
+            hit = self._store.get(key)
+            if hit is None or now - hit[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+            return hit[2]
+
+    def peek(self, key: str) -> Tuple[Any, bool] | None:
+        """(value, fresh) を返す。TTL 切れでも猶予期間内なら fresh=False（統計は更新しない）"""
+        with self._lock:
+            hit = self._store.get(key)
+            if hit is None:
+                return None
+            age = time.time() - hit[0]
+            if age > self.ttl + self.grace:
+                return None
+            return hit[2], age <= self.ttl
+
+    def set(self, key: str, value: Any, ts: float | None = None) -> None:
+        """ts: 値の取得時刻（下位ティアから昇格させる際に元の鮮度を引き継ぐ）"""
+        size = _approx_size(value)
+        with self._lock:
+            now = time.time()
+            ts = now if ts is None else ts
+            self._drop(key)
+            if size > self.max_bytes:
+                # 1 件で上限超過するものは保持しない
+                return
+            # 昇格分は書き込み順 ≠ 期限順になるが、get/peek 側で期限を判定するので安全
+            self._store[key] = (ts, size, value)
+            self._written[key] = ts
+            self._bytes += size
+            self._sweep(now)
+            while len(self._store) > self.max_entries or self._bytes > self.max_bytes:
+                old, (_, old_size, _) = self._store.popitem(last=False)
+                self._forget(old, old_size)
+                self.evictions += 1
+
+    # async 経路用（_TieredCache と同じインターフェース。メモリ層だけなので即時）
+    async def aget(self, key: str) -> Any | None:
+        return self.get(key)
+
+    async def apeek(self, key: str) -> Tuple[Any, bool] | None:
+        return self.peek(key)
+
+    async def aset(self, key: str, value: Any, ts: float | None = None) -> None:
+        self.set(key, value, ts=ts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self._written.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._store),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # ---- internal（ロック保持下で呼ぶ）---------------------------------------
+    def _sweep(self, now: float) -> None:
+        while self._written:
+            key, ts = next(iter(self._written.items()))
+            if now - ts <= self.ttl + self.grace:
+                break
+            self._drop(key)
+            self.expirations += 1
+
+    def _drop(self, key: str) -> None:
+        hit = self._store.pop(key, None)
+        if hit is not None:
+            self._forget(key, hit[1])
+
+    def _forget(self, key: str, size: int) -> None:
+        self._written.pop(key, None)
+        self._bytes -= size
+
+
+class _TieredCache:
+    """メモリ(L1: _LRUCache) → ディスク(L2: SQLiteCache) の 2 段キャッシュ
+
+    - 読み: L1 ミス時に L2 を参照し、ヒットしたら元の取得時刻のまま L1 へ昇格
+    - 書き: L1/L2 へ write-through（L2 は他ワーカー/再起動後のプロセスと共有）
+    - インターフェースは _LRUCache と同じ（get/set/peek/stats/clear）
+    - aget/apeek/aset は async 経路用: sqlite3 はブロッキング（busy_timeout で最大数秒待つ）
+      なので、L2 の読みはスレッドで行い、書きは専用スレッドへの write-behind にする
+    """
+
+    def __init__(self, mem: _LRUCache, disk: SQLiteCache) -> None:
+        self.mem = mem
+        self.disk = disk
+        # 書き込み順を保つため 1 スレッド
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"om-{disk.table}")
+
+    @property
+    def ttl(self) -> int:
+        return self.mem.ttl
+
+    @property
+    def grace(self) -> float:
+        return self.mem.grace
+
+    def _from_disk(self, key: str) -> Tuple[Any, float] | None:
+        hit = self.disk.get(key)
+        if hit is None:
             return None
         ts, value = hit
-        if now - ts > self.ttl:
-            self._store.pop(key, None)
+        self.mem.set(key, value, ts=ts)
+        return value, time.time() - ts
+
+    def get(self, key: str) -> Any | None:
+        value = self.mem.get(key)
+        if value is not None:
+            return value
+        hit = self._from_disk(key)
+        if hit is None or hit[1] > self.mem.ttl:
+            return None
+        return hit[0]
+
+    def peek(self, key: str) -> Tuple[Any, bool] | None:
+        found = self.mem.peek(key)
+        if found is not None:
+            return found
+        hit = self._from_disk(key)
+        if hit is None:
+            return None
+        return hit[0], hit[1] <= self.mem.ttl
+
+    def set(self, key: str, value: Any, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        self.mem.set(key, value, ts=ts)
+        self.disk.set(key, value, created_at=ts)
+
+    async def aget(self, key: str) -> Any | None:
+        value = self.mem.get(key)
+        if value is not None:
+            return value
+        hit = await asyncio.to_thread(self._from_disk, key)
+        if hit is None or hit[1] > self.mem.ttl:
             return None
-        return value
+        return hit[0]
+
+    async def apeek(self, key: str) -> Tuple[Any, bool] | None:
+        found = self.mem.peek(key)
+        if found is not None:
+            return found
+        hit = await asyncio.to_thread(self._from_disk, key)
+        if hit is None:
+            return None
+        return hit[0], hit[1] <= self.mem.ttl
+
+    async def aset(self, key: str, value: Any, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        self.mem.set(key, value, ts=ts)
+        # エンコードも含めて writer スレッドで（失敗は SQLiteCache 側で数えて握りつぶす）
+        self._writer.submit(self.disk.set, key, value, ts)
+
+    def flush(self) -> None:
+        """write-behind の書き込みが済むまで待つ（テスト・終了処理用）"""
+        self._writer.submit(lambda: None).result()
+
+    def clear(self) -> None:
+        self.mem.clear()
+        self.disk.clear()
+
+    def __len__(self) -> int:
+        return len(self.mem)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.mem.stats(), "disk": self.disk.stats()}
+
+
+def _encode_cache_value(value: Any) -> bytes:
+    # ForecastResult は dump_cache_to_file と同じ列構成でタグ付けして保存
+    if isinstance(value, ForecastResult):
+        value = {"__forecast_result__": _forecast_to_dict(value)}
+    elif isinstance(value, ForecastColumns):
+        value = {"__forecast_columns__": value.to_json_dict()}
+    elif isinstance(value, ForecastWindow):
+        value = {"__forecast_window__": value.to_json_dict()}
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_cache_value(blob: bytes) -> Any:
+    data = json.loads(blob)
+    if isinstance(data, dict) and "__forecast_result__" in data:
+        return _forecast_from_dict(data["__forecast_result__"])
+    if isinstance(data, dict) and "__forecast_columns__" in data:
+        return ForecastColumns.from_json_dict(data["__forecast_columns__"])
+    if isinstance(data, dict) and "__forecast_window__" in data:
+        return ForecastWindow.from_json_dict(data["__forecast_window__"])
+    return data
 
-    def set(self, key: str, value: Any) -> None:
-        self._store[key] = (time.time(), value)
 
+def _make_cache(mem: _LRUCache, table: str) -> _LRUCache | _TieredCache:
+    """OPEN_METEO_DISK_CACHE_PATH が設定されていればディスク層を重ねる"""
+    path = os.getenv("OPEN_METEO_DISK_CACHE_PATH", "").strip()
+    if not path:
+        return mem
+    try:
+        disk = SQLiteCache(
+            path,
+            table,
+            max_age_seconds=mem.ttl + mem.grace,
+            encode=_encode_cache_value,
+            decode=_decode_cache_value,
+        )
+    except Exception:  # noqa: BLE001  ディスク層が使えなくてもメモリ層だけで動かす
+        return mem
+    return _TieredCache(mem, disk)
+
+
+# hourly の鮮度[s]（当日ぶんの値はこの間隔で取り直される）
+HOURLY_CACHE_TTL = int(os.getenv("OPEN_METEO_CACHE_TTL", "300"))
 
-_cache = _TTLCache(ttl_seconds=int(os.getenv("OPEN_METEO_CACHE_TTL", "300")))
+_cache = _make_cache(
+    _LRUCache(
+        ttl_seconds=HOURLY_CACHE_TTL,
+        max_entries=int(os.getenv("OPEN_METEO_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("OPEN_METEO_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ),
+    "hourly",
+)
+
+# /forecast（日次）専用のキャッシュ（独立設定可能）
+_daily_cache = _make_cache(
+    _LRUCache(
+        ttl_seconds=int(os.getenv("OPEN_METEO_DAILY_CACHE_TTL", "300")),
+        max_entries=int(os.getenv("OPEN_METEO_DAILY_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("OPEN_METEO_DAILY_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        # stale-while-revalidate の猶予[s]。0 なら無効（TTL 切れ = 取得し直し）
+        grace_seconds=float(os.getenv("OPEN_METEO_DAILY_SWR_GRACE", "0")),
+    ),
+    "daily",
+)
 
-# /forecast（日次）専用のTTLキャッシュ（独立設定可能）
-_daily_cache = _TTLCache(ttl_seconds=int(os.getenv("OPEN_METEO_DAILY_CACHE_TTL", "300")))
+# 応答の鮮度（/forecast の X-Cache-Freshness ヘッダ値）
+FRESHNESS_FRESH = "fresh"
+FRESHNESS_STALE = "stale"
+FRESHNESS_REVALIDATING = "revalidating"
+
+# バックグラウンド再検証タスクの参照保持（GC で消えないように）
+_background_tasks: set[asyncio.Task[Any]] = set()
+# 直近の再検証が上流失敗に終わったキー（次の応答は revalidating ではなく stale）
+_revalidate_failed: set[str] = set()
+
+register_stats("open_meteo.cache.hourly", _cache.stats)
+register_stats("open_meteo.cache.daily", _daily_cache.stats)
 
 
 def _daily_cache_key(lat: float, lon: float, tz: str, days: int) -> str:
-    return f"daily:{lat:.4f}:{lon:.4f}:{tz}:{int(days)}"
+    # 座標はセル単位（近傍のクリックは同じエントリを共有）。値は ForecastWindow（past_days=days）
+    return f"daily:{cell_key(lat, lon)}:{tz}:{int(days)}"
+
+
+# (セル, tz) ごとにこのプロセスで取得したウィンドウの past_days（hourly 側の探索用）
+_window_past_days: Dict[str, set[int]] = {}
+_window_lock = threading.Lock()
+
+
+def _remember_window(lat: float, lon: float, tz: str, past_days: int) -> None:
+    with _window_lock:
+        _window_past_days.setdefault(f"{cell_key(lat, lon)}:{tz}", set()).add(int(past_days))
+
+
+def _window_candidates(lat: float, lon: float, tz: str, need: int) -> List[int]:
+    """need 日以上遡れるウィンドウの past_days 候補（小さい順。既定ウィンドウは常に候補）"""
+    with _window_lock:
+        seen = set(_window_past_days.get(f"{cell_key(lat, lon)}:{tz}", ()))
+    return sorted(p for p in seen | {WINDOW_DEFAULT_PAST_DAYS} if p >= need)
+
+
+# ---- 同一キーの同時取得を 1 本にまとめる（single-flight） ----
+T = TypeVar("T")
+
+
+class _AsyncSingleFlight:
+    """同じキーで進行中の取得があれば、その Task の結果を共有する（asyncio 用）
+
+    取得本体は独立した Task で走らせるため、先頭の呼び出し元がキャンセルされても
+    後続の待ち手には結果が届く。
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task[Any]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            counter_inc(f"open_meteo.{self.name}.coalesced")
+            return await asyncio.shield(task)
+
+        counter_inc(f"open_meteo.{self.name}.issued")
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key, None)
+        # 待ち手が全員キャンセル済みでも "exception was never retrieved" を出さない
+        if not task.cancelled():
+            task.exception()
+
+
+class _SyncSingleFlight:
+    """同じキーで進行中の取得があれば、その結果を待って共有する（スレッド用）"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future[Any]] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if fut is None:
+                fut = Future()
+                self._inflight[key] = fut
+        if not leader:
+            counter_inc(f"open_meteo.{self.name}.coalesced")
+            return fut.result()
+
+        counter_inc(f"open_meteo.{self.name}.issued")
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+# 複数座標のまとめ取得: 収集窓[ms]（0 = 同じイベントループ周回の分だけまとめる）と 1 回の上限地点数
+BATCH_WINDOW_MS = float(os.getenv("OPEN_METEO_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_LOCATIONS = int(os.getenv("OPEN_METEO_BATCH_MAX_LOCATIONS", "50"))
+
+Point = Tuple[float, float]
+
+
+class _AsyncBatcher:
+    """同じグループ（tz, past_days 等）の取得要求を短い収集窓で集め、1 回の上流呼び出しで取る
+
+    Open-Meteo は latitude/longitude にカンマ区切りの複数座標を受け、結果を配列で返す。
+    最初の要求で収集を始め、window 経過（または max_items 到達）で fetch_many(points) を
+    1 回呼んで結果を各呼び出し元へ配る。同じ座標の要求は 1 つにまとめる。
+    fetch_many は地点単位の失敗を結果リスト内の例外オブジェクトで返してよい（その待ち手だけ失敗）。
+    """
+
+    def __init__(self, name: str, window_ms: float, max_items: int) -> None:
+        self.name = name
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_items = max(1, max_items)
+        self._pending: Dict[Any, Dict[Point, asyncio.Future[Any]]] = {}
+        self._tasks: set[asyncio.Task[Any]] = set()
+
+    async def submit(
+        self,
+        group: Any,
+        point: Point,
+        fetch_many: Callable[[List[Point]], Awaitable[List[Any]]],
+    ) -> Any:
+        batch = self._pending.get(group)
+        if batch is None:
+            batch = self._pending[group] = {}
+            task = asyncio.ensure_future(self._flush(group, batch, fetch_many))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        fut = batch.get(point)
+        if fut is None:
+            fut = batch[point] = asyncio.get_running_loop().create_future()
+            # 待ち手がキャンセル済みでも "exception was never retrieved" を出さない
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+            if len(batch) >= self.max_items:
+                # 満杯: 以降の要求は次のバッチへ（このバッチは収集窓の終わりに送る）
+                self._pending.pop(group, None)
+        else:
+            counter_inc(f"open_meteo.{self.name}.coalesced")
+        return await asyncio.shield(fut)
+
+    async def _flush(
+        self,
+        group: Any,
+        batch: Dict[Point, asyncio.Future[Any]],
+        fetch_many: Callable[[List[Point]], Awaitable[List[Any]]],
+    ) -> None:
+        try:
+            try:
+                await asyncio.sleep(self.window)
+            finally:
+                if self._pending.get(group) is batch:
+                    self._pending.pop(group, None)
+            points = list(batch)
+            counter_inc(f"open_meteo.{self.name}.requests")
+            counter_inc(f"open_meteo.{self.name}.locations", len(points))
+            results = await fetch_many(points)
+            # 件数が合わない応答も全待ち手への失敗として扱う（黙って取りこぼすと待ち続ける）
+            pairs = list(zip(batch.values(), results, strict=True))
+        except BaseException as e:
+            # 失敗（キャンセル含む）はバッチ内の全待ち手へ伝える
+            for fut in batch.values():
+                if fut.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    fut.cancel()
+                else:
+                    fut.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for fut, res in pairs:
+            if fut.done():
+                continue
+            if isinstance(res, asyncio.CancelledError):
+                fut.cancel()
+            elif isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+
+_daily_flight = _AsyncSingleFlight("daily")
+_daily_batcher = _AsyncBatcher("daily_batch", BATCH_WINDOW_MS, BATCH_MAX_LOCATIONS)
+# 同期経路（get_hourly）から共有ウィンドウを取りに行くとき
+_window_flight = _SyncSingleFlight("window")
+_hourly_flight = _SyncSingleFlight("hourly")
+_hourly_async_flight = _AsyncSingleFlight("hourly_async")
+# get_forecast は同じ _cache キー空間でも戻り値の型が違うため別系統
+_forecast_flight = _SyncSingleFlight("forecast")
+_forecast_async_flight = _AsyncSingleFlight("forecast_async")
 
 
 # AsyncClient の再利用（DNS/TLS再確立を回避してレイテンシ低減）
 _async_client: httpx.AsyncClient | None = None
 
+# 同期経路用の永続 Client（スレッドセーフ。試行ごとの TCP+TLS 確立を避ける）
+_sync_client: httpx.Client | None = None
+_sync_client_lock = threading.Lock()
+
+
+def _decode_response(resp: Any) -> Dict[str, Any]:
+    """レスポンス本文を高速 JSON バックエンドで decode（本文が取れない場合は resp.json()）"""
+    content = getattr(resp, "content", None)
+    if isinstance(content, (bytes, bytearray)) and content:
+        return json_utils.loads(content)
+    return resp.json()
+
+
+# ===== 上流保護（接続プール上限・同時実行数・バックオフ・サーキットブレーカー）========
+
+# コネクションプール（既定の無制限に近い設定だと急増時に数百接続を張る）。同期/非同期で別々に持つ
+POOL_MAX_CONNECTIONS = int(os.getenv("OPEN_METEO_POOL_MAX_CONNECTIONS", "32"))
+POOL_MAX_KEEPALIVE = int(os.getenv("OPEN_METEO_POOL_MAX_KEEPALIVE", "16"))
+# 同時に上流へ出すリクエスト数のプロセス全体の上限（超過分はここで待つ。待ち時間は queue_wait_ms）
+MAX_CONCURRENCY = int(os.getenv("OPEN_METEO_MAX_CONCURRENCY", "16"))
+# リトライ待ちの上限[s]（Retry-After もこの値で頭打ち）
+RETRY_MAX_DELAY = float(os.getenv("OPEN_METEO_RETRY_MAX_DELAY", "10"))
+# サーキットブレーカー: 窓[s]内の失敗回数で open、reset 秒後に half-open
+CB_THRESHOLD = int(os.getenv("OPEN_METEO_CB_THRESHOLD", "5"))
+CB_WINDOW_S = float(os.getenv("OPEN_METEO_CB_WINDOW_S", "10.0"))
+CB_RESET_TIMEOUT_S = float(os.getenv("OPEN_METEO_CB_RESET_TIMEOUT_S", "30.0"))
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS, max_keepalive_connections=POOL_MAX_KEEPALIVE
+    )
+
+
+def _resolve_waiter(fut: "asyncio.Future[None]") -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class UpstreamUnavailable(RuntimeError):
+    """サーキットが open の間は上流を叩かずにこれを送出する"""
+
+
+class _ConcurrencyLimiter:
+    """上流への同時リクエスト数をプロセス全体で limit 以下に保つ
+
+    同期経路（スレッド）とすべてのイベントループが 1 つの BoundedSemaphore を共有する。
+    同期側はそのまま acquire して待ち、asyncio 側はループを止めないよう非ブロッキングで取り、
+    取れなければ待ち行列に Future を積んで、枠が返るたびに 1 つずつ起こされて取り直す。
+    slot()/aslot() は枠が空くまで待ち、待った時間[ms]を返す。枠は 1 試行ぶんだけ保持し、
+    リトライ待ちの間は手放す。
+    同期/非同期の httpx クライアントはそれぞれ POOL_MAX_CONNECTIONS のプールを持つが、
+    同時に使われる接続は合わせてこの limit までになる（残りは keep-alive の待機接続）。
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self._sem = threading.BoundedSemaphore(self.limit)
+        # 枠待ちの asyncio 側（ループをまたぐので threading のロックで守る）
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = deque()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_wait_ms = 0.0
+
+    def _enter(self, t0: float) -> float:
+        wait_ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        return wait_ms
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._sem.release()
+        self._wake_one()
+
+    def _wake_one(self) -> None:
+        """枠待ちの asyncio 側を 1 つ起こす（取れるかは起きた側が確かめる）"""
+        with self._lock:
+            while self._waiters:
+                loop, fut = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_resolve_waiter, fut)
+                except RuntimeError:  # ループが閉じている
+                    continue
+                return
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        with self._lock:
+            self.waiting += 1
+        t0 = time.perf_counter()
+        try:
+            self._sem.acquire()
+        except BaseException:
+            with self._lock:
+                self.waiting -= 1
+            raise
+        wait_ms = self._enter(t0)
+        try:
+            yield wait_ms
+        finally:
+            self._release()
+
+    async def _aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # 取れなかったときの登録までをロック内で行う（その間の release を取りこぼさない）
+            with self._lock:
+                if self._sem.acquire(blocking=False):
+                    return
+                fut: asyncio.Future[None] = loop.create_future()
+                self._waiters.append((loop, fut))
+            try:
+                await fut
+            except BaseException:
+                with self._lock:
+                    if (loop, fut) in self._waiters:
+                        self._waiters.remove((loop, fut))
+                        woken = False
+                    else:
+                        woken = True
+                if woken:
+                    # 起こされた後に取り消された: 起床を次の待ち手へ譲る
+                    self._wake_one()
+                raise
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[float]:
+        with self._lock:
+            self.waiting += 1
+        t0 = time.perf_counter()
+        try:
+            await self._aacquire()
+        except BaseException:
+            with self._lock:
+                self.waiting -= 1
+            raise
+        wait_ms = self._enter(t0)
+        try:
+            yield wait_ms
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+        }
+
+
+_limiter = _ConcurrencyLimiter(MAX_CONCURRENCY)
+_breaker = CircuitBreaker(CB_THRESHOLD, CB_WINDOW_S, CB_RESET_TIMEOUT_S)
+register_stats("open_meteo.upstream", lambda: {**_limiter.stats(), "circuit": _breaker.stats()})
+
+
+def _retryable(status: int) -> bool:
+    # 429 と 5xx・通信失敗(599) は再試行。それ以外の 4xx は何度送っても同じ
+    return status == 429 or not 400 <= status < 500
+
+
+def _is_client_error(e: BaseException) -> bool:
+    """再試行しても変わらない 4xx の HTTP エラーか（429 は除く）"""
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return isinstance(status, int) and not _retryable(status)
+
+
+def _retry_after(resp: Any) -> float | None:
+    """429/503 の Retry-After（秒数 or HTTP-date）を秒で。無い・読めなければ None"""
+    if getattr(resp, "status_code", None) not in (429, 503):
+        return None
+    value = (getattr(resp, "headers", None) or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _check_circuit(url: str) -> None:
+    if not _breaker.allow():
+        counter_inc("open_meteo.circuit_rejected")
+        raise UpstreamUnavailable(f"{url} temporarily unavailable (circuit open)")
+
 
 def _get_async_client(timeout: float, headers: Dict[str, str]) -> httpx.AsyncClient:
     global _async_client
     if _async_client is None:
-        _async_client = httpx.AsyncClient(timeout=timeout, headers=headers)
+        _async_client = httpx.AsyncClient(timeout=timeout, headers=headers, limits=_pool_limits())
     return _async_client
 
 
+def _get_sync_client(timeout: float, headers: Dict[str, str]) -> httpx.Client:
+    global _sync_client
+    if _sync_client is None:
+        with _sync_client_lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(timeout=timeout, headers=headers, limits=_pool_limits())
+    return _sync_client
+
+
+def close_clients() -> None:
+    """プロセス終了時に同期 Client のコネクションプールを閉じる"""
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+async def aclose_clients() -> None:
+    """プロセス終了時に両方の Client のコネクションプールを閉じる"""
+    global _async_client
+    close_clients()
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
 @dataclass(frozen=True)
 class ForecastResult:
     """明日予測に必要な配列（時系列）"""
@@ -86,6 +828,215 @@ class ForecastResult:
     precipitation: List[float]
 
 
+# キャッシュ上の数値列の dtype（float32 でメモリ半減。既定は入力と同じ精度の float64）
+COLUMN_DTYPE = np.dtype(os.getenv("OPEN_METEO_FLOAT_DTYPE", "float64"))
+
+
+class ForecastColumns:
+    """Open-Meteo の時系列セクション（hourly/daily）の列指向表現（キャッシュ上の保持形式）
+
+    - times: datetime64[m]、各変数: COLUMN_DTYPE の 1 次元配列（null は NaN）
+    - 配列は読み取り専用。as_payload()/to_frame() はコピーせずビューを渡す
+    - meta: latitude / longitude / timezone / *_units などのスカラー情報
+    """
+
+    __slots__ = ("section", "times", "columns", "meta")
+
+    def __init__(
+        self,
+        section: str,
+        times: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        meta: Dict[str, Any],
+    ) -> None:
+        self.section = section
+        self.times = times
+        self.columns = columns
+        self.meta = meta
+        self.times.flags.writeable = False
+        for arr in self.columns.values():
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_payload(
+        cls, payload: Mapping[str, Any], section: str = "hourly", dtype: Any = None
+    ) -> "ForecastColumns":
+        dt = COLUMN_DTYPE if dtype is None else np.dtype(dtype)
+        body = payload.get(section) or {}
+        times = np.asarray(body.get("time") or [], dtype="datetime64[m]")
+        columns = {
+            k: np.asarray([np.nan if x is None else x for x in (v or [])], dtype=dt)
+            for k, v in body.items()
+            if k != "time"
+        }
+        meta = {k: v for k, v in payload.items() if k != section}
+        return cls(section, times, columns, meta)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.times.nbytes + sum(a.nbytes for a in self.columns.values()))
+
+    def as_payload(self) -> Dict[str, Any]:
+        """Open-Meteo 互換の dict（配列はビュー。time は datetime64 配列）"""
+        return {**self.meta, self.section: {"time": self.times, **self.columns}}
+
+    def to_frame(self) -> pd.DataFrame:
+        """time + 各変数の DataFrame（数値列はコピーせず共有）"""
+        data: Dict[str, Any] = {"time": self.times, **self.columns}
+        return pd.DataFrame(data, copy=False)
+
+    def to_result(self) -> ForecastResult:
+        """従来の list ベース ForecastResult（時刻/2m気温/降水量を最短長に揃える）"""
+        temp = self.columns.get("temperature_2m", np.empty(0))
+        precip = self.columns.get("precipitation", np.empty(0))
+        n = min(len(self.times), len(temp), len(precip))
+        return ForecastResult(
+            times=[str(t) for t in np.datetime_as_string(self.times[:n], unit="m")],
+            temperature_2m=temp[:n].astype(float).tolist(),
+            precipitation=precip[:n].astype(float).tolist(),
+        )
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "section": self.section,
+            "times": np.datetime_as_string(self.times, unit="m").tolist(),
+            "columns": {k: v.tolist() for k, v in self.columns.items()},
+            "dtype": str(next(iter(self.columns.values())).dtype) if self.columns else "float64",
+            "meta": self.meta,
+        }
+
+    @classmethod
+    def from_json_dict(cls, data: Mapping[str, Any]) -> "ForecastColumns":
+        dt = np.dtype(data.get("dtype") or "float64")
+        return cls(
+            data["section"],
+            np.asarray(data["times"], dtype="datetime64[m]"),
+            {k: np.asarray(v, dtype=dt) for k, v in data["columns"].items()},
+            dict(data.get("meta") or {}),
+        )
+
+
+# ---- /forecast（日次）と特徴量（hourly）で共有する取得ウィンドウ ----
+WINDOW_DAILY = "temperature_2m_max,temperature_2m_min,precipitation_sum"
+WINDOW_HOURLY: Tuple[str, ...] = ("temperature_2m", "precipitation")
+# hourly 側が先に取りに行くときの past_days（/forecast の既定 days と揃えて 1 エントリを共有）
+WINDOW_DEFAULT_PAST_DAYS = int(os.getenv("OPEN_METEO_WINDOW_PAST_DAYS", "14"))
+# past_days 指定時に返る今日以降の日数（Open-Meteo の forecast_days 既定）
+WINDOW_FORECAST_DAYS = 7
+WINDOW_MAX_PAST_DAYS = 92
+
+
+class ForecastWindow:
+    """past_days=P の 1 回の取得（daily + hourly の上位集合）を保持するキャッシュエントリ
+
+    - daily_payload(): /forecast 用の Open-Meteo 生 JSON（hourly 部分を除いた従来形）
+    - hourly_columns(start, end): 特徴量用 hourly を現地日付の範囲で切り出したビュー
+    """
+
+    __slots__ = ("past_days", "hourly", "payload")
+
+    def __init__(self, past_days: int, hourly: ForecastColumns, payload: Dict[str, Any]) -> None:
+        self.past_days = int(past_days)
+        self.hourly = hourly
+        self.payload = payload
+
+    @classmethod
+    def from_payload(cls, data: Mapping[str, Any], past_days: int) -> "ForecastWindow":
+        hourly_part = {k: v for k, v in data.items() if k not in ("daily", "daily_units")}
+        payload = {k: v for k, v in data.items() if k not in ("hourly", "hourly_units")}
+        return cls(past_days, ForecastColumns.from_payload(hourly_part, "hourly"), payload)
+
+    @property
+    def nbytes(self) -> int:
+        return self.hourly.nbytes + _approx_size(self.payload)
+
+    def daily_payload(self) -> Dict[str, Any]:
+        return self.payload
+
+    def covers(self, start: date, end: date) -> bool:
+        """start 0 時〜end 23 時の hourly を含むか"""
+        t = self.hourly.times
+        last = np.datetime64(end, "m") + np.timedelta64(23 * 60, "m")
+        return len(t) > 0 and t[0] <= np.datetime64(start, "m") and t[-1] >= last
+
+    def hourly_columns(self, start: date, end: date) -> ForecastColumns:
+        h = self.hourly
+        lo, hi = np.datetime64(start, "m"), np.datetime64(end + timedelta(days=1), "m")
+        a, b = np.searchsorted(h.times, [lo, hi])
+        return ForecastColumns(
+            "hourly", h.times[a:b], {k: v[a:b] for k, v in h.columns.items()}, h.meta
+        )
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "past_days": self.past_days,
+            "hourly": self.hourly.to_json_dict(),
+            "payload": self.payload,
+        }
+
+    @classmethod
+    def from_json_dict(cls, data: Mapping[str, Any]) -> "ForecastWindow":
+        return cls(
+            data["past_days"],
+            ForecastColumns.from_json_dict(data["hourly"]),
+            dict(data.get("payload") or {}),
+        )
+
+
+def plan_window(
+    tz: str, start: date, end: date, hourly: Iterable[str], today: date | None = None
+) -> int | None:
+    """hourly の [start, end] を共有ウィンドウで賄えるなら必要な past_days、無理なら None
+
+    ウィンドウは「tz の今日から past_days 日前〜今日+6 日」。変数が WINDOW_HOURLY の範囲外、
+    tz が IANA 名でない（auto 等）、期間がウィンドウに収まらない場合は個別取得に回す。
+    """
+    if not set(hourly) <= set(WINDOW_HOURLY) or start > end:
+        return None
+    if today is None:
+        try:
+            today = dtmod.now_utc().astimezone(ZoneInfo(tz)).date()
+        except Exception:  # noqa: BLE001  "auto" や不正な tz
+            return None
+    need = (today - start).days
+    if need < 0 or need > WINDOW_MAX_PAST_DAYS or (end - today).days >= WINDOW_FORECAST_DAYS:
+        return None
+    return need
+
+
+def _as_daily(cached: Any) -> Dict[str, Any]:
+    # 旧形式（生 dict）のエントリもそのまま返す
+    return cached.daily_payload() if isinstance(cached, ForecastWindow) else cached
+
+
+def _as_payload(cached: Any) -> Mapping[str, Any]:
+    # キャッシュは通常 ForecastColumns。旧形式（生 dict）もそのまま返せるようにする
+    return cached.as_payload() if isinstance(cached, ForecastColumns) else cached
+
+
+def payload_to_json(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """get_hourly の戻り値を従来の JSON 形へ（time は "YYYY-MM-DDTHH:MM" 文字列、NaN は None）"""
+    out: Dict[str, Any] = dict(payload)
+    for section in ("hourly", "daily"):
+        body = payload.get(section)
+        if not isinstance(body, Mapping):
+            continue
+        conv: Dict[str, Any] = {}
+        for k, v in body.items():
+            if isinstance(v, np.ndarray) and v.dtype.kind == "M":
+                conv[k] = np.datetime_as_string(v, unit="D" if section == "daily" else "m").tolist()
+            elif isinstance(v, np.ndarray):
+                conv[k] = [None if np.isnan(x) else x for x in v.astype(float).tolist()]
+            else:
+                conv[k] = v
+        out[section] = conv
+    return out
+
+
+def _as_result(cached: Any) -> ForecastResult:
+    return cached.to_result() if isinstance(cached, ForecastColumns) else cached
+
+
 class OpenMeteoClient:
     """Open-Meteo forecast client with timeout/retry and simple cache"""
 
@@ -95,11 +1046,105 @@ class OpenMeteoClient:
         timeout: float = 10.0,
         retries: int = 3,
         backoff_factor: float = 0.5,
+        stale_while_revalidate: bool | None = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.retries = retries
         self.backoff = backoff_factor
+        # 既定: 日次キャッシュに猶予期間が設定されていれば有効
+        self.stale_while_revalidate = (
+            _daily_cache.grace > 0 if stale_while_revalidate is None else stale_while_revalidate
+        )
+
+    # ===== 上流呼び出し（リトライ/計測を一元化）===============================
+
+    def _retry_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Retry-After があればそれに従い、無ければ指数バックオフ + ジッタ（equal jitter）
+
+        同時に失敗した呼び出しが同じ間隔で一斉に再送しないよう、後半分をランダムにずらす。
+        """
+        if retry_after is not None:
+            return min(retry_after, RETRY_MAX_DELAY)
+        base = min(self.backoff * (2 ** (attempt - 1)), RETRY_MAX_DELAY)
+        return base / 2 + random.random() * base / 2
+
+    def _request_json(self, params: Dict[str, ParamValue]) -> Any:
+        """同期: 永続 Client で GET。バックオフは試行の間だけ（最終失敗後は待たない）"""
+        url = f"{self.base_url}/v1/forecast"
+        client = _get_sync_client(self.timeout, {"User-Agent": USER_AGENT})
+
+        last_err: Exception | None = None
+        for attempt in range(1, self.retries + 1):
+            _check_circuit(url)
+            status = 599
+            retry_after: float | None = None
+            with _limiter.slot() as wait_ms:
+                t1 = time.perf_counter()
+                try:
+                    resp = client.get(url, params=httpx.QueryParams(params))
+                    status = resp.status_code
+                    retry_after = _retry_after(resp)
+                    resp.raise_for_status()
+                    data = _decode_response(resp)
+                    last_err = None
+                except Exception as e:  # noqa: BLE001
+                    last_err = e
+                record_ext_api_call(
+                    url=url,
+                    status=status,
+                    duration_ms=(time.perf_counter() - t1) * 1000.0,
+                    queue_wait_ms=wait_ms,
+                )
+            if last_err is None:
+                _breaker.on_success()
+                return data
+            if not _retryable(status):
+                raise last_err
+            _breaker.on_failure()
+            if attempt < self.retries:
+                time.sleep(self._retry_delay(attempt, retry_after))
+        assert last_err is not None
+        raise last_err
+
+    async def _arequest_json(self, params: Dict[str, ParamValue]) -> Any:
+        """非同期: 共有 AsyncClient（keep-alive プール）で GET。待機は asyncio.sleep"""
+        url = f"{self.base_url}/v1/forecast"
+        client = _get_async_client(self.timeout, {"User-Agent": USER_AGENT})
+
+        last_err: Exception | None = None
+        for attempt in range(1, self.retries + 1):
+            _check_circuit(url)
+            status = 599
+            retry_after: float | None = None
+            async with _limiter.aslot() as wait_ms:
+                t1 = time.perf_counter()
+                try:
+                    resp = await client.get(url, params=httpx.QueryParams(params))
+                    status = resp.status_code
+                    retry_after = _retry_after(resp)
+                    resp.raise_for_status()
+                    data = _decode_response(resp)
+                    last_err = None
+                except Exception as e:
+                    last_err = e
+                # 観測記録（成功/失敗の各試行。枠待ちの時間も併せて）
+                record_ext_api_call(
+                    url=url,
+                    status=status,
+                    duration_ms=(time.perf_counter() - t1) * 1000.0,
+                    queue_wait_ms=wait_ms,
+                )
+            if last_err is None:
+                _breaker.on_success()
+                return data
+            if not _retryable(status):
+                raise last_err
+            _breaker.on_failure()
+            if attempt < self.retries:
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        assert last_err is not None
+        raise last_err
 
     # ===== 既存インターフェース（後方互換）====================================
 
@@ -113,7 +1158,7 @@ class OpenMeteoClient:
         hourly: str = "temperature_2m,precipitation",
         tz: str = "auto",
     ) -> str:
-        return f"{lat:.4f}:{lon:.4f}:{start.isoformat()}:{end.isoformat()}:{hourly}:{tz}"
+        return f"{cell_key(lat, lon)}:{start.isoformat()}:{end.isoformat()}:{hourly}:{tz}"
 
     def get_forecast(self, lat: float, lon: float, start: date, end: date) -> ForecastResult:
         """
@@ -123,12 +1168,34 @@ class OpenMeteoClient:
         Returns:
             ForecastResult（時刻、2m気温、降水量の配列）
         """
+        lat, lon = snap(lat, lon)
         key = self._cache_key(lat, lon, start, end)
         cached = _cache.get(key)
-        if cached:
-            return cached
+        if cached is not None:
+            return _as_result(cached)
+        return _as_result(
+            _forecast_flight.do(key, lambda: self._get_forecast_uncached(key, lat, lon, start, end))
+        )
 
-        params: Dict[str, ParamValue] = {
+    async def aget_forecast(self, lat: float, lon: float, start: date, end: date) -> ForecastResult:
+        """get_forecast の非同期版（共有 AsyncClient を使用）"""
+        lat, lon = snap(lat, lon)
+        key = self._cache_key(lat, lon, start, end)
+        cached = await _cache.aget(key)
+        if cached is not None:
+            return _as_result(cached)
+
+        async def _fetch() -> ForecastColumns:
+            data = await self._arequest_json(self._forecast_params(lat, lon, start, end))
+            cols = ForecastColumns.from_payload(data, "hourly")
+            await _cache.aset(key, cols)
+            return cols
+
+        return _as_result(await _forecast_async_flight.do(key, _fetch))
+
+    @staticmethod
+    def _forecast_params(lat: float, lon: float, start: date, end: date) -> Dict[str, ParamValue]:
+        return {
             "latitude": lat,
             "longitude": lon,
             "start_date": start.isoformat(),
@@ -136,38 +1203,18 @@ class OpenMeteoClient:
             "hourly": "temperature_2m,precipitation",
             "timezone": "auto",
         }
-        headers = {"User-Agent": USER_AGENT}
 
-        last_err: Exception | None = None
-        for attempt in range(1, self.retries + 1):
-            try:
-                with httpx.Client(timeout=self.timeout, headers=headers) as client:
-                    resp = client.get(
-                        f"{self.base_url}/v1/forecast", params=httpx.QueryParams(params)
-                    )
-                    resp.raise_for_status()
-                    data = resp.json()
-                result = self._parse(data)
-                _cache.set(key, result)
-                return result
-            except Exception as e:  # noqa: BLE001
-                last_err = e
-                time.sleep(self.backoff * (2 ** (attempt - 1)))
-        assert last_err is not None
-        raise last_err
+    def _get_forecast_uncached(
+        self, key: str, lat: float, lon: float, start: date, end: date
+    ) -> ForecastColumns:
+        data = self._request_json(self._forecast_params(lat, lon, start, end))
+        cols = ForecastColumns.from_payload(data, "hourly")
+        _cache.set(key, cols)
+        return cols
 
     @staticmethod
     def _parse(payload: Dict[str, Any]) -> ForecastResult:
-        hourly = payload.get("hourly") or {}
-        times = hourly.get("time") or []
-        temp = hourly.get("temperature_2m") or []
-        precip = hourly.get("precipitation") or []
-        n = min(len(times), len(temp), len(precip))
-        return ForecastResult(
-            times=list(times[:n]),
-            temperature_2m=list(map(float, temp[:n])),
-            precipitation=list(map(float, precip[:n])),
-        )
+        return ForecastColumns.from_payload(payload, "hourly").to_result()
 
     # ===== feature_builder 向けの新インターフェース ============================
 
@@ -182,19 +1229,84 @@ class OpenMeteoClient:
         timezone: str = "Asia/Tokyo",
     ) -> Mapping[str, Any]:
         """
-        feature_builder 用の hourly 取得（生の Open-Meteo 形式を返す）
-        返り値: {"hourly": {...}, "hourly_units": {...}, ...}
+        feature_builder 用の hourly 取得（Open-Meteo 形式の dict を返す）
+        返り値: {"hourly": {"time": datetime64[m], 変数: ndarray, ...}, "hourly_units": {...}, ...}
+        配列はキャッシュ上の ForecastColumns のビュー（読み取り専用・コピーなし）。
+
+        注意: 以前は hourly の値が JSON の list、time が "YYYY-MM-DDTHH:MM" 文字列だった。
+        json.dumps・list との == 比較・time の文字列処理をしている呼び出し側は
+        get_hourly_json（従来形を返す）を使うこと。
         """
         start_date = start.date() if isinstance(start, datetime) else start
         end_date = end.date() if isinstance(end, datetime) else end
+        lat, lon = snap(lat, lon)
+        hourly = list(hourly)
+
+        # 直近の期間は /forecast と共有するウィンドウから切り出す
+        window = self._window_hourly(lat, lon, start_date, end_date, hourly, timezone)
+        if window is not None:
+            return window.as_payload()
 
         hourly_param = ",".join(hourly)
         key = self._cache_key(lat, lon, start_date, end_date, hourly=hourly_param, tz=timezone)
         cached = _cache.get(key)
-        if cached:
-            return cached  # type: ignore[return-value]
+        if cached is not None:
+            return _as_payload(cached)
+
+        # 同一キーの同時呼び出しは 1 回の上流リクエストにまとめる
+        return _as_payload(
+            _hourly_flight.do(
+                key,
+                lambda: self._get_hourly_uncached(
+                    key, lat, lon, start_date, end_date, hourly_param, timezone
+                ),
+            )
+        )
 
-        params: Dict[str, ParamValue] = {
+    async def aget_hourly(
+        self,
+        *,
+        lat: float,
+        lon: float,
+        start: date | datetime,
+        end: date | datetime,
+        hourly: Iterable[str],
+        timezone: str = "Asia/Tokyo",
+    ) -> Mapping[str, Any]:
+        """get_hourly の非同期版（共有 AsyncClient + asyncio.sleep バックオフ）"""
+        start_date = start.date() if isinstance(start, datetime) else start
+        end_date = end.date() if isinstance(end, datetime) else end
+        lat, lon = snap(lat, lon)
+        hourly = list(hourly)
+
+        window = await self._awindow_hourly(lat, lon, start_date, end_date, hourly, timezone)
+        if window is not None:
+            return window.as_payload()
+
+        hourly_param = ",".join(hourly)
+        key = self._cache_key(lat, lon, start_date, end_date, hourly=hourly_param, tz=timezone)
+        cached = await _cache.aget(key)
+        if cached is not None:
+            return _as_payload(cached)
+
+        async def _fetch() -> ForecastColumns:
+            params = self._hourly_params(lat, lon, start_date, end_date, hourly_param, timezone)
+            cols = ForecastColumns.from_payload(await self._arequest_json(params), "hourly")
+            await _cache.aset(key, cols)
+            return cols
+
+        return _as_payload(await _hourly_async_flight.do(key, _fetch))
+
+    @staticmethod
+    def _hourly_params(
+        lat: float,
+        lon: float,
+        start_date: date,
+        end_date: date,
+        hourly_param: str,
+        timezone: str,
+    ) -> Dict[str, ParamValue]:
+        return {
             "latitude": f"{lat}",
             "longitude": f"{lon}",
             "start_date": start_date.isoformat(),
@@ -202,28 +1314,108 @@ class OpenMeteoClient:
             "hourly": hourly_param,
             "timezone": timezone,
         }
-        headers = {"User-Agent": USER_AGENT}
 
-        last_err: Exception | None = None
-        for attempt in range(1, self.retries + 1):
-            try:
-                with httpx.Client(timeout=self.timeout, headers=headers) as client:
-                    resp = client.get(
-                        f"{self.base_url}/v1/forecast", params=httpx.QueryParams(params)
-                    )
-                    resp.raise_for_status()
-                    data = resp.json()
-                _cache.set(key, data)
-                return data
-            except Exception as e:
-                last_err = e
-                time.sleep(self.backoff * (2 ** (attempt - 1)))
-        assert last_err is not None
-        raise last_err
+    def _get_hourly_uncached(
+        self,
+        key: str,
+        lat: float,
+        lon: float,
+        start_date: date,
+        end_date: date,
+        hourly_param: str,
+        timezone: str,
+    ) -> ForecastColumns:
+        data = self._request_json(
+            self._hourly_params(lat, lon, start_date, end_date, hourly_param, timezone)
+        )
+        # 生 JSON ではなく列指向（float 配列）で保持する
+        cols = ForecastColumns.from_payload(data, "hourly")
+        _cache.set(key, cols)
+        return cols
 
     def fetch_hourly(self, **kwargs) -> Mapping[str, Any]:
         return self.get_hourly(**kwargs)
 
+    def get_hourly_json(self, **kwargs) -> Dict[str, Any]:
+        """get_hourly の従来形（list と時刻文字列。ndarray 化以前の呼び出し側向け、コピーあり）"""
+        return payload_to_json(self.get_hourly(**kwargs))
+
+    # ===== 共有ウィンドウ（daily + hourly を 1 回で取得・1 エントリで保持）=========
+
+    @staticmethod
+    def _window_params(lat: float, lon: float, tz: str, past_days: int) -> Dict[str, ParamValue]:
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "daily": WINDOW_DAILY,
+            "hourly": ",".join(WINDOW_HOURLY),
+            "timezone": tz,
+            "past_days": past_days,
+        }
+
+    @staticmethod
+    def _cached_window(
+        lat: float, lon: float, tz: str, start: date, end: date, need: int
+    ) -> ForecastColumns | None:
+        for past_days in _window_candidates(lat, lon, tz, need):
+            win = _daily_cache.get(_daily_cache_key(lat, lon, tz, past_days))
+            if isinstance(win, ForecastWindow) and win.covers(start, end):
+                counter_inc("open_meteo.window.hit")
+                return win.hourly_columns(start, end)
+        return None
+
+    @staticmethod
+    async def _acached_window(
+        lat: float, lon: float, tz: str, start: date, end: date, need: int
+    ) -> ForecastColumns | None:
+        for past_days in _window_candidates(lat, lon, tz, need):
+            win = await _daily_cache.aget(_daily_cache_key(lat, lon, tz, past_days))
+            if isinstance(win, ForecastWindow) and win.covers(start, end):
+                counter_inc("open_meteo.window.hit")
+                return win.hourly_columns(start, end)
+        return None
+
+    def _window_hourly(
+        self, lat: float, lon: float, start: date, end: date, hourly: List[str], tz: str
+    ) -> ForecastColumns | None:
+        """[start, end] の hourly を共有ウィンドウから。ウィンドウ外なら None（個別取得へ）"""
+        need = plan_window(tz, start, end, hourly)
+        if need is None:
+            return None
+        hit = self._cached_window(lat, lon, tz, start, end, need)
+        if hit is not None:
+            return hit
+        past_days = max(need, WINDOW_DEFAULT_PAST_DAYS)
+        key = _daily_cache_key(lat, lon, tz, past_days)
+        win = _window_flight.do(
+            key, lambda: self._get_window_uncached(key, lat, lon, tz, past_days)
+        )
+        # 上流の返した期間が想定とずれていたら（日付境界の差など）個別取得に任せる
+        return win.hourly_columns(start, end) if win.covers(start, end) else None
+
+    async def _awindow_hourly(
+        self, lat: float, lon: float, start: date, end: date, hourly: List[str], tz: str
+    ) -> ForecastColumns | None:
+        need = plan_window(tz, start, end, hourly)
+        if need is None:
+            return None
+        hit = await self._acached_window(lat, lon, tz, start, end, need)
+        if hit is not None:
+            return hit
+        past_days = max(need, WINDOW_DEFAULT_PAST_DAYS)
+        key = _daily_cache_key(lat, lon, tz, past_days)
+        # /forecast の取得と同じ single-flight（同時の日次/時間取得も 1 本にまとまる）
+        win = await _daily_flight.do(
+            key, lambda: self._fetch_recent_daily_uncached(key, lat, lon, tz, past_days)
+        )
+        return win.hourly_columns(start, end) if win.covers(start, end) else None
+
+    def _get_window_uncached(
+        self, key: str, lat: float, lon: float, tz: str, past_days: int
+    ) -> ForecastWindow:
+        data = self._request_json(self._window_params(lat, lon, tz, past_days))
+        return _store_window(key, lat, lon, tz, past_days, data)
+
     # ===== 追加: /forecast 用（非同期・日次サマリー）==========================
 
     async def fetch_recent_daily(
@@ -238,67 +1430,169 @@ class OpenMeteoClient:
         - Open-Meteoでは過去データ取得に `past_days` を利用（上限 92）
         - 返り値は Open-Meteo の **生JSON** を返す（routes 側で整形）
         - 可観測性: 各試行ごとに record_ext_api_call(...) を記録
-        - 最適化: 5分TTLキャッシュ, AsyncClient再利用
+        - 最適化: 5分TTLキャッシュ, AsyncClient再利用, 同一キーの同時取得は 1 本に集約
+        """
+        data, _ = await self.fetch_recent_daily_with_freshness(lat=lat, lon=lon, tz=tz, days=days)
+        return data
+
+    async def fetch_recent_daily_with_freshness(
+        self,
+        lat: float,
+        lon: float,
+        tz: str,
+        days: int = 14,
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        fetch_recent_daily と同じ取得に加え、応答の鮮度を返す。
+        - fresh: TTL 内のキャッシュ or 今回取得した値
+        - revalidating: TTL 切れ（猶予期間内）の値を即返し、裏で再取得中
+        - stale: 上流失敗のため猶予期間内の古い値で代替
+        stale_while_revalidate が無効なら常に fresh（失敗時は例外）。
         """
         past_days = max(1, min(int(days), 92))
+        lat, lon = snap(lat, lon)
         key = _daily_cache_key(lat, lon, tz, past_days)
-        cached = _daily_cache.get(key)
-        if cached:
-            return cached  # type: ignore[return-value]
+        cached = await _daily_cache.aget(key)
+        if cached is not None:
+            return _as_daily(cached), FRESHNESS_FRESH
 
-        params: Dict[str, ParamValue] = {
-            "latitude": lat,
-            "longitude": lon,
-            "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
-            "timezone": tz,
-            "past_days": past_days,
-        }
-        headers = {"User-Agent": USER_AGENT}
-        url = f"{self.base_url}/v1/forecast"
+        async def _fetch() -> Dict[str, Any]:
+            win = await _daily_flight.do(
+                key, lambda: self._fetch_recent_daily_uncached(key, lat, lon, tz, past_days)
+            )
+            return _as_daily(win)
 
-        client = _get_async_client(self.timeout, headers)
+        stale = await _daily_cache.apeek(key) if self.stale_while_revalidate else None
+        if stale is not None:
+            # 期限切れ値を即返し、再取得はバックグラウンドで（single-flight で重複なし）
+            state = FRESHNESS_STALE if key in _revalidate_failed else FRESHNESS_REVALIDATING
+            task = asyncio.ensure_future(_fetch())
+            _background_tasks.add(task)
+            task.add_done_callback(lambda t, k=key: _finish_background_task(k, t))
+            counter_inc(f"open_meteo.daily.swr_{state}")
+            return _as_daily(stale[0]), state
 
-        last_err: Exception | None = None
-        for attempt in range(1, self.retries + 1):
-            status = 599
-            t1 = time.perf_counter()
+        try:
+            return await _fetch(), FRESHNESS_FRESH
+        except Exception:
+            # 取得中に猶予期間内の値が入っていれば（別経路の再検証など）それで代替
+            fallback = await _daily_cache.apeek(key) if self.stale_while_revalidate else None
+            if fallback is None:
+                raise
+            counter_inc("open_meteo.daily.swr_stale_on_error")
+            return _as_daily(fallback[0]), FRESHNESS_STALE
+
+    async def fetch_recent_daily_many(
+        self, points: Sequence[Point], tz: str, days: int = 14
+    ) -> List[Dict[str, Any] | Exception]:
+        """複数地点の fetch_recent_daily。未キャッシュの地点は複数座標の 1 リクエストにまとまる
+
+        返り値は points と同じ順。失敗した地点はその例外を要素として返す（全体は失敗させない）。
+        """
+        return await asyncio.gather(
+            *(self.fetch_recent_daily(lat=lat, lon=lon, tz=tz, days=days) for lat, lon in points),
+            return_exceptions=True,
+        )
+
+    async def _fetch_recent_daily_uncached(
+        self, key: str, lat: float, lon: float, tz: str, past_days: int
+    ) -> ForecastWindow:
+        # 同じ (tz, past_days) の同時取得は複数座標の 1 リクエストにまとめる
+        return await _daily_batcher.submit(
+            (tz, past_days), (lat, lon), lambda pts: self._fetch_windows(pts, tz, past_days)
+        )
+
+    async def _fetch_windows(
+        self, points: List[Point], tz: str, past_days: int
+    ) -> List[ForecastWindow | BaseException]:
+        """日次に加えて hourly も同じリクエストで受け取り、地点ごとのエントリとして保存する
+
+        複数座標のリクエストが 4xx なら（どれか 1 地点の座標が不正でも全体が弾かれる）、
+        地点ごとに取り直して失敗をその地点だけに閉じ込める。
+        """
+        if len(points) == 1:
+            lat, lon = points[0]
+            results: Any = [await self._arequest_json(self._window_params(lat, lon, tz, past_days))]
+        else:
+            params = self._window_params(0.0, 0.0, tz, past_days)
+            params["latitude"] = ",".join(str(lat) for lat, _ in points)
+            params["longitude"] = ",".join(str(lon) for _, lon in points)
             try:
-                resp = await client.get(url, params=httpx.QueryParams(params))
-                status = resp.status_code
-                resp.raise_for_status()
-                data = resp.json()
-                # 観測記録（成功試行）
-                dt_ms = (time.perf_counter() - t1) * 1000.0
-                record_ext_api_call(url=url, status=status, duration_ms=dt_ms)
-                _daily_cache.set(key, data)
-                return data
+                results = await self._arequest_json(params)
             except Exception as e:
-                # 観測記録（失敗試行）
-                dt_ms = (time.perf_counter() - t1) * 1000.0
-                record_ext_api_call(url=url, status=status, duration_ms=dt_ms)
-                last_err = e
-                if attempt < self.retries:
-                    await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
-                else:
-                    break
+                if not _is_client_error(e):
+                    raise
+                counter_inc("open_meteo.daily_batch.split_on_client_error")
+                singles = await asyncio.gather(
+                    *(self._fetch_windows([p], tz, past_days) for p in points),
+                    return_exceptions=True,
+                )
+                return [r if isinstance(r, BaseException) else r[0] for r in singles]
+            # 複数座標の応答は地点順の配列
+            if not isinstance(results, list) or len(results) != len(points):
+                raise ValueError(f"unexpected multi-location response for {len(points)} points")
+        return [
+            await _astore_window(
+                _daily_cache_key(lat, lon, tz, past_days), lat, lon, tz, past_days, data
+            )
+            for (lat, lon), data in zip(points, results, strict=True)
+        ]
 
-        assert last_err is not None
-        raise last_err
+
+def _store_window(
+    key: str, lat: float, lon: float, tz: str, past_days: int, data: Mapping[str, Any]
+) -> ForecastWindow:
+    win = ForecastWindow.from_payload(data, past_days)
+    _daily_cache.set(key, win)
+    _remember_window(lat, lon, tz, past_days)
+    _revalidate_failed.discard(key)
+    return win
+
+
+async def _astore_window(
+    key: str, lat: float, lon: float, tz: str, past_days: int, data: Mapping[str, Any]
+) -> ForecastWindow:
+    """_store_window の async 版（ディスク層への書き込みでイベントループを止めない）"""
+    win = ForecastWindow.from_payload(data, past_days)
+    await _daily_cache.aset(key, win)
+    _remember_window(lat, lon, tz, past_days)
+    _revalidate_failed.discard(key)
+    return win
+
+
+def _finish_background_task(key: str, task: "asyncio.Task[Any]") -> None:
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        # 猶予期間内は古い値で応答し続け（stale）、呼び出しのたびに再試行する
+        _revalidate_failed.add(key)
+        counter_inc("open_meteo.daily.swr_revalidate_failed")
+    else:
+        _revalidate_failed.discard(key)
 
 
 # --- ファイルキャッシュの簡易例（任意で使いたい時だけ） ---
+def _forecast_to_dict(result: ForecastResult) -> Dict[str, Any]:
+    return {
+        "times": result.times,
+        "temperature_2m": result.temperature_2m,
+        "precipitation": result.precipitation,
+    }
+
+
+def _forecast_from_dict(data: Mapping[str, Any]) -> ForecastResult:
+    return ForecastResult(
+        times=list(data["times"]),
+        temperature_2m=list(map(float, data["temperature_2m"])),
+        precipitation=list(map(float, data["precipitation"])),
+    )
+
+
 def dump_cache_to_file(result: ForecastResult, path: str) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "times": result.times,
-                "temperature_2m": result.temperature_2m,
-                "precipitation": result.precipitation,
-            },
-            f,
-            ensure_ascii=False,
-        )
+        json.dump(_forecast_to_dict(result), f, ensure_ascii=False)
 
 
 def load_cache_from_file(path: str) -> ForecastResult | None:
@@ -306,8 +1600,4 @@ def load_cache_from_file(path: str) -> ForecastResult | None:
         return None
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
-    return ForecastResult(
-        times=list(data["times"]),
-        temperature_2m=list(map(float, data["temperature_2m"])),
-        precipitation=list(map(float, data["precipitation"])),
-    )
+    return _forecast_from_dict(data)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def atomic_path(path: Path | str) -> Iterator[Path]:
+    """同じディレクトリの一時ファイル名を渡し、書き終えたら os.replace で path に差し替える
+
+    差し替えは新しい inode になるので、旧ファイルを mmap している読み手は旧ページを
+    読み続けられる（同名で上書きすると、使用中の配列が書き換わる）。失敗時は一時ファイルを消す。
+    拡張子は保つ（np.save は .npy 以外の名前に .npy を付け足すため）。
+    """
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=f".{p.name}.", suffix=f".tmp{p.suffix}")
+    os.close(fd)
+    try:
+        yield Path(tmp)
+        # mkstemp は 0600 で作るので、通常の書き出しと同じ権限に揃える（別ユーザーの worker 用）
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, p)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List
+
+
+class CircuitBreaker:
+    """窓内の失敗が threshold 回に達したら open（即時失敗）。reset_timeout_s 後に half-open で試行
+
+    - closed: 通常どおり呼び出す
+    - open: allow() が False（上流を叩かずに失敗させる）
+    - half-open: 試行を通し、成功で closed、失敗が続けば再び open
+    同期経路（スレッド）からも使うので状態更新はロックで守る。
+    """
+
+    def __init__(self, threshold: int, window_s: float, reset_timeout_s: float) -> None:
+        self.threshold = threshold
+        self.window_s = window_s
+        self.reset_timeout_s = reset_timeout_s
+        self.fail_ts: List[float] = []
+        self.state: str = "closed"  # closed | open | half-open
+        self.open_since: float = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.time()
+            if self.state == "open":
+                if now - self.open_since >= self.reset_timeout_s:
+                    self.state = "half-open"
+                    return True
+                return False
+            return True
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.fail_ts.clear()
+            if self.state in {"half-open", "open"}:
+                self.state = "closed"
+
+    def on_failure(self) -> None:
+        with self._lock:
+            now = time.time()
+            # 窓外の失敗を掃除
+            self.fail_ts = [t for t in self.fail_ts if now - t <= self.window_s]
+            self.fail_ts.append(now)
+            if len(self.fail_ts) >= self.threshold:
+                self.state = "open"
+                self.open_since = now
+
+    def reset(self) -> None:
+        with self._lock:
+            self.fail_ts.clear()
+            self.state = "closed"
+            self.open_since = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "recent_failures": len(self.fail_ts)}
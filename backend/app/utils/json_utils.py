@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# orjson は任意依存（pip install '.[fast]'）。無ければ標準 json にフォールバック
+try:
+    import orjson  # type: ignore[import-not-found]
+
+    _ORJSON_AVAILABLE = True
+except Exception:  # ModuleNotFoundError など
+    orjson = None  # type: ignore[assignment]
+    _ORJSON_AVAILABLE = False
+
+__all__ = ["loads", "dumps", "backend_name", "FastJSONResponse"]
+
+# numpy 配列/スカラーもそのまま出力できるように
+_ORJSON_OPTS = 0
+if _ORJSON_AVAILABLE:
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def backend_name() -> str:
+    return "orjson" if _ORJSON_AVAILABLE else "json"
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    if _ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def _default(obj: Any) -> Any:
+    # 標準 json 経路での numpy 対応（tolist でネイティブ型へ）
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=_ORJSON_OPTS)
+    return json.dumps(
+        obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson（あれば）でエンコードする JSONResponse
+
+    エンドポイントからこのクラスのインスタンスを直接返すと、FastAPI の jsonable_encoder
+    による再帰変換も経由しない（大きな raw ペイロード向け）。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
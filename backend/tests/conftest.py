@@ -5,3 +5,64 @@ import sys
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _fresh_history():
+    """/predict の履歴メモはテストごとのモック上流をまたがないように空にする"""
+    from app.services.history import get_history_assembler
+
+    get_history_assembler().clear()
+    yield
+    get_history_assembler().clear()
+
+
+@pytest.fixture(autouse=True)
+def _closed_circuit():
+    """上流失敗を模すテストの失敗回数が後続テストのサーキット状態に持ち越されないように"""
+    from app.services.open_meteo import _breaker
+
+    _breaker.reset()
+    yield
+    _breaker.reset()
+
+
+@pytest.fixture(scope="session")
+def gbdt_artifact(tmp_path_factory):
+    """小さな合成データで学習した GBDT 成果物（{YYYYMMDD}_{sha}_gbdt.joblib）"""
+    from app.ml.train import make_synthetic_daily, refit_full_and_save, time_series_cv_train
+
+    df, y = make_synthetic_daily(seed=0, n_days=200)
+    bundle, report = time_series_cv_train(df, y, seed=0, n_splits=2, residual=False)
+    return refit_full_and_save(
+        df=df,
+        y=y,
+        bundle=bundle,
+        cv_report=report,
+        out_dir=tmp_path_factory.mktemp("models"),
+        seed=0,
+        require_improve_ratio=10.0,
+    )
+
+
+@pytest.fixture(scope="session")
+def other_gbdt_model(tmp_path_factory):
+    """gbdt_artifact とは別のデータで学習した成果物 dict（同名上書きのテスト用）"""
+    from app.ml.baseline import SimpleRegModel
+    from app.ml.train import make_synthetic_daily, refit_full_and_save, time_series_cv_train
+
+    df, y = make_synthetic_daily(seed=7, n_days=120)
+    bundle, report = time_series_cv_train(df, y, seed=7, n_splits=2, residual=False)
+    path = refit_full_and_save(
+        df=df,
+        y=y,
+        bundle=bundle,
+        cv_report=report,
+        out_dir=tmp_path_factory.mktemp("other_models"),
+        seed=7,
+        require_improve_ratio=10.0,
+        export_compact_bundle=False,
+    )
+    return SimpleRegModel.load(path.as_posix()).model
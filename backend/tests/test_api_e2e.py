@@ -51,9 +51,12 @@ class _MockOM:
 @pytest.fixture(autouse=True)
 def mock_open_meteo(monkeypatch):
     # app.services.open_meteo.OpenMeteoClient を上書き
+    from app.api import routes as routes_mod
     from app.services import open_meteo as om
 
     monkeypatch.setattr(om, "OpenMeteoClient", _MockOM)
+    # /predict は routes 側の束縛を参照する
+    monkeypatch.setattr(routes_mod, "OpenMeteoClient", _MockOM)
     yield
 
 
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.baseline import SimpleRegModel
+from app.ml import compact as compact_mod
+from app.ml.compact import CompactPredictor, compact_path_for, export_compact
+from app.ml.train import make_synthetic_daily
+
+
+def _d0_history(n_days: int = 30) -> pd.DataFrame:
+    df, _ = make_synthetic_daily(seed=1, n_days=n_days)
+    df.loc[3, "d_mean"] = np.nan
+    return df
+
+
+def test_compact_bundle_matches_joblib_predict(gbdt_artifact):
+    compact = compact_path_for(gbdt_artifact)
+    assert (compact / "spec.json").is_file()
+    pred = CompactPredictor.load(compact)
+    assert isinstance(pred._a["value"], np.memmap)
+
+    model = SimpleRegModel.load(gbdt_artifact.as_posix())
+    df = _d0_history()
+    np.testing.assert_allclose(pred.predict_frame(df), model.predict(df), rtol=0, atol=1e-9)
+
+    # 単一行（D0 1 日ぶんだけ）でも一致
+    one = df.iloc[[-1]]
+    np.testing.assert_allclose(pred.predict_frame(one), model.predict(one), rtol=0, atol=1e-9)
+
+    # 複数地点を縦積みした一括推論
+    stacked = pd.concat([df.assign(loc_id=k, d_max=df["d_max"] + i) for i, k in enumerate("ab")])
+    stacked = stacked.sort_values(["date", "loc_id"], kind="stable")
+    np.testing.assert_allclose(
+        pred.predict_frame(stacked, group_cols=("loc_id",)),
+        model.predict(stacked, group_cols=("loc_id",)),
+        rtol=0,
+        atol=1e-9,
+    )
+
+
+def test_compact_import_does_not_need_pandas():
+    backend = Path(__file__).resolve().parents[1]
+    code = "import sys, app.ml.compact; assert 'pandas' not in sys.modules, 'pandas imported'"
+    subprocess.run([sys.executable, "-c", code], cwd=backend, check=True)
+
+
+def test_reexport_switches_generation_atomically(
+    gbdt_artifact, other_gbdt_model, tmp_path, monkeypatch
+):
+    live = tmp_path / "live.compact"
+    shutil.copytree(compact_path_for(gbdt_artifact), live)
+    df = _d0_history()
+    before = CompactPredictor.load(live).predict_frame(df)
+    old_gen = json.loads((live / "spec.json").read_text())["generation"]
+
+    # 配列は書けたが spec.json の差し替え前に落ちた: 読み込みは旧世代のまま一貫している
+    real_atomic = compact_mod.atomic_path
+
+    def _fail_on_spec(path):
+        if Path(path).name == "spec.json":
+            raise OSError("disk full")
+        return real_atomic(path)
+
+    monkeypatch.setattr(compact_mod, "atomic_path", _fail_on_spec)
+    with pytest.raises(OSError):
+        export_compact(other_gbdt_model, live)
+    monkeypatch.undo()
+    np.testing.assert_array_equal(CompactPredictor.load(live).predict_frame(df), before)
+
+    # 完了すれば新世代に切り替わり、旧世代のファイルは残らない
+    export_compact(other_gbdt_model, live)
+    spec = json.loads((live / "spec.json").read_text())
+    assert spec["generation"] != old_gen
+    assert {p.name.split(".")[1] for p in live.glob("*.npy")} == {spec["generation"]}
+    assert not np.array_equal(CompactPredictor.load(live).predict_frame(df), before)
+
+
+def test_mixed_generation_arrays_are_rejected(gbdt_artifact, other_gbdt_model, tmp_path):
+    a, b = tmp_path / "a.compact", tmp_path / "b.compact"
+    shutil.copytree(compact_path_for(gbdt_artifact), a)
+    export_compact(other_gbdt_model, b)
+    gen_a = json.loads((a / "spec.json").read_text())["generation"]
+    gen_b = json.loads((b / "spec.json").read_text())["generation"]
+    # 別バンドルのノード配列を a の世代名で紛れ込ませる
+    shutil.copy(b / f"value.{gen_b}.npy", a / f"value.{gen_a}.npy")
+    with pytest.raises(ValueError, match="inconsistent"):
+        CompactPredictor.load(a)
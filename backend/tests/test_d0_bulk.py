@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import warnings
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.features import FeaturePipeline
+from app.services.feature_builder import (
+    build_d0_features_from_series,
+    build_d0_frame_from_series,
+    build_d0_frame_via_client,
+)
+
+
+def _local_hours(start: str, end: str, tz: str) -> np.ndarray:
+    """tz の現地壁時計で start〜end の毎時刻（夏時間の切替日は 23/25 個）"""
+    idx = pd.date_range(start, end, freq="h", tz=tz, inclusive="left")
+    return idx.tz_localize(None).to_numpy().astype("datetime64[m]")
+
+
+def test_matches_single_day_builder_per_day():
+    rng = np.random.default_rng(0)
+    times = _local_hours("2025-01-01", "2025-01-08", "Asia/Tokyo")
+    temp = rng.normal(10, 3, len(times))
+    prec = rng.gamma(1.0, 0.2, len(times))
+    temp[5:9] = np.nan
+    temp[24:48] = np.nan  # 2 日目は全時刻欠測
+    prec[30] = np.nan
+
+    df = build_d0_frame_from_series(times, temp, prec)
+    assert list(df["n_hours"]) == [24] * 7
+    for i, row in df.iterrows():
+        sl = slice(24 * i, 24 * (i + 1))
+        with warnings.catch_warnings():
+            # 全時刻欠測の日は nanmean/nanmin が警告する（bulk 側は黙って NaN）
+            warnings.simplefilter("ignore", RuntimeWarning)
+            ref = build_d0_features_from_series(temp[sl], prec[sl])
+        np.testing.assert_allclose(
+            [row.d_mean, row.d_min, row.d_max, row.d_prec],
+            [ref.d0_mean, ref.d0_min, ref.d0_max, ref.d0_prec],
+        )
+
+
+def test_dst_days_have_23_and_25_hours():
+    times = _local_hours("2025-03-08", "2025-03-11", "America/New_York")
+    times = np.concatenate([times, _local_hours("2025-11-01", "2025-11-03", "America/New_York")])
+    temp = np.arange(len(times), dtype=float)
+    df = build_d0_frame_from_series(times, temp, np.ones(len(times)))
+    assert list(df["n_hours"]) == [24, 23, 24, 24, 25]
+    # 降水は 1mm/h -> 日合計 = 時間数
+    np.testing.assert_array_equal(df["d_prec"], df["n_hours"])
+    assert df["d_min"].iloc[1] == 24 and df["d_max"].iloc[1] == 46
+
+
+class _Client:
+    def __init__(self, tz: str) -> None:
+        self.tz = tz
+        self.calls = []
+
+    def get_hourly(self, *, lat, lon, start, end, hourly, timezone):
+        self.calls.append((start, end))
+        times = _local_hours(str(start.date()), str(end.date() + pd.Timedelta(days=1)), timezone)
+        t = np.arange(len(times), dtype=float) % 24
+        return {"hourly": {"time": times, "temperature_2m": t, "precipitation": t * 0 + 0.5}}
+
+
+def test_via_client_fetches_range_once_and_feeds_pipeline():
+    client = _Client("Asia/Tokyo")
+    df = build_d0_frame_via_client(35.0, 139.0, date(2025, 1, 1), date(2025, 1, 30), client)
+    assert len(client.calls) == 1
+    assert len(df) == 30 and df["date"].iloc[0] == pd.Timestamp("2025-01-01")
+    np.testing.assert_allclose(df["d_mean"], 11.5)
+    np.testing.assert_allclose(df["d_prec"], 12.0)
+
+    X = FeaturePipeline().fit(df).transform(df, as_array=True)
+    assert X.shape[0] == 30 and np.isfinite(X).all()
+
+    with pytest.raises(ValueError):
+        build_d0_frame_via_client(35.0, 139.0, date(2025, 1, 2), date(2025, 1, 1), client)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.ml import feature_cache
+from app.ml.feature_cache import content_key, raw_features
+from app.ml.features import FeaturePipeline, FeaturePipelineConfig
+from app.ml.train import make_synthetic_daily, time_series_cv_train
+
+
+@pytest.fixture(autouse=True)
+def _fresh_memo():
+    feature_cache.clear_memo()
+    yield
+    feature_cache.clear_memo()
+
+
+def test_raw_matrix_prefix_matches_prefix_only_features():
+    # 特徴量は因果的 -> 全期間の行列の先頭 n 行 == 先頭 n 行だけで作った行列
+    df, _ = make_synthetic_daily(seed=0, n_days=200)
+    X, cols = raw_features(df)
+    X_head, cols_head = FeaturePipeline().raw_matrix(df.iloc[:120])
+    assert cols == cols_head
+    np.testing.assert_array_equal(X[:120], X_head)
+    assert not X.flags.writeable
+
+
+def test_key_depends_on_data_and_config():
+    df, _ = make_synthetic_daily(seed=0, n_days=100)
+    key = content_key(df, FeaturePipelineConfig())
+    assert key == content_key(df.copy(), FeaturePipelineConfig())
+    assert key != content_key(df, FeaturePipelineConfig(ma_windows=(3, 7, 14)))
+    df2 = df.copy()
+    df2.loc[df2.index[-1], "d_mean"] += 0.1
+    assert key != content_key(df2, FeaturePipelineConfig())
+
+
+def test_disk_cache_is_reused_across_processes(tmp_path, monkeypatch):
+    df, _ = make_synthetic_daily(seed=0, n_days=100)
+    X, cols = raw_features(df, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("features_*.npz"))) == 1
+
+    # メモリを消してもディスクから読めれば特徴量は作り直さない
+    feature_cache.clear_memo()
+
+    def _boom(self, df):
+        raise AssertionError("raw_matrix should not be recomputed")
+
+    monkeypatch.setattr(FeaturePipeline, "raw_matrix", _boom)
+    X2, cols2 = raw_features(df, cache_dir=tmp_path)
+    assert cols2 == cols
+    np.testing.assert_array_equal(X2, X)
+
+
+def test_failed_disk_write_leaves_no_files(tmp_path, monkeypatch):
+    df, _ = make_synthetic_daily(seed=0, n_days=60)
+
+    def _full(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(feature_cache.np, "savez", _full)
+    with pytest.raises(OSError):
+        raw_features(df, cache_dir=tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cv_builds_features_once_for_all_folds(monkeypatch):
+    df, y = make_synthetic_daily(seed=0, n_days=300)
+    calls = []
+    orig = FeaturePipeline.raw_matrix
+
+    def _count(self, df):
+        calls.append(len(df))
+        return orig(self, df)
+
+    monkeypatch.setattr(FeaturePipeline, "raw_matrix", _count)
+    _, report = time_series_cv_train(df, y, seed=0, n_splits=3, residual=True)
+    assert calls == [len(df)]
+    assert len(report["folds"]) == 3
+
+
+def test_memo_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(feature_cache, "FEATURE_MEMO_MAX_ENTRIES", 2)
+    frames = [make_synthetic_daily(seed=s, n_days=60)[0] for s in range(3)]
+    first = raw_features(frames[0])
+    raw_features(frames[1])
+    assert raw_features(frames[0]) is first  # 参照で最新側へ
+    raw_features(frames[2])
+    keys = [content_key(f, FeaturePipelineConfig()) for f in frames]
+    assert list(feature_cache._memo) == [keys[0], keys[2]]
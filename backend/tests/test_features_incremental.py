@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.features import FeaturePipeline, FeaturePipelineConfig
+from app.ml.train import make_synthetic_daily
+
+
+def _frame(n_days: int = 120) -> pd.DataFrame:
+    df, _ = make_synthetic_daily(n_days=n_days)
+    df.loc[5, "d_mean"] = np.nan  # 欠損も batch と同じ扱いになること
+    return df
+
+
+def test_incremental_matches_batch_transform():
+    df = _frame()
+    pipe = FeaturePipeline().fit(df.iloc[:80])
+    batch = pipe.transform(df).to_numpy()
+    inc = pipe.incremental().update_frame(df)
+    assert list(inc.columns) == pipe.feature_cols_
+    np.testing.assert_allclose(inc.to_numpy(), batch, rtol=0, atol=1e-9)
+
+
+def test_incremental_per_group_and_ring_buffer():
+    df = _frame(60)
+    pipe = FeaturePipeline(FeaturePipelineConfig(group_cols=("loc_id",))).fit(df.assign(loc_id="a"))
+    inc = pipe.incremental()
+    a = df.assign(loc_id="a")
+    b = df.assign(loc_id="b", d_mean=df["d_mean"] + 3.0)
+    both = pd.concat([a, b]).sort_values(["date", "loc_id"], kind="stable")
+    out = inc.update_frame(both)
+
+    # 各地点の出力は、その地点だけを単独で transform した結果と一致する
+    single = pipe.with_group_cols(())
+    keys = both.reset_index(drop=True)["loc_id"].to_numpy()
+    for loc, part in (("a", a), ("b", b)):
+        expected = single.transform(part.drop(columns="loc_id")).to_numpy()
+        np.testing.assert_allclose(out.to_numpy()[keys == loc], expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(out.to_numpy(), pipe.transform(both).to_numpy(), atol=1e-9)
+
+    # 保持するのは required_history_days 日ぶんだけ
+    assert inc.history(("a",)).shape == (pipe.required_history_days(), 4)
+    with pytest.raises(ValueError):
+        inc.update(df["date"].iloc[0], [1.0, 0.0, 2.0, 0.0], group=("a",))
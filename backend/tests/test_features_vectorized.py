@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from app.ml.features import FeaturePipeline, FeaturePipelineConfig
+
+
+def _multi_loc_frame(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    parts = []
+    for loc, n in (("a", 40), ("b", 25), ("c", 3)):  # 長さの違う地点を混ぜる
+        dates = pd.date_range("2025-01-01", periods=n, freq="D")
+        parts.append(
+            pd.DataFrame(
+                {
+                    "date": dates,
+                    "loc_id": loc,
+                    "d_mean": rng.normal(15, 5, n),
+                    "d_min": rng.normal(10, 5, n),
+                    "d_max": rng.normal(20, 5, n),
+                    "d_prec": rng.gamma(1.0, 2.0, n),
+                }
+            )
+        )
+    df = pd.concat(parts, ignore_index=True)
+    df.loc[rng.choice(len(df), 8, replace=False), "d_mean"] = np.nan
+    return df
+
+
+def _reference(pipe: FeaturePipeline, df: pd.DataFrame) -> pd.DataFrame:
+    """pandas の groupby で地点ごとに組んだ参照実装"""
+    cfg = pipe.config
+    df = pipe._validate_and_copy(df)
+    g = df.groupby(list(cfg.group_cols), sort=False)
+    out = {}
+    for col in cfg.base_cols:
+        lag1 = g[col].shift(1)
+        out[f"{col}_lag1"] = lag1
+        out[f"{col}_diff1"] = df[col] - lag1
+        for w in cfg.ma_windows:
+            mp = max(1, int(np.ceil(w * cfg.min_periods_ratio)))
+            out[f"{col}_ma{w}"] = g[col].transform(
+                lambda s, w=w, mp=mp: s.shift(1).rolling(w, min_periods=mp).mean()
+            )
+    return pd.DataFrame(out)
+
+
+def test_grouped_features_do_not_leak_across_locations():
+    df = _multi_loc_frame()
+    pipe = FeaturePipeline(FeaturePipelineConfig(group_cols=("loc_id",)))
+    X, cols = pipe.raw_matrix(df)
+    keys = pipe._validate_and_copy(df)[["date", "loc_id"]].reset_index(drop=True)
+    feat = pd.concat([keys, pd.DataFrame(X, columns=cols)], axis=1)
+    ref = _reference(pipe, df)
+    for c in ref.columns:
+        np.testing.assert_allclose(feat[c].to_numpy(), ref[c].to_numpy(), atol=1e-9, err_msg=c)
+
+    # 各地点の先頭日は lag/MA が必ず欠損（他地点の値を引き継がない）
+    firsts = feat.groupby("loc_id")["date"].transform("min") == feat["date"]
+    assert feat.loc[firsts, ["d_mean_lag1", "d_min_ma3", "d_max_ma7"]].isna().all().all()
+
+
+def test_feature_columns_and_row_order_are_stable():
+    df = _multi_loc_frame(1)
+    pipe = FeaturePipeline(FeaturePipelineConfig(group_cols=("loc_id",))).fit(df)
+    assert pipe.feature_cols_[:6] == [
+        "d_mean",
+        "d_mean_lag1",
+        "d_mean_diff1",
+        "d_mean_ma3",
+        "d_mean_ma7",
+        "d_min",
+    ]
+    assert pipe.feature_cols_[-2:] == ["season_sin", "season_cos"]
+    x = pipe.transform(df.sample(frac=1.0, random_state=0))
+    np.testing.assert_array_equal(x.to_numpy(), pipe.transform(df).to_numpy())
+
+
+def test_transform_matrix_is_imputed_and_clipped():
+    df = _multi_loc_frame(2)
+    pipe = FeaturePipeline(FeaturePipelineConfig(group_cols=("loc_id",))).fit(df)
+    spiky = df.assign(d_prec=df["d_prec"].where(df.index % 5 != 0, 1e6))
+    X = pipe.transform(spiky, as_array=True)
+    assert isinstance(X, np.ndarray) and X.dtype == np.float64 and X.flags.c_contiguous
+    np.testing.assert_array_equal(X, pipe.transform(spiky).to_numpy())
+
+    assert not np.isnan(X).any()
+    j = pipe.feature_cols_.index("d_prec")
+    assert X[:, j].max() == pipe.clip_bounds_["d_prec"][1]
+    # 先頭日の lag1 は学習時中央値で埋まる
+    k = pipe.feature_cols_.index("d_mean_lag1")
+    assert X[0, k] == np.clip(pipe.medians_["d_mean_lag1"], *pipe.clip_bounds_["d_mean_lag1"])
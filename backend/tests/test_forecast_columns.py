@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services import open_meteo as om
+from app.services.feature_builder import build_d0_features_from_series
+
+PAYLOAD = {
+    "latitude": 35.7,
+    "longitude": 139.7,
+    "timezone": "Asia/Tokyo",
+    "hourly_units": {"temperature_2m": "°C"},
+    "hourly": {
+        "time": [f"2025-01-01T{h:02d}:00" for h in range(24)],
+        "temperature_2m": [10.0 + h * 0.5 for h in range(23)] + [None],
+        "precipitation": [0.1] * 24,
+    },
+}
+
+
+def test_columns_are_compact_readonly_and_zero_copy():
+    cols = om.ForecastColumns.from_payload(PAYLOAD, "hourly")
+    assert cols.times.dtype == np.dtype("datetime64[m]")
+    assert cols.columns["temperature_2m"].dtype == np.float64
+    assert np.isnan(cols.columns["temperature_2m"][-1])
+    assert cols.nbytes < om._approx_size(PAYLOAD["hourly"])
+
+    payload = cols.as_payload()
+    assert payload["timezone"] == "Asia/Tokyo"
+    temps = payload["hourly"]["temperature_2m"]
+    assert temps is cols.columns["temperature_2m"]
+    with pytest.raises(ValueError):
+        temps[0] = 0.0
+    assert np.shares_memory(np.asarray(temps, dtype=float), cols.columns["temperature_2m"])
+    assert np.shares_memory(
+        cols.to_frame()["precipitation"].to_numpy(), cols.columns["precipitation"]
+    )
+
+    d0 = build_d0_features_from_series(temps, payload["hourly"]["precipitation"])
+    assert d0.d0_max == pytest.approx(21.0)
+    assert d0.d0_prec == pytest.approx(2.4)
+
+
+def test_to_result_matches_legacy_list_form():
+    res = om.OpenMeteoClient._parse(PAYLOAD)
+    assert isinstance(res.times, list) and res.times[0] == "2025-01-01T00:00"
+    assert isinstance(res.temperature_2m, list) and len(res.temperature_2m) == 24
+    assert res.precipitation == [0.1] * 24
+
+
+def test_json_roundtrip_for_disk_tier():
+    cols = om.ForecastColumns.from_payload(PAYLOAD, "hourly", dtype="float32")
+    back = om._decode_cache_value(om._encode_cache_value(cols))
+    assert isinstance(back, om.ForecastColumns)
+    assert back.columns["precipitation"].dtype == np.float32
+    np.testing.assert_array_equal(back.times, cols.times)
+    np.testing.assert_array_equal(back.columns["temperature_2m"], cols.columns["temperature_2m"])
+    assert back.meta == cols.meta
+
+
+def test_empty_cached_columns_are_still_a_hit(monkeypatch):
+    # 該当期間の行が 0 件でもキャッシュヒット扱い（上流に取りに行かない）
+    empty = om.ForecastColumns.from_payload({"hourly": {"time": []}}, "hourly")
+    assert bool(empty)
+    monkeypatch.setattr(om, "_cache", om._LRUCache(ttl_seconds=60))
+    c = om.OpenMeteoClient()
+    start = end = date(2025, 1, 1)
+    om._cache.set(c._cache_key(35.0, 139.0, start, end), empty)
+
+    def _boom(self, params):
+        raise AssertionError("upstream should not be called")
+
+    monkeypatch.setattr(om.OpenMeteoClient, "_request_json", _boom)
+    assert c.get_forecast(35.0, 139.0, start, end).times == []
+
+
+def test_payload_to_json_restores_list_form():
+    import json
+
+    cols = om.ForecastColumns.from_payload(PAYLOAD, "hourly")
+    legacy = om.payload_to_json(cols.as_payload())
+    assert legacy["hourly"]["time"] == PAYLOAD["hourly"]["time"]
+    assert legacy["hourly"]["temperature_2m"] == PAYLOAD["hourly"]["temperature_2m"]
+    assert legacy["hourly_units"] == PAYLOAD["hourly_units"]
+    json.dumps(legacy)
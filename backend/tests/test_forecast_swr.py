@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import open_meteo as om
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Resp:
+    def __init__(self, tmax: float) -> None:
+        self.status_code = 200
+        self._tmax = tmax
+
+    def raise_for_status(self) -> None:
+        return
+
+    def json(self) -> Dict[str, Any]:
+        return {"daily": {"time": ["2025-01-01"], "temperature_2m_max": [self._tmax]}}
+
+
+class _Upstream:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = False
+
+    async def get(self, url, params=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return _Resp(float(self.calls))
+
+
+@pytest.fixture
+def env(monkeypatch):
+    clock = _Clock()
+    upstream = _Upstream()
+    monkeypatch.setattr(om.time, "time", clock)
+    monkeypatch.setattr(om, "_daily_cache", om._LRUCache(ttl_seconds=60, grace_seconds=600))
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: upstream)
+    monkeypatch.setattr(om, "_revalidate_failed", set())
+
+    async def _no_sleep(_s: float) -> None:
+        return
+
+    monkeypatch.setattr(om.asyncio, "sleep", _no_sleep)
+    return clock, upstream
+
+
+def _fetch() -> tuple[Dict[str, Any], str]:
+    async def _run():
+        c = om.OpenMeteoClient()
+        out = await c.fetch_recent_daily_with_freshness(lat=1.0, lon=2.0, tz="UTC", days=3)
+        # バックグラウンド再検証を完了させる
+        await asyncio.gather(*list(om._background_tasks), return_exceptions=True)
+        return out
+
+    return asyncio.run(_run())
+
+
+def test_swr_serves_expired_entry_and_revalidates(env):
+    clock, upstream = env
+    data, state = _fetch()
+    assert (state, data["daily"]["temperature_2m_max"], upstream.calls) == ("fresh", [1.0], 1)
+
+    clock.now += 61
+    data, state = _fetch()
+    assert state == "revalidating"
+    assert data["daily"]["temperature_2m_max"] == [1.0]  # 古い値を即返す
+    assert upstream.calls == 2
+
+    data, state = _fetch()
+    assert (state, data["daily"]["temperature_2m_max"]) == ("fresh", [2.0])
+
+
+def test_swr_serves_stale_when_upstream_fails(env):
+    clock, upstream = env
+    _fetch()
+    clock.now += 61
+    upstream.fail = True
+    _, state = _fetch()
+    assert state == "revalidating"
+    data, state = _fetch()
+    assert state == "stale"
+    assert data["daily"]["temperature_2m_max"] == [1.0]
+
+    # 猶予期間を過ぎたら上流エラーがそのまま伝播
+    clock.now += 600
+    with pytest.raises(RuntimeError):
+        _fetch()
+
+
+def test_forecast_sets_freshness_header(env):
+    resp = TestClient(app).get("/forecast", params={"lat": 1.0, "lon": 2.0, "days": 3, "tz": "UTC"})
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["X-Cache-Freshness"] == "fresh"
+
+
+def test_swr_disabled_by_default_without_grace(monkeypatch):
+    monkeypatch.setattr(om, "_daily_cache", om._LRUCache(ttl_seconds=60))
+    assert om.OpenMeteoClient().stale_while_revalidate is False
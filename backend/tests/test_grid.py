@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from app.services import grid, open_meteo as om
+
+
+def test_degree_snap_shares_cell_for_nearby_points():
+    spec = grid.GridSpec(mode=grid.GRID_DEGREE, degree=0.1)
+    # 約 50m 離れた 2 点
+    a = grid.snap(35.6762, 139.6503, spec)
+    b = grid.snap(35.6758, 139.6508, spec)
+    assert a == b == (35.7, 139.7)
+    assert grid.cell_key(35.6762, 139.6503, spec) == grid.cell_key(35.6758, 139.6508, spec)
+    # スナップ済み座標は不動点
+    assert grid.snap(*a, spec) == a
+
+
+def test_geohash_matches_reference_and_is_stable():
+    assert grid.geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    spec = grid.GridSpec(mode=grid.GRID_GEOHASH, geohash_precision=5)
+    center = grid.snap(57.64911, 10.40744, spec)
+    assert grid.geohash_encode(*center, 5) == "u4pru"
+    assert grid.cell_key(*center, spec) == "gh:u4pru"
+
+
+def test_off_mode_only_normalizes():
+    spec = grid.GridSpec(mode=grid.GRID_OFF)
+    assert grid.snap(35.12345, 190.0, spec) == pytest.approx((35.12345, -170.0))
+
+
+def test_open_meteo_requests_and_caches_by_cell(monkeypatch):
+    monkeypatch.setattr(grid, "GRID", grid.GridSpec(mode=grid.GRID_DEGREE, degree=0.1))
+    monkeypatch.setattr(om, "_cache", om._LRUCache(ttl_seconds=60))
+    seen = []
+
+    def _fake(self, key, lat, lon, *args):
+        seen.append((lat, lon))
+        data = {"hourly": {"time": []}}
+        om._cache.set(key, data)
+        return data
+
+    monkeypatch.setattr(om.OpenMeteoClient, "_get_hourly_uncached", _fake)
+    c = om.OpenMeteoClient()
+    kw = dict(start=date(2025, 1, 1), end=date(2025, 1, 1), hourly=["temperature_2m"])
+    c.get_hourly(lat=35.6762, lon=139.6503, **kw)
+    c.get_hourly(lat=35.6758, lon=139.6508, **kw)
+    assert seen == [(35.7, 139.7)]
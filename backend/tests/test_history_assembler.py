@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.baseline import SimpleRegModel
+from app.ml.features import FeaturePipeline
+from app.ml.train import make_synthetic_daily
+from app.services.history import HistoryAssembler
+
+D0 = date(2025, 3, 20)
+
+
+class _RangeClient:
+    """要求された期間の hourly を返す（日ごとに気温が変わる）"""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def get_hourly(self, *, lat, lon, start, end, hourly, timezone):
+        self.calls.append((start.date(), end.date()))
+        idx = pd.date_range(
+            start.date(), end.date() + timedelta(days=1), freq="h", inclusive="left"
+        )
+        day = (idx.normalize() - pd.Timestamp("2025-01-01")).days.to_numpy()
+        temp = 10.0 + 0.3 * day + 0.1 * idx.hour.to_numpy()
+        return {
+            "hourly": {
+                "time": idx.to_numpy(),
+                "temperature_2m": temp,
+                "precipitation": np.full(len(idx), 0.1),
+            }
+        }
+
+
+@pytest.fixture(scope="module")
+def model(gbdt_artifact):
+    return SimpleRegModel.load(str(gbdt_artifact))
+
+
+def test_fetches_history_once_and_memoizes_per_day(model):
+    pipe = model.pipeline
+    asm = HistoryAssembler()
+    client = _RangeClient()
+
+    h = asm.assemble(35.0, 139.0, "Asia/Tokyo", D0, client, pipe)
+    days = pipe.required_history_days()
+    assert client.calls == [(D0 - timedelta(days=days - 1), D0)]
+    assert len(h.frame) == days and h.frame["date"].iloc[-1] == pd.Timestamp(D0)
+    assert h.d0.d0_mean == pytest.approx(10.0 + 0.3 * 78 + 1.15)
+
+    # 履歴つきの特徴量 == 履歴フレームを transform した D0 行。予測も predict と一致
+    np.testing.assert_array_equal(h.features, pipe.transform(h.frame, as_array=True)[-1:])
+    d0 = [[h.d0.d0_mean, h.d0.d0_min, h.d0.d0_max, h.d0.d0_prec]]
+    np.testing.assert_allclose(model.predict_features(h.features, d0), model.predict(h.frame)[-1:])
+
+    # 同じ日・同じセル（近傍クリック含む）はメモ参照だけ
+    assert asm.assemble(35.001, 139.001, "Asia/Tokyo", D0, client, pipe) is h
+    assert len(client.calls) == 1
+
+
+def test_next_day_fetches_only_missing_days(model):
+    pipe = model.pipeline
+    asm = HistoryAssembler()
+    client = _RangeClient()
+    asm.assemble(35.0, 139.0, "Asia/Tokyo", D0, client, pipe)
+    nxt = D0 + timedelta(days=1)
+    h = asm.assemble(35.0, 139.0, "Asia/Tokyo", nxt, client, pipe)
+    # 前日（旧 D0）と新しい D0 だけ
+    assert client.calls[-1] == (D0, nxt)
+    assert not h.frame[["d_mean", "d_min", "d_max", "d_prec"]].isna().any().any()
+
+
+def test_days_missing_upstream_are_nan_and_not_refetched():
+    class _D0Only(_RangeClient):
+        def get_hourly(self, *, start, end, **kw):
+            # 範囲指定を無視して当日だけ返す上流
+            return super().get_hourly(start=end, end=end, **kw)
+
+    asm = HistoryAssembler()
+    client = _D0Only()
+    df, _ = make_synthetic_daily(seed=0, n_days=60)
+    pipe = FeaturePipeline().fit(df)
+    h = asm.assemble(35.0, 139.0, "UTC", D0, client, pipe)
+    assert h.frame["d_mean"].iloc[:-1].isna().all() and np.isfinite(h.features).all()
+    asm._memo.clear()
+    asm.assemble(35.0, 139.0, "UTC", D0, client, pipe)
+    assert client.calls[-1] == (D0, D0)
+
+
+def test_memo_expires_with_hourly_cache_so_d0_stays_fresh(model, monkeypatch):
+    from app.services import open_meteo as om
+
+    now = [1000.0]
+    monkeypatch.setattr(om.time, "time", lambda: now[0])
+    pipe = model.pipeline
+    # 長い TTL を指定しても hourly キャッシュの TTL で切り詰める
+    asm = HistoryAssembler(memo_ttl=24 * 3600)
+    client = _RangeClient()
+    first = asm.assemble(35.0, 139.0, "Asia/Tokyo", D0, client, pipe)
+
+    now[0] += om.HOURLY_CACHE_TTL + 1
+    again = asm.assemble(35.0, 139.0, "Asia/Tokyo", D0, client, pipe)
+    assert again is not first
+    # 過去日は保持分を使い、取り直すのは D0 だけ
+    assert client.calls[-1] == (D0, D0)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.utils import json_utils
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_roundtrip_with_numpy_values(monkeypatch, use_orjson):
+    if use_orjson and json_utils.orjson is None:
+        pytest.skip("orjson not installed")
+    monkeypatch.setattr(json_utils, "_ORJSON_AVAILABLE", use_orjson)
+
+    payload = {"daily": {"tmax": np.array([1.5, 2.0]), "n": np.int64(3)}, "tz": "東京"}
+    out = json_utils.loads(json_utils.dumps(payload))
+    assert out == {"daily": {"tmax": [1.5, 2.0], "n": 3}, "tz": "東京"}
+
+    resp = json_utils.FastJSONResponse(payload, headers={"X-Test": "1"})
+    assert json_utils.loads(resp.body) == out
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.headers["x-test"] == "1"
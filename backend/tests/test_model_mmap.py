@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import joblib
+import numpy as np
+
+from app.ml.baseline import SimpleRegModel, _tree_predictors, nodes_path_for
+from app.ml.train import make_synthetic_daily
+
+
+def test_artifact_tree_nodes_share_one_mmap(gbdt_artifact):
+    sidecar = nodes_path_for(gbdt_artifact)
+    assert sidecar.is_file()
+
+    df, _ = make_synthetic_daily(seed=3, n_days=30)
+    plain = SimpleRegModel.load(gbdt_artifact.as_posix())
+    mapped = SimpleRegModel.load(gbdt_artifact.as_posix(), mmap_mode="r")
+    np.testing.assert_array_equal(mapped.predict(df), plain.predict(df))
+
+    # 木の本数によらず、全ノード配列が side-car 1 本の mmap を参照する
+    preds = list(_tree_predictors(mapped.model["model"]))
+    bases = {id(tp.nodes.base) for tp in preds}
+    assert preds and len(bases) == 1
+    assert isinstance(preds[0].nodes.base, np.memmap)
+
+
+def test_artifact_without_sidecar_uses_joblib_mmap(tmp_path):
+    path = tmp_path / "plain.joblib"
+    joblib.dump({"model": None, "coef": np.arange(1000.0)}, path.as_posix())
+    loaded = SimpleRegModel.load(path.as_posix(), mmap_mode="r")
+    assert isinstance(loaded.model["coef"], np.memmap)
+
+
+def test_overwriting_artifact_keeps_mmapped_model_intact(gbdt_artifact, other_gbdt_model, tmp_path):
+    import shutil
+
+    from app.ml.baseline import dump_artifact
+    from app.ml.compact import CompactPredictor, compact_path_for, export_compact
+
+    live_path = tmp_path / "live_gbdt.joblib"
+    shutil.copy(gbdt_artifact, live_path)
+    shutil.copy(nodes_path_for(gbdt_artifact), nodes_path_for(live_path))
+    shutil.copytree(compact_path_for(gbdt_artifact), compact_path_for(live_path))
+
+    df, _ = make_synthetic_daily(seed=3, n_days=30)
+    live = SimpleRegModel.load(live_path.as_posix(), mmap_mode="r")
+    live_compact = CompactPredictor.load(compact_path_for(live_path))
+    before, before_compact = live.predict(df), live_compact.predict_frame(df)
+
+    # 同名での再学習（同じ日の 2 回目など）: 稼働中のモデルの配列は書き換わらない
+    other = other_gbdt_model
+    dump_artifact(other, live_path)
+    export_compact(other, compact_path_for(live_path))
+
+    np.testing.assert_array_equal(live.predict(df), before)
+    np.testing.assert_array_equal(live_compact.predict_frame(df), before_compact)
+    # 新しく読めば新しい成果物
+    fresh = SimpleRegModel.load(live_path.as_posix(), mmap_mode="r")
+    np.testing.assert_array_equal(fresh.predict(df), SimpleRegModel({**other}).predict(df))
+    assert not np.array_equal(fresh.predict(df), before)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.ml import registry as regmod
+
+
+class _MockOM:
+    def get_hourly(self, **kwargs) -> Dict[str, Any]:
+        base = datetime(2025, 1, 1, 0, 0)
+        times = [(base + timedelta(hours=i)).strftime("%Y-%m-%dT%H:00") for i in range(24)]
+        return {
+            "hourly": {
+                "time": times,
+                "temperature_2m": [10.0 + i * 0.1 for i in range(24)],
+                "precipitation": [0.0] * 24,
+            }
+        }
+
+
+@pytest.fixture
+def artifact(gbdt_artifact) -> Path:
+    return gbdt_artifact
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    from app.api import routes as routes_mod
+
+    monkeypatch.setattr(routes_mod, "OpenMeteoClient", _MockOM)
+    regmod.get_registry().clear()
+    yield
+    regmod.get_registry().clear()
+
+
+def test_preload_registers_latest_artifact(artifact, monkeypatch):
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.setenv("MODELS_DIR", artifact.parent.as_posix())
+
+    reg = regmod.get_registry()
+    entry = reg.preload()
+    assert entry is not None
+    assert entry.version == artifact.stem
+    assert reg.get("regression") is entry
+    assert reg.versions("regression") == [artifact.stem]
+    # 2 回目は再ロードしない
+    assert reg.preload() is entry
+
+
+def test_predict_uses_registry_model(artifact, monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "regression")
+    monkeypatch.setenv("MODEL_PATH", artifact.as_posix())
+
+    # 起動フックでロードされた後はリクエスト経路で joblib.load しない
+    with TestClient(app) as client:
+        monkeypatch.setattr(
+            regmod.SimpleRegModel, "load", classmethod(lambda cls, p: pytest.fail("reloaded"))
+        )
+        resp = client.get("/predict", params={"lat": 35.0, "lon": 139.0})
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["backend"] == "regression"
+    assert body["model_version"] == artifact.stem
+    assert body["prediction"]["d1_prec"] >= 0.0
+
+
+def test_predict_falls_back_to_persistence_without_artifact(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "regression")
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.setenv("MODELS_DIR", tmp_path.as_posix())
+
+    resp = TestClient(app).post("/predict", json={"lat": 35.0, "lon": 139.0})
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["backend"] == "persistence"
+    assert body["prediction"]["d1_max"] == body["d0"]["max"]
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.ml import registry as regmod
+from app.ml.baseline import nodes_path_for
+
+
+def _install(src: Path, models_dir: Path, stem: str) -> Path:
+    """成果物（joblib + ノード side-car）を models_dir に別名で置く"""
+    dst = models_dir / f"{stem}_gbdt.joblib"
+    shutil.copyfile(nodes_path_for(src), nodes_path_for(dst))
+    shutil.copyfile(src, dst)
+    return dst
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch) -> Path:
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.setenv("MODELS_DIR", tmp_path.as_posix())
+    regmod.get_registry().clear()
+    yield tmp_path
+    regmod.get_registry().clear()
+
+
+def test_reload_swaps_to_newer_artifact(models_dir, gbdt_artifact):
+    reg = regmod.get_registry()
+    _install(gbdt_artifact, models_dir, "20250101_aaaaaaa")
+    first = reg.preload()
+    assert first is not None and first.version == "20250101_aaaaaaa_gbdt"
+    assert reg.reload_if_changed() is None  # 変化なし
+
+    _install(gbdt_artifact, models_dir, "20250102_bbbbbbb")
+    new = reg.reload_if_changed()
+    assert new is not None and reg.get(regmod.BACKEND_REGRESSION) is new
+    # 差し替え前に取得していた参照はそのまま使える（処理中リクエスト相当）
+    assert first.model.predict(regmod._warmup_frame()).shape == (1, 4)
+    assert reg.reloads == 1
+
+    # 壊れた成果物は検証で弾かれ、アクティブ版は変わらない（同じファイルは再試行しない）
+    (models_dir / "20250103_ccccccc_gbdt.joblib").write_bytes(b"not a pickle")
+    assert reg.reload_if_changed() is None
+    assert reg.reload_if_changed() is None
+    assert reg.get(regmod.BACKEND_REGRESSION) is new
+    assert reg.reload_failures == 1
+
+
+def test_watcher_picks_up_new_artifact(models_dir, gbdt_artifact):
+    reg = regmod.get_registry()
+    reg.preload()
+    assert reg.get(regmod.BACKEND_REGRESSION) is None
+
+    async def scenario() -> regmod.ModelEntry | None:
+        watcher = regmod.ModelWatcher(reg, interval_seconds=0.01)
+        watcher.start()
+        _install(gbdt_artifact, models_dir, "20250105_ddddddd")
+        for _ in range(500):
+            await asyncio.sleep(0.01)
+            if reg.get(regmod.BACKEND_REGRESSION) is not None:
+                break
+        await watcher.stop()
+        assert not watcher.running
+        return reg.get(regmod.BACKEND_REGRESSION)
+
+    entry = asyncio.run(scenario())
+    assert entry is not None and entry.version == "20250105_ddddddd_gbdt"
+
+
+def test_model_endpoint_reports_active_artifact(models_dir, gbdt_artifact, monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "regression")
+    _install(gbdt_artifact, models_dir, "20250104_1234abc")
+    regmod.get_registry().preload()
+    body = TestClient(app).get("/api/model").json()
+    assert body["backend"] == "regression"
+    art = body["artifact"]
+    assert art["version"] == "20250104_1234abc_gbdt"
+    assert art["git_sha"] and art["created_at"]
+
+
+def test_same_path_rewrite_keeps_previous_version_serving(
+    models_dir, gbdt_artifact, other_gbdt_model
+):
+    from app.ml.baseline import SimpleRegModel, dump_artifact
+
+    reg = regmod.get_registry()
+    path = _install(gbdt_artifact, models_dir, "20250106_eeeeeee")
+    old = reg.preload()
+    assert old is not None
+    frame = regmod._warmup_frame()
+    before = old.model.predict(frame)
+
+    # 同じ日の再学習: 同名で書き直す（dump_artifact は os.replace で差し替える）
+    dump_artifact(other_gbdt_model, path)
+    new = reg.reload_if_changed()
+    assert new is not None and new.version == old.version and new.inode != old.inode
+    np.testing.assert_array_equal(
+        new.model.predict(frame), SimpleRegModel(other_gbdt_model).predict(frame)
+    )
+    # 処理中リクエストが持つ旧版は壊れておらず、ロールバック用に別キーで残る
+    np.testing.assert_array_equal(old.model.predict(frame), before)
+    rollback = f"{old.version}@{old.mtime_ns}"
+    assert rollback in reg.versions(regmod.BACKEND_REGRESSION)
+    assert reg.get(regmod.BACKEND_REGRESSION, rollback).model is old.model
+
+
+def test_in_place_overwrite_is_not_kept_for_rollback(models_dir, gbdt_artifact, monkeypatch):
+    reg = regmod.get_registry()
+    path = _install(gbdt_artifact, models_dir, "20250107_fffffff")
+    old = reg.preload()
+    assert old is not None
+    monkeypatch.setattr(regmod, "MODEL_MMAP_MODE", "r")
+    # cp 相当の同一 inode への上書き（mtime だけ変わる）
+    path.write_bytes(path.read_bytes())
+    new = reg.reload_if_changed()
+    assert new is not None and new.inode == old.inode
+    assert reg.versions(regmod.BACKEND_REGRESSION) == [new.version]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import open_meteo as om
+
+
+def _one(lat: float, lon: float) -> Dict[str, Any]:
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "UTC",
+        "daily": {"time": ["2025-01-01"], "temperature_2m_max": [lat + lon]},
+    }
+
+
+class _Resp:
+    def __init__(self, body: Any, status: int = 200) -> None:
+        self._body = body
+        self.status_code = status
+        self.headers: Dict[str, str] = {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            req = httpx.Request("GET", "https://example.test/v1/forecast")
+            raise httpx.HTTPStatusError(
+                "bad request", request=req, response=httpx.Response(self.status_code, request=req)
+            )
+
+    def json(self) -> Any:
+        return self._body
+
+
+class _Upstream:
+    """複数座標なら配列、単一座標ならオブジェクトを返す Open-Meteo もどき"""
+
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, str]] = []
+        self.fail = False
+        self.bad_lats: set[float] = set()  # 含まれていたら 400（不正な座標）
+
+    async def get(self, url, params=None):
+        p = dict(params)
+        self.calls.append(p)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        lats = [float(v) for v in p["latitude"].split(",")]
+        lons = [float(v) for v in p["longitude"].split(",")]
+        if self.bad_lats.intersection(lats):
+            return _Resp({"error": True, "reason": "invalid latitude"}, status=400)
+        bodies = [_one(a, b) for a, b in zip(lats, lons, strict=True)]
+        return _Resp(bodies if "," in p["latitude"] else bodies[0])
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    up = _Upstream()
+    monkeypatch.setattr(om, "_daily_cache", om._LRUCache(ttl_seconds=60))
+    monkeypatch.setattr(om, "_window_past_days", {})
+    monkeypatch.setattr(om, "_daily_batcher", om._AsyncBatcher("daily_batch", 0, 50))
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: up)
+    monkeypatch.setattr(
+        om.OpenMeteoClient, "_retry_delay", lambda self, attempt, retry_after=None: 0.0
+    )
+    return up
+
+
+POINTS = [(35.0, 139.0), (34.0, 135.0), (43.0, 141.0)]
+
+
+def test_concurrent_lookups_share_one_multi_location_request(upstream):
+    c = om.OpenMeteoClient(retries=1)
+    out = asyncio.run(c.fetch_recent_daily_many([*POINTS, POINTS[0]], tz="UTC", days=3))
+
+    assert len(upstream.calls) == 1
+    assert upstream.calls[0]["latitude"] == "35.0,34.0,43.0"
+    assert [o["daily"]["temperature_2m_max"] for o in out] == [[174.0], [169.0], [184.0], [174.0]]
+    # 地点ごとのキャッシュに入るので、単独の取得は上流に行かない
+    single = asyncio.run(c.fetch_recent_daily(lat=34.0, lon=135.0, tz="UTC", days=3))
+    assert single["latitude"] == 34.0 and len(upstream.calls) == 1
+
+
+def test_single_location_keeps_plain_request(upstream):
+    c = om.OpenMeteoClient(retries=1)
+    out = asyncio.run(c.fetch_recent_daily(lat=35.0, lon=139.0, tz="UTC", days=3))
+    assert upstream.calls[0]["latitude"] == "35.0"
+    assert out["daily"]["temperature_2m_max"] == [174.0]
+
+
+def test_batches_split_at_max_locations(upstream, monkeypatch):
+    monkeypatch.setattr(om, "_daily_batcher", om._AsyncBatcher("daily_batch", 0, 2))
+    c = om.OpenMeteoClient(retries=1)
+    out = asyncio.run(c.fetch_recent_daily_many(POINTS, tz="UTC", days=3))
+    assert sorted(len(p["latitude"].split(",")) for p in upstream.calls) == [1, 2]
+    assert [o["latitude"] for o in out] == [35.0, 34.0, 43.0]
+
+
+def test_failure_is_reported_per_location(upstream):
+    upstream.fail = True
+    c = om.OpenMeteoClient(retries=1)
+    out = asyncio.run(c.fetch_recent_daily_many(POINTS, tz="UTC", days=3))
+    assert len(upstream.calls) == 1
+    assert all(isinstance(o, RuntimeError) for o in out)
+
+
+def test_client_error_falls_back_to_per_location_requests(upstream):
+    upstream.bad_lats = {34.0}
+    c = om.OpenMeteoClient(retries=3)
+    out = asyncio.run(c.fetch_recent_daily_many(POINTS, tz="UTC", days=3))
+    # 1 回目のまとめ取りが 400 -> 地点ごとに取り直し（4xx は再試行しない）
+    assert [p["latitude"] for p in upstream.calls] == ["35.0,34.0,43.0", "35.0", "34.0", "43.0"]
+    assert out[0]["daily"]["temperature_2m_max"] == [174.0]
+    assert isinstance(out[1], httpx.HTTPStatusError)
+    assert out[2]["daily"]["temperature_2m_max"] == [184.0]
+    assert om._breaker.state == "closed"
+
+
+def test_forecast_batch_endpoint(upstream):
+    client = TestClient(app)
+    body = {"items": [{"lat": a, "lon": b} for a, b in POINTS], "tz": "UTC", "days": 3}
+    r = client.post("/forecast/batch", json=body)
+    assert r.status_code == 200
+    js = r.json()
+    assert (js["count"], js["succeeded"], js["failed"]) == (3, 3, 0)
+    assert [x["daily"]["tmax"] for x in js["results"]] == [[174.0], [169.0], [184.0]]
+    assert len(upstream.calls) == 1
+
+
+def test_short_batch_result_fails_waiters_instead_of_hanging():
+    batcher = om._AsyncBatcher("short_batch", 0, 50)
+
+    async def _fetch_many(points):
+        return [f"ok:{points[0]}"]  # 2 地点に 1 件しか返さない
+
+    async def _run():
+        return await asyncio.wait_for(
+            asyncio.gather(
+                batcher.submit("g", (1.0, 2.0), _fetch_many),
+                batcher.submit("g", (3.0, 4.0), _fetch_many),
+                return_exceptions=True,
+            ),
+            timeout=2.0,
+        )
+
+    out = asyncio.run(_run())
+    assert all(isinstance(o, ValueError) for o in out)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from app.observability import metrics_dump
+from app.services import open_meteo as om
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_evicts_least_recently_used_by_entries():
+    c = om._LRUCache(ttl_seconds=60, max_entries=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a を最新化 → b が最古
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    st = c.stats()
+    assert st["entries"] == 2 and st["evictions"] == 1
+    assert st["hits"] == 3 and st["misses"] == 1
+
+
+def test_lru_respects_byte_budget():
+    payload = {"hourly": {"temperature_2m": [1.5] * 200}}
+    size = om._approx_size(payload)
+    c = om._LRUCache(ttl_seconds=60, max_entries=100, max_bytes=int(size * 2.5))
+    for k in "abcd":
+        c.set(k, payload)
+    assert len(c) == 2
+    assert c.stats()["bytes"] <= c.max_bytes
+    # 単体で上限超過は保持しない
+    c.set("huge", {"x": [0.0] * 100000})
+    assert c.get("huge") is None
+
+
+def test_expired_entries_are_swept_without_being_read(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(om.time, "time", clock)
+    c = om._LRUCache(ttl_seconds=10, max_entries=100)
+    for i in range(50):
+        c.set(f"k{i}", i)
+    clock.now += 11
+    c.set("fresh", 1)  # 書き込みだけで古いキーが掃除される
+    assert len(c) == 1
+    st = c.stats()
+    assert st["expirations"] == 50 and st["bytes"] == om._approx_size(1)
+
+
+def test_cache_stats_exposed_in_metrics():
+    stats = metrics_dump()["stats"]
+    assert "open_meteo.cache.hourly" in stats
+    assert "open_meteo.cache.daily" in stats
+    assert {"hits", "misses", "evictions", "entries", "bytes"} <= set(
+        stats["open_meteo.cache.daily"]
+    )
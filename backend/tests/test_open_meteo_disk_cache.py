@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.services import open_meteo as om
+from app.services.disk_cache import SQLiteCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(om.time, "time", c)
+    return c
+
+
+def _worker_cache(path: str, table: str = "hourly", grace: float = 0.0) -> om._TieredCache:
+    """ワーカープロセス 1 つ分（メモリ層は独立、ディスク層は共有）"""
+    mem = om._LRUCache(ttl_seconds=60, grace_seconds=grace)
+    disk = SQLiteCache(
+        path,
+        table,
+        max_age_seconds=mem.ttl + mem.grace,
+        encode=om._encode_cache_value,
+        decode=om._decode_cache_value,
+    )
+    return om._TieredCache(mem, disk)
+
+
+def test_write_through_is_visible_to_other_workers(tmp_path, clock):
+    path = (tmp_path / "om.sqlite").as_posix()
+    w1, w2 = _worker_cache(path), _worker_cache(path)
+
+    payload = {"hourly": {"time": ["2025-01-01T00:00"], "temperature_2m": [1.5]}}
+    fr = om.ForecastResult(times=["t0"], temperature_2m=[1.0], precipitation=[0.0])
+    w1.set("a", payload)
+    w1.set("b", fr)
+
+    assert w2.get("a") == payload
+    assert w2.get("b") == fr
+    assert w2.stats()["disk"]["hits"] == 2
+    # 昇格後は L1 から返る
+    assert w2.mem.get("a") == payload
+
+
+def test_disk_entries_keep_original_age(tmp_path, clock):
+    path = (tmp_path / "om.sqlite").as_posix()
+    w1 = _worker_cache(path, table="daily", grace=100)
+    w1.set("k", {"v": 1})
+
+    clock.now += 61
+    w2 = _worker_cache(path, table="daily", grace=100)
+    assert w2.get("k") is None  # TTL 切れ
+    assert w2.peek("k") == ({"v": 1}, False)  # 猶予期間内は stale として参照可
+
+    clock.now += 100
+    w3 = _worker_cache(path, table="daily", grace=100)
+    assert w3.peek("k") is None
+    assert len(w3.disk) == 0  # 期限切れ行は削除済み
+
+
+def test_make_cache_without_path_is_memory_only(monkeypatch):
+    monkeypatch.delenv("OPEN_METEO_DISK_CACHE_PATH", raising=False)
+    mem = om._LRUCache()
+    assert om._make_cache(mem, "hourly") is mem
+
+
+class _SlowDisk:
+    """ロック待ち（busy_timeout）相当で毎回ブロックするディスク層"""
+
+    table = "slow"
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.rows: dict = {}
+
+    def get(self, key):
+        time.sleep(self.delay)
+        return self.rows.get(key)
+
+    def set(self, key, value, created_at=None):
+        time.sleep(self.delay)
+        self.rows[key] = (created_at, value)
+
+    def stats(self):
+        return {}
+
+
+def test_async_access_does_not_block_event_loop():
+    disk = _SlowDisk(0.2)
+    tiered = om._TieredCache(om._LRUCache(ttl_seconds=60), disk)
+
+    async def _scenario():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def _ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        t = asyncio.ensure_future(_ticker())
+        t0 = time.perf_counter()
+        await tiered.aset("a", {"v": 1})  # write-behind: 待たずに戻る
+        set_s = time.perf_counter() - t0
+        miss = await tiered.aget("missing")  # L2 の読みはスレッドで
+        done.set()
+        await t
+        return ticks, set_s, miss
+
+    ticks, set_s, miss = asyncio.run(_scenario())
+    assert miss is None
+    assert set_s < 0.1
+    # L2 アクセス（書き 0.2s + 読み 0.2s）の間もループは回り続ける
+    assert ticks >= 10
+    tiered.flush()
+    assert disk.rows["a"][1] == {"v": 1}
+    assert tiered.mem.get("a") == {"v": 1}
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from app.observability import metrics_dump
+from app.services import open_meteo as om
+from app.utils import circuit_breaker as cbmod
+
+PARAMS: Dict[str, Any] = {"latitude": 1.0, "longitude": 2.0}
+
+
+class _Resp:
+    def __init__(self, status: int = 200, headers: Dict[str, str] | None = None) -> None:
+        self.status_code = status
+        self.headers = headers or {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"status {self.status_code}")
+
+    def json(self) -> Dict[str, Any]:
+        return {"ok": True}
+
+
+class _Scripted:
+    """responses を順に返す（尽きたら 200）"""
+
+    def __init__(self, *responses: _Resp, delay: float = 0.0) -> None:
+        self.responses = list(responses)
+        self.calls = 0
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def get(self, url, params=None):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            return self.responses.pop(0) if self.responses else _Resp()
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out: List[float] = []
+
+    async def _sleep(s: float) -> None:
+        out.append(s)
+
+    monkeypatch.setattr(om.asyncio, "sleep", _sleep)
+    return out
+
+
+def _run(retries: int = 3) -> Any:
+    return asyncio.run(om.OpenMeteoClient(retries=retries)._arequest_json(PARAMS))
+
+
+def test_retry_after_is_honored_and_capped(monkeypatch, sleeps):
+    fake = _Scripted(_Resp(429, {"Retry-After": "2"}), _Resp(503, {"Retry-After": "120"}))
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: fake)
+    assert _run() == {"ok": True}
+    assert fake.calls == 3
+    assert sleeps == [2.0, om.RETRY_MAX_DELAY]
+
+
+def test_backoff_is_jittered(monkeypatch):
+    c = om.OpenMeteoClient(backoff_factor=0.5)
+    monkeypatch.setattr(om.random, "random", lambda: 0.0)
+    assert [c._retry_delay(a) for a in (1, 2, 3)] == [0.25, 0.5, 1.0]
+    monkeypatch.setattr(om.random, "random", lambda: 1.0)
+    assert [c._retry_delay(a) for a in (1, 2, 3)] == [0.5, 1.0, 2.0]
+
+
+def test_client_errors_are_not_retried(monkeypatch, sleeps):
+    fake = _Scripted(_Resp(400))
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: fake)
+    with pytest.raises(RuntimeError):
+        _run()
+    assert fake.calls == 1 and sleeps == []
+    assert om._breaker.state == "closed"
+
+
+def test_circuit_opens_and_recovers(monkeypatch, sleeps):
+    now = [1000.0]
+    monkeypatch.setattr(cbmod.time, "time", lambda: now[0])
+    monkeypatch.setattr(om, "_breaker", cbmod.CircuitBreaker(3, 10.0, 30.0))
+    fake = _Scripted(*[_Resp(503) for _ in range(3)])
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: fake)
+
+    with pytest.raises(RuntimeError):
+        _run()
+    assert om._breaker.state == "open"
+    # open の間は上流を叩かない
+    with pytest.raises(om.UpstreamUnavailable):
+        _run()
+    assert fake.calls == 3
+
+    now[0] += 31  # half-open -> 成功で closed
+    assert _run() == {"ok": True}
+    assert om._breaker.state == "closed" and fake.calls == 4
+
+
+def test_concurrency_cap_records_queue_wait(monkeypatch):
+    fake = _Scripted(delay=0.02)
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: fake)
+    monkeypatch.setattr(om, "_limiter", om._ConcurrencyLimiter(2))
+    waits: List[float] = []
+
+    def _record(url: str, status: int, duration_ms: float, queue_wait_ms: float = 0.0) -> None:
+        waits.append(queue_wait_ms)
+
+    monkeypatch.setattr(om, "record_ext_api_call", _record)
+
+    async def _many():
+        c = om.OpenMeteoClient()
+        return await asyncio.gather(*(c._arequest_json(PARAMS) for _ in range(6)))
+
+    asyncio.run(_many())
+    assert fake.peak == 2 and fake.calls == 6
+    assert len(waits) == 6 and max(waits) >= 20.0
+    assert om._limiter.stats()["in_flight"] == 0
+
+
+class _Counting:
+    """同期/非同期の両クライアントで同時実行数を合算して数える"""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _begin(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _end(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def get(self, url, params=None):
+        self._begin()
+        try:
+            time.sleep(self.delay)
+            return _Resp()
+        finally:
+            self._end()
+
+    async def aget(self, url, params=None):
+        self._begin()
+        try:
+            await asyncio.sleep(self.delay)
+            return _Resp()
+        finally:
+            self._end()
+
+
+def test_concurrency_cap_is_process_wide(monkeypatch):
+    fake = _Counting(delay=0.02)
+
+    class _AsyncView:
+        get = staticmethod(fake.aget)
+
+    monkeypatch.setattr(om, "_get_sync_client", lambda timeout, headers: fake)
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: _AsyncView)
+    monkeypatch.setattr(om, "_limiter", om._ConcurrencyLimiter(3))
+
+    def _sync_worker() -> None:
+        for _ in range(3):
+            om.OpenMeteoClient()._request_json(PARAMS)
+
+    def _loop_worker() -> None:
+        async def _many():
+            c = om.OpenMeteoClient()
+            await asyncio.gather(*(c._arequest_json(PARAMS) for _ in range(8)))
+
+        asyncio.run(_many())
+
+    # 同期スレッド 4 本 + イベントループ 2 つを同時に走らせる
+    workers = [threading.Thread(target=_sync_worker) for _ in range(4)]
+    workers += [threading.Thread(target=_loop_worker) for _ in range(2)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=30)
+    assert fake.calls == 4 * 3 + 2 * 8
+    assert fake.peak == 3
+    stats = om._limiter.stats()
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_cancelled_async_waiter_does_not_leak_a_slot(monkeypatch):
+    limiter = om._ConcurrencyLimiter(1)
+
+    async def _scenario():
+        async with limiter.aslot():
+            waiter = asyncio.ensure_future(limiter.aslot().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        # 枠は返っていて、次の取得はすぐ通る
+        async with limiter.aslot() as wait_ms:
+            return wait_ms
+
+    assert asyncio.run(_scenario()) < 50.0
+    assert limiter.stats()["in_flight"] == 0 and limiter.stats()["waiting"] == 0
+
+
+def test_pooled_clients_use_explicit_limits(monkeypatch):
+    seen: List[Any] = []
+    monkeypatch.setattr(om, "_async_client", None)
+    monkeypatch.setattr(om.httpx, "AsyncClient", lambda **kw: seen.append(kw["limits"]) or object())
+    om._get_async_client(5.0, {})
+    assert seen[0].max_connections == om.POOL_MAX_CONNECTIONS
+    assert seen[0].max_keepalive_connections == om.POOL_MAX_KEEPALIVE
+
+
+def test_ext_api_metrics_include_queue_wait():
+    from app.observability import record_ext_api_call
+
+    record_ext_api_call("https://example.test/v1", 200, 12.0, queue_wait_ms=7.0)
+    ext = metrics_dump()["ext_api"]["https://example.test/v1"]
+    assert ext["requests"] >= 1 and ext["queue_wait_p95_ms"] is not None
+    assert "open_meteo.upstream" in metrics_dump()["stats"]
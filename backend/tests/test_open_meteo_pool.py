@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services import open_meteo as om
+
+
+class _Resp:
+    def __init__(self, status: int = 200) -> None:
+        self.status_code = status
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"status {self.status_code}")
+
+    def json(self) -> Dict[str, Any]:
+        return {"hourly": {"time": ["2025-01-01T00:00"], "temperature_2m": [1.0]}}
+
+
+class _FlakyClient:
+    """先頭 fail_first 回は 503 を返す"""
+
+    def __init__(self, fail_first: int = 0) -> None:
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def _next(self) -> _Resp:
+        self.calls += 1
+        return _Resp(503 if self.calls <= self.fail_first else 200)
+
+    def get(self, url, params=None):
+        return self._next()
+
+
+class _AsyncFlakyClient(_FlakyClient):
+    async def get(self, url, params=None):  # type: ignore[override]
+        return self._next()
+
+
+KW = dict(start=date(2025, 1, 1), end=date(2025, 1, 2), hourly=["temperature_2m"], timezone="UTC")
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(om, "_cache", om._LRUCache(ttl_seconds=60))
+    # ジッタを最大側に固定（待ち時間 = 指数バックオフそのもの）
+    monkeypatch.setattr(om.random, "random", lambda: 1.0)
+
+
+def test_sync_path_reuses_pooled_client_and_skips_final_sleep(monkeypatch):
+    fake = _FlakyClient(fail_first=10)
+    monkeypatch.setattr(om, "_sync_client", fake)
+    monkeypatch.setattr(om.httpx, "Client", lambda *a, **k: pytest.fail("new client created"))
+    sleeps: List[float] = []
+    monkeypatch.setattr(om.time, "sleep", sleeps.append)
+
+    with pytest.raises(RuntimeError):
+        om.OpenMeteoClient(retries=3).get_hourly(lat=1.0, lon=2.0, **KW)
+    assert fake.calls == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_aget_hourly_uses_async_pool_with_async_backoff(monkeypatch):
+    fake = _AsyncFlakyClient(fail_first=1)
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: fake)
+    monkeypatch.setattr(om.time, "sleep", lambda s: pytest.fail("blocking sleep"))
+    sleeps: List[float] = []
+
+    async def _sleep(s: float) -> None:
+        sleeps.append(s)
+
+    monkeypatch.setattr(om.asyncio, "sleep", _sleep)
+
+    async def _run():
+        c = om.OpenMeteoClient()
+        first = await c.aget_hourly(lat=3.0, lon=4.0, **KW)
+        again = await c.aget_hourly(lat=3.0, lon=4.0, **KW)  # キャッシュ
+        fc = await c.aget_forecast(3.0, 4.0, date(2025, 1, 1), date(2025, 1, 2))
+        return first, again, fc
+
+    first, again, fc = asyncio.run(_run())
+    assert list(first["hourly"]["temperature_2m"]) == [1.0]
+    # 2 回目はキャッシュ（同じ配列を共有）
+    assert again["hourly"]["temperature_2m"] is first["hourly"]["temperature_2m"]
+    assert isinstance(fc, om.ForecastResult)
+    assert fake.calls == 3 and sleeps == [0.5]
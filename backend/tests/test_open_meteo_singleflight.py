@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict
+
+from app.observability import metrics_dump
+from app.services import open_meteo as om
+
+
+class _Resp:
+    status_code = 200
+
+    def raise_for_status(self) -> None:
+        return
+
+    def json(self) -> Dict[str, Any]:
+        return {"daily": {"time": ["2025-01-01"]}}
+
+
+class _SlowAsyncClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def get(self, url, params=None):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return _Resp()
+
+
+def _counter(name: str) -> int:
+    return metrics_dump()["counters"].get(name, 0)
+
+
+def test_concurrent_daily_fetches_are_coalesced(monkeypatch):
+    fake = _SlowAsyncClient()
+    monkeypatch.setattr(om, "_get_async_client", lambda timeout, headers: fake)
+    issued0 = _counter("open_meteo.daily.issued")
+    coalesced0 = _counter("open_meteo.daily.coalesced")
+
+    async def _run():
+        c = om.OpenMeteoClient()
+        return await asyncio.gather(
+            *[c.fetch_recent_daily(lat=-35.1234, lon=-58.5, tz="UTC", days=7) for _ in range(50)]
+        )
+
+    results = asyncio.run(_run())
+    assert fake.calls == 1
+    assert all(r is results[0] for r in results)
+    assert _counter("open_meteo.daily.issued") - issued0 == 1
+    assert _counter("open_meteo.daily.coalesced") - coalesced0 == 49
+
+
+def test_concurrent_hourly_fetches_are_coalesced(monkeypatch):
+    calls = []
+    gate = threading.Event()
+
+    def _slow(self, key, *args):
+        calls.append(key)
+        gate.wait(1.0)
+        return {"hourly": {"time": []}}
+
+    monkeypatch.setattr(om.OpenMeteoClient, "_get_hourly_uncached", _slow)
+    client = om.OpenMeteoClient()
+    kwargs = dict(
+        lat=12.3456,
+        lon=45.6789,
+        start=date(2025, 1, 1),
+        end=date(2025, 1, 1),
+        hourly=["temperature_2m"],
+        timezone="UTC",
+    )
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futs = [pool.submit(client.get_hourly, **kwargs) for _ in range(8)]
+        time.sleep(0.1)
+        gate.set()
+        results = [f.result() for f in futs]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from app.services import open_meteo as om
+from app.utils import datetime_utils as dtmod
+
+TODAY = date(2026, 3, 10)
+
+
+def _window_payload(params: Dict[str, Any]) -> Dict[str, Any]:
+    """past_days 日前〜今日+6 日（日付指定なら start〜end）の daily + hourly"""
+    if "past_days" in params:
+        first = TODAY - timedelta(days=int(params["past_days"]))
+        n_days = int(params["past_days"]) + 7
+    else:
+        first = date.fromisoformat(params["start_date"])
+        n_days = (date.fromisoformat(params["end_date"]) - first).days + 1
+    days = [first + timedelta(days=i) for i in range(n_days)]
+    hours = [datetime(d.year, d.month, d.day, h) for d in days for h in range(24)]
+    out: Dict[str, Any] = {
+        "timezone": params["timezone"],
+        "daily": {
+            "time": [d.isoformat() for d in days],
+            "temperature_2m_max": [float(d.day) for d in days],
+        },
+    }
+    if "hourly" in params:
+        out["hourly"] = {
+            "time": [t.strftime("%Y-%m-%dT%H:%M") for t in hours],
+            "temperature_2m": [t.day + t.hour / 100 for t in hours],
+            "precipitation": [0.0] * len(hours),
+        }
+    return out
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls: List[Dict[str, Any]] = []
+
+    def _sync(self, params):
+        calls.append(dict(params))
+        return _window_payload(params)
+
+    async def _async(self, params):
+        return _sync(self, params)
+
+    monkeypatch.setattr(om.OpenMeteoClient, "_request_json", _sync)
+    monkeypatch.setattr(om.OpenMeteoClient, "_arequest_json", _async)
+    monkeypatch.setattr(om, "_cache", om._LRUCache(ttl_seconds=60))
+    monkeypatch.setattr(om, "_daily_cache", om._LRUCache(ttl_seconds=60))
+    monkeypatch.setattr(om, "_window_past_days", {})
+    monkeypatch.setattr(dtmod, "now_utc", lambda: datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc))
+    return calls
+
+
+def test_forecast_then_hourly_shares_one_upstream_call(upstream):
+    c = om.OpenMeteoClient()
+    daily = asyncio.run(c.fetch_recent_daily(lat=35.0, lon=139.0, tz="UTC", days=3))
+    assert "hourly" not in daily  # /forecast の応答形は従来どおり
+    assert len(daily["daily"]["time"]) == 10
+
+    start = TODAY - timedelta(days=2)
+    h = c.get_hourly(
+        lat=35.0, lon=139.0, start=start, end=TODAY, hourly=["temperature_2m"], timezone="UTC"
+    )
+    assert len(upstream) == 1
+    assert len(h["hourly"]["time"]) == 3 * 24
+    assert h["hourly"]["time"][0] == np.datetime64(f"{start.isoformat()}T00:00")
+    assert h["hourly"]["temperature_2m"][-1] == pytest.approx(10.23)
+
+
+def test_hourly_fetches_default_window_and_serves_later_ranges(upstream):
+    c = om.OpenMeteoClient()
+    kw = dict(lat=35.0, lon=139.0, hourly=["temperature_2m", "precipitation"], timezone="UTC")
+    c.get_hourly(start=TODAY - timedelta(days=1), end=TODAY, **kw)
+    assert upstream[0]["past_days"] == om.WINDOW_DEFAULT_PAST_DAYS
+    # 別の範囲・非同期経路も同じウィンドウから
+    h = asyncio.run(c.aget_hourly(start=TODAY - timedelta(days=7), end=TODAY, **kw))
+    assert len(upstream) == 1 and len(h["hourly"]["time"]) == 8 * 24
+    # /forecast も同じ past_days なら上流に行かない
+    asyncio.run(
+        c.fetch_recent_daily(lat=35.0, lon=139.0, tz="UTC", days=om.WINDOW_DEFAULT_PAST_DAYS)
+    )
+    assert len(upstream) == 1
+
+
+def test_out_of_window_requests_keep_explicit_dates(upstream):
+    c = om.OpenMeteoClient()
+    c.get_hourly(
+        lat=35.0,
+        lon=139.0,
+        start=date(2025, 1, 1),
+        end=date(2025, 1, 2),
+        hourly=["temperature_2m"],
+        timezone="UTC",
+    )
+    assert "past_days" not in upstream[0] and upstream[0]["start_date"] == "2025-01-01"
+
+
+def test_plan_window_limits():
+    hourly = ["temperature_2m"]
+    assert om.plan_window("UTC", TODAY, TODAY, hourly, today=TODAY) == 0
+    assert om.plan_window("UTC", TODAY - timedelta(days=5), TODAY, hourly, today=TODAY) == 5
+    assert om.plan_window("UTC", TODAY, TODAY + timedelta(days=7), hourly, today=TODAY) is None
+    too_old = TODAY - timedelta(days=om.WINDOW_MAX_PAST_DAYS + 1)
+    assert om.plan_window("UTC", too_old, TODAY, hourly, today=TODAY) is None
+    assert om.plan_window("UTC", TODAY, TODAY, ["wind_speed_10m"], today=TODAY) is None
+    assert om.plan_window("auto", TODAY, TODAY, hourly) is None
+
+
+def test_window_round_trips_through_disk_encoding():
+    params = {"timezone": "UTC", "past_days": 2, "hourly": "temperature_2m,precipitation"}
+    win = om.ForecastWindow.from_payload(_window_payload(params), 2)
+    back = om._decode_cache_value(om._encode_cache_value(win))
+    assert isinstance(back, om.ForecastWindow)
+    assert back.daily_payload() == win.daily_payload()
+    a, b = back.hourly_columns(TODAY, TODAY), win.hourly_columns(TODAY, TODAY)
+    np.testing.assert_array_equal(a.times, b.times)
+    np.testing.assert_allclose(a.columns["temperature_2m"], b.columns["temperature_2m"])
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.ml import registry as regmod
+
+
+class _MockOM:
+    """lat に応じて気温が変わる hourly モック。lat < 0 は上流エラー扱い"""
+
+    def get_hourly(self, *, lat: float, **kwargs) -> Dict[str, Any]:
+        if lat < 0:
+            raise RuntimeError("boom")
+        base = datetime(2025, 1, 1, 0, 0)
+        times = [(base + timedelta(hours=i)).strftime("%Y-%m-%dT%H:00") for i in range(24)]
+        return {
+            "hourly": {
+                "time": times,
+                "temperature_2m": [lat / 2.0 + i * 0.1 for i in range(24)],
+                "precipitation": [0.1] * 24,
+            }
+        }
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch, gbdt_artifact):
+    from app.api import routes as routes_mod
+
+    monkeypatch.setattr(routes_mod, "OpenMeteoClient", _MockOM)
+    monkeypatch.setenv("MODEL_BACKEND", "regression")
+    monkeypatch.setenv("MODEL_PATH", gbdt_artifact.as_posix())
+    regmod.get_registry().clear()
+    yield
+    regmod.get_registry().clear()
+
+
+def test_batch_matches_single_and_reports_row_errors(monkeypatch):
+    items = [
+        {"lat": 35.0, "lon": 139.0},
+        {"lat": -10.0, "lon": 0.0},  # 上流エラー
+        {"lat": 43.0, "lon": 141.3, "tz": "Asia/Tokyo"},
+        {"lat": 95.0, "lon": 0.0},  # 範囲外
+    ]
+    client = TestClient(app)
+
+    # 推論は成功行まとめて 1 回だけ
+    calls = []
+    orig = regmod.SimpleRegModel.predict_features
+
+    def _spy(self, X, d0):
+        calls.append(len(X))
+        return orig(self, X, d0)
+
+    monkeypatch.setattr(regmod.SimpleRegModel, "predict_features", _spy)
+    resp = client.post("/predict/batch", json={"items": items})
+    monkeypatch.setattr(regmod.SimpleRegModel, "predict_features", orig)
+
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert calls[-1] == 2
+    assert (body["count"], body["succeeded"], body["failed"]) == (4, 2, 2)
+    res = body["results"]
+    assert [r["index"] for r in res] == [0, 1, 2, 3]
+    assert [r["ok"] for r in res] == [True, False, True, False]
+    assert "error" in res[1] and "error" in res[3]
+
+    # 単発 /predict と同じ数値
+    for r in (res[0], res[2]):
+        single = client.post("/predict", json={"lat": r["lat"], "lon": r["lon"]}).json()
+        assert r["model_version"] == single["model_version"]
+        np.testing.assert_allclose(
+            [r["prediction"][k] for k in ("d1_mean", "d1_min", "d1_max", "d1_prec")],
+            [single["prediction"][k] for k in ("d1_mean", "d1_min", "d1_max", "d1_prec")],
+        )
+
+
+def test_batch_rejects_empty_request():
+    resp = TestClient(app).post("/predict/batch", json={"items": []})
+    assert resp.status_code == 422
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.baseline import SimpleRegModel
+from app.ml.dataset import iter_location_chunks, make_synthetic_locations, write_dataset
+from app.ml.features import FeaturePipeline, FeaturePipelineConfig
+from app.ml.train import load_location_matrix, train_locations
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_synthetic_locations(seed=0, n_locations=12, n_days=120)
+
+
+def _sorted_rows(*arrays):
+    M = np.nan_to_num(np.column_stack(arrays), nan=-1e9)
+    return M[np.lexsort(M.T[::-1])]
+
+
+def test_chunks_hold_whole_locations(frame, tmp_path):
+    write_dataset(frame, tmp_path, locations_per_file=5, fmt="csv")
+    # バッチ（50 行）は地点の途中で切れるが、チャンクは地点単位にまとまる
+    chunks = list(iter_location_chunks(tmp_path, chunk_rows=300, batch_rows=50))
+    assert len(chunks) > 1
+    keys = [set(map(tuple, c[["lat", "lon"]].to_numpy())) for c in chunks]
+    assert sum(len(k) for k in keys) == 12 == len(set().union(*keys))
+    got = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(got, frame, check_exact=False)
+
+
+def test_non_contiguous_location_is_rejected(frame, tmp_path):
+    shuffled = frame.sample(frac=1.0, random_state=0)
+    shuffled.to_csv(tmp_path / "part-00000.csv", index=False)
+    with pytest.raises(ValueError, match="not contiguous"):
+        list(iter_location_chunks(tmp_path, batch_rows=100))
+
+
+def test_chunked_matrix_matches_whole_frame(frame, tmp_path):
+    write_dataset(frame, tmp_path, locations_per_file=4, fmt="csv")
+    data = load_location_matrix(tmp_path, chunk_rows=200)
+    X, cols = data["raw"]
+    assert data["n_locations"] == 12
+    # 各地点の最終日（翌日値なし）だけ落ちる
+    assert len(X) == len(frame) - 12
+    assert X.dtype == np.float32
+
+    whole = FeaturePipeline(FeaturePipelineConfig(group_cols=("lat", "lon")))
+    X_ref, cols_ref = whole.raw_matrix(frame)
+    assert cols == cols_ref
+    keep = ~whole._validate_and_copy(frame).groupby(["lat", "lon"]).cumcount(ascending=False).eq(0)
+    # float32 で持つので数値は単精度の丸め誤差の範囲で一致
+    np.testing.assert_allclose(
+        _sorted_rows(X.astype(float)), _sorted_rows(X_ref[keep.to_numpy()]), rtol=1e-6
+    )
+
+
+def test_train_locations_saves_single_model(frame, tmp_path):
+    write_dataset(frame, tmp_path / "ds", locations_per_file=6, fmt="csv")
+    path, info = train_locations(
+        tmp_path / "ds",
+        tmp_path / "models",
+        seed=0,
+        n_splits=3,
+        residual=True,
+        require_improve_ratio=10.0,
+        params={"max_iter": 20},
+        chunk_rows=500,
+    )
+    assert info["n_locations"] == 12 and info["n_rows_train"] == len(frame) - 12
+    assert info["raw_matrix_mb"] == round(info["n_rows_train"] * 22 * 4 / 2**20, 1)
+    art = joblib.load(path)
+    assert art["metadata"]["dataset"]["group_cols"] == ["lat", "lon"]
+    assert art["pipeline"].config.group_cols == ()
+
+    # 推論側は地点列を group_cols で渡して一括予測できる
+    d0 = frame.groupby(["lat", "lon"]).tail(8).sort_values(["date", "lat", "lon"])
+    y = SimpleRegModel.load(str(path)).predict(d0, group_cols=("lat", "lon"))
+    assert y.shape == (len(d0), 4) and np.isfinite(y).all()
+
+
+def test_parquet_round_trip(frame, tmp_path):
+    pytest.importorskip("pyarrow")
+    write_dataset(frame, tmp_path, locations_per_file=5, fmt="parquet")
+    got = pd.concat(iter_location_chunks(tmp_path, batch_rows=64), ignore_index=True)
+    pd.testing.assert_frame_equal(got, frame, check_exact=False, check_dtype=False)
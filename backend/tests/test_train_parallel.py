@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import numpy as np
+
+from app.ml.train import _split_jobs, make_synthetic_daily, time_series_cv_train
+
+
+def _without_timing(report):
+    return [{k: v for k, v in f.items() if k != "seconds"} for f in report["folds"]]
+
+
+def test_parallel_cv_matches_serial_bit_for_bit():
+    df, y = make_synthetic_daily(seed=0, n_days=150)
+    serial, r1 = time_series_cv_train(df, y, seed=0, n_splits=2, residual=False, n_jobs=1)
+    parallel, r2 = time_series_cv_train(df, y, seed=0, n_splits=2, residual=False, n_jobs=2)
+
+    assert _without_timing(r1) == _without_timing(r2)
+    assert all(f["seconds"] > 0 for f in r2["folds"]) and r2["n_jobs"] == 2
+    X = serial["pipeline"].transform(df, as_array=True)
+    np.testing.assert_array_equal(serial["model"].predict(X), parallel["model"].predict(X))
+
+
+def test_split_jobs():
+    assert _split_jobs(1, 5) == (1, 1)
+    assert _split_jobs(8, 5) == (5, 1)
+    assert _split_jobs(20, 5) == (5, 4)
+    assert _split_jobs(4, 1) == (1, 4)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import joblib
+import pytest
+
+from app.ml.train import (
+    _split_candidate,
+    make_synthetic_daily,
+    refit_full_and_save,
+    search_candidates,
+    search_hyperparams,
+)
+
+SPACE = {"learning_rate": [0.001, 0.1], "max_iter": [1, 50], "ma_windows": [[3, 7], [3, 7, 14]]}
+
+
+def test_search_candidates_grid_and_random():
+    grid = search_candidates(SPACE, "grid")
+    assert len(grid) == 8
+    rnd = search_candidates(SPACE, "random", n_trials=3, seed=0)
+    assert len(rnd) == 3 and all(c in grid for c in rnd)
+    assert rnd == search_candidates(SPACE, "random", n_trials=3, seed=0)
+
+    params, cfg = _split_candidate(grid[-1])
+    assert params == {"learning_rate": 0.1, "max_iter": 50} and cfg.ma_windows == (3, 7, 14)
+    with pytest.raises(ValueError):
+        _split_candidate({"n_estimators": 10})
+
+
+def test_search_prunes_weak_candidates_and_records_best(tmp_path):
+    df, y = make_synthetic_daily(seed=0, n_days=500)
+    weak = {"learning_rate": 0.001, "max_iter": 1}
+    good = {"learning_rate": 0.1, "max_iter": 50, "ma_windows": [3, 7, 14]}
+    best, bundle, cv_report, report = search_hyperparams(
+        df, y, seed=0, n_splits=3, residual=True, candidates=[weak, good]
+    )
+    assert best == good
+    weak_trial, good_trial = report["trials"]
+    assert weak_trial["pruned"] and weak_trial["folds_run"] == 2
+    assert not good_trial["pruned"] and good_trial["folds_run"] == 3
+    assert bundle["pipeline"].config.ma_windows == (3, 7, 14)
+
+    params, cfg = _split_candidate(best)
+    path = refit_full_and_save(
+        df=df,
+        y=y,
+        bundle=bundle,
+        cv_report=cv_report,
+        out_dir=tmp_path,
+        seed=0,
+        require_improve_ratio=10.0,
+        export_compact_bundle=False,
+        params=params,
+        feature_config=cfg,
+        search_report=report,
+    )
+    meta = joblib.load(path)["metadata"]
+    assert meta["best_config"] == good
+    assert meta["gbdt_params"]["max_iter"] == 50
+    assert meta["feature_config"]["ma_windows"] == (3, 7, 14)